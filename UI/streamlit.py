@@ -8,6 +8,7 @@ BACKEND_BASE_URL = "http://localhost:8000/api"
 
 UPLOAD_ENDPOINT = f"{BACKEND_BASE_URL}/upload"
 CHAT_ENDPOINT = f"{BACKEND_BASE_URL}/chat"
+JOBS_ENDPOINT = f"{BACKEND_BASE_URL}/jobs"
 
 st.set_page_config(
     page_title="Veritas AI – Test UI",
@@ -50,11 +51,36 @@ if uploaded_files:
                 )
 
                 if response.status_code == 200:
-                    data = response.json()
-                    st.success(
-                        f"Uploaded `{data['filename']}` "
-                        f"({data['chunks_added']} chunks indexed)"
+                    # Same bytes already indexed; the backend skipped it
+                    result = response.json()
+                    st.info(
+                        f"`{file.name}` is already indexed "
+                        f"(as `{result['duplicate_of']}`)"
                     )
+                elif response.status_code == 202:
+                    job = response.json()
+
+                    # Indexing runs as a backend job; poll until it finishes
+                    while job["status"] in ("queued", "running"):
+                        time.sleep(1)
+                        job = requests.get(
+                            f"{JOBS_ENDPOINT}/{job['job_id']}"
+                        ).json()
+
+                    if job["status"] == "done" and job["result"].get("replacement"):
+                        st.success(
+                            f"Replaced `{job['filename']}` "
+                            f"({job['result'].get('chunks', 0)} chunks indexed)"
+                        )
+                    elif job["status"] == "done":
+                        st.success(
+                            f"Uploaded `{job['filename']}` "
+                            f"({job['result'].get('chunks', 0)} chunks indexed)"
+                        )
+                    else:
+                        st.error(
+                            f"Failed to index {file.name}: {job['error']}"
+                        )
                 else:
                     st.error(
                         f"Failed to upload {file.name}: "
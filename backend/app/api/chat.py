@@ -1,3 +1,4 @@
+from typing import List, Optional
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 from app.core.state import app_state
@@ -8,6 +9,7 @@ router = APIRouter()
 
 class ChatRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=1000)
+    sources: Optional[List[str]] = None
 
 
 class ChatResponse(BaseModel):
@@ -20,8 +22,10 @@ def chat(request: ChatRequest):
     if not query:
         return ChatResponse(answer=REFUSAL_MESSAGE)
 
-    with app_state.lock:
-        retrieved = app_state.retriever.retrieve(query)
+    if app_state.query_batcher:
+        retrieved = app_state.query_batcher.retrieve(query, sources=request.sources)
+    else:
+        retrieved = app_state.retriever.retrieve(query, sources=request.sources)
 
     if not retrieved:
         return ChatResponse(answer=REFUSAL_MESSAGE)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from app.core.state import app_state
 
 router = APIRouter()
 
@@ -6,3 +7,24 @@ router = APIRouter()
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/index")
+def index_health(recall: bool = False):
+    """
+    Vector index mode and memory footprint.
+    recall=true also measures recall@10 against exact search (slow).
+    """
+    stats = app_state.vector_store.stats()
+    stats["query_cache"] = app_state.embedding_model.query_cache_stats()
+
+    if app_state.lexical_index is not None:
+        stats["bm25"] = app_state.lexical_index.stats()
+
+    if app_state.table_store is not None:
+        stats["tables"] = app_state.table_store.stats()
+
+    if recall:
+        stats["recall_at_10"] = app_state.vector_store.measure_recall(top_k=10)
+
+    return stats
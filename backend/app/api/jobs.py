@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from app.core.state import app_state
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Status of a background ingestion job: stage, progress (0-1, or null
+    when unknown), chunk counts, and the final result or error.
+    """
+    job = app_state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job.to_dict()
@@ -1,54 +1,132 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from pathlib import Path
+from typing import Optional
+import os
 import traceback
 import tempfile
+import hashlib
 
-from app.ingestion.loader import load_document
-from app.ingestion.chunker import chunk_pages
+from app.ingestion.pipeline import (
+    index_document,
+    index_changed_pages,
+    table_headers,
+    token_chunker,
+)
+from app.ingestion.chunker import iter_chunks
+from app.ingestion.registry import file_sha256
 from app.embeddings.embedder import Embedder
 from app.core.state import app_state
+from app.core.jobs import IngestJob, QueueFullError
+from app.core import config
 from app.drive.drive_client import download_file
 
 router = APIRouter()
 
 UPLOAD_DIR = Path("data/raw_uploads")
+STAGING_DIR = UPLOAD_DIR / ".staging"
 VECTOR_INDEX_DIR = Path("data/vector_index/veritas")
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 VECTOR_INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
+# Bytes read from the request per step while streaming an upload to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
 # ======================================================
-# 1️⃣ EXISTING LOCAL FILE UPLOAD (UNCHANGED)
+# 1️⃣ LOCAL FILE UPLOAD (STREAMED, DEDUPED, QUEUED)
 # ======================================================
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_document(file: UploadFile = File(...)):
     if not file.filename:
         raise HTTPException(status_code=400, detail="Invalid file")
 
-    if file.size and file.size > 20 * 1024 * 1024:
+    max_bytes = config.UPLOAD_MAX_MB * 1024 * 1024
+
+    # Cheap early reject when the client declared a size
+    if file.size and file.size > max_bytes:
         raise HTTPException(status_code=400, detail="File too large")
 
     file_path = UPLOAD_DIR / file.filename
+    tmp_path = _staging_path(file.filename)
 
     try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        sha256 = await _stream_to_disk(file, tmp_path, max_bytes)
 
-        return _process_and_index(file_path, file.filename)
+        # Identical bytes are answered before anything is parsed
+        duplicate = _duplicate_response(file.filename, sha256)
+        if duplicate:
+            _discard_staged(tmp_path)
+            return JSONResponse(status_code=200, content=duplicate)
+
+    except UploadTooLargeError:
+        _discard_staged(tmp_path)
+        raise HTTPException(status_code=400, detail="File too large")
 
     except Exception:
         traceback.print_exc()
-        if file_path.exists():
-            file_path.unlink(missing_ok=True)
+        _discard_staged(tmp_path)
 
         raise HTTPException(
             status_code=500,
             detail="Upload failed. Check server logs."
         )
 
+    # Parsed and indexed in the background job queue, after any earlier
+    # job for this filename has finished; only then does it replace the
+    # previous raw file
+    return _enqueue(file_path, file.filename, staged_path=tmp_path, sha256=sha256)
+
+
+def _staging_path(filename: str) -> Path:
+    """
+    filename inside a unique temp dir under the raw uploads, so
+    concurrent uploads of the same name never write to the same file
+    while the parser still sees the real name and extension.
+    """
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(dir=STAGING_DIR)) / filename
+
+
+def _discard_staged(path: Path):
+    path.unlink(missing_ok=True)
+    try:
+        path.parent.rmdir()
+    except OSError:
+        pass
+
+
+async def _stream_to_disk(file: UploadFile, path: Path, max_bytes: int) -> str:
+    """
+    Copies the upload to path in UPLOAD_CHUNK_SIZE steps, hashing as it
+    goes, so at most one step is held in memory. Raises
+    UploadTooLargeError as soon as more than max_bytes have arrived.
+    Returns the sha256 of the contents.
+    """
+    digest = hashlib.sha256()
+    written = 0
+
+    with open(path, "wb") as f:
+        while True:
+            block = await file.read(UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+
+            written += len(block)
+            if written > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+            digest.update(block)
+            f.write(block)
+
+    return digest.hexdigest()
+
 # ======================================================
 # 2️⃣ GOOGLE DRIVE UPLOAD (NEW)
 # ======================================================
@@ -58,73 +136,430 @@ class DriveUploadRequest(BaseModel):
     file_name: str
 
 
-@router.post("/upload-from-drive")
+@router.post("/upload-from-drive", status_code=202)
 def upload_from_drive(payload: DriveUploadRequest):
     if not payload.file_id or not payload.file_name:
         raise HTTPException(status_code=400, detail="Invalid Drive payload")
 
     file_path = UPLOAD_DIR / payload.file_name
 
-    try:
-        # 🔽 Download file from Google Drive
-        download_file(payload.file_id, str(file_path))
+    # 🔽 Download happens inside the job, off the request thread
+    return _enqueue(file_path, payload.file_name, drive_file_id=payload.file_id)
 
-        return _process_and_index(file_path, payload.file_name)
+# ======================================================
+# 3️⃣ BACKGROUND INGESTION JOBS
+# ======================================================
 
-    except Exception:
-        traceback.print_exc()
-        if file_path.exists():
-            file_path.unlink(missing_ok=True)
+def _enqueue(
+    file_path: Path,
+    filename: str,
+    drive_file_id: Optional[str] = None,
+    staged_path: Optional[Path] = None,
+    sha256: Optional[str] = None,
+):
+    # Jobs for the same filename run one at a time, in upload order
+    try:
+        job = app_state.jobs.submit(
+            filename,
+            lambda job: _run_job(
+                job, file_path, filename, drive_file_id, staged_path, sha256
+            ),
+            key=filename,
+        )
+    except QueueFullError:
+        if staged_path is not None:
+            _discard_staged(staged_path)
 
         raise HTTPException(
-            status_code=500,
-            detail="Drive upload failed. Check server logs."
+            status_code=503,
+            detail="Ingestion queue is full. Try again later."
         )
 
+    return job.to_dict()
+
+
+def _run_job(
+    job: IngestJob,
+    file_path: Path,
+    filename: str,
+    drive_file_id: Optional[str],
+    staged_path: Optional[Path] = None,
+    sha256: Optional[str] = None,
+):
+    def report(stage: str, counts: dict):
+        pages = counts.get("pages")
+        progress = None
+        if pages:
+            # Capped below 1.0: tables are extracted after the last page
+            progress = round(min(counts.get("pages_read", 0) / pages, 0.99), 3)
+        job.update(stage, counts, progress)
+
+    try:
+        if drive_file_id:
+            job.update("downloading")
+            staged_path = _staging_path(filename)
+            download_file(drive_file_id, str(staged_path))
+
+        # Local uploads were hashed while streaming
+        if sha256 is None:
+            sha256 = file_sha256(staged_path)
+
+        # Checked again here: an earlier job for this filename may have
+        # indexed the same bytes since the upload was accepted
+        duplicate = _duplicate_response(filename, sha256)
+        if duplicate:
+            return duplicate
+
+        # Indexed from the staged copy: the previous raw file (like the
+        # previous index entries) stays until the new version is in
+        result = _process_and_index(staged_path, filename, sha256, progress=report)
+        os.replace(staged_path, file_path)
+        return result
+
+    finally:
+        if staged_path is not None:
+            _discard_staged(staged_path)
+
+# ======================================================
+# 4️⃣ CONTENT-HASH DEDUPE
+# ======================================================
+
+def _duplicate_response(filename: str, sha256: str) -> Optional[dict]:
+    """
+    Response for an upload whose bytes are already indexed (under this
+    or any other name), or None if it needs indexing.
+    """
+    existing = app_state.documents.find_by_hash(sha256)
+
+    # The registry can outlive index entries (e.g. a failed load)
+    if existing is None or not app_state.vector_store.has_source(existing):
+        return None
+
+    return {
+        "status": "duplicate",
+        "filename": filename,
+        "duplicate_of": existing,
+        "sha256": sha256,
+        "info": "Identical document already indexed; nothing to do"
+    }
+
 # ======================================================
-# 3️⃣ SHARED INGESTION + INDEXING LOGIC
+# 5️⃣ SHARED INGESTION + INDEXING LOGIC
 # ======================================================
 
-def _process_and_index(file_path: Path, filename: str):
+def _process_and_index(
+    file_path: Path,
+    filename: str,
+    sha256: str,
+    progress=None,
+    full: bool = False,
+):
     """
     Shared logic for:
     - loading
     - chunking
     - embedding
     - indexing
+
+    full forces a complete re-index even when the document is already
+    indexed (used by /reindex); parsing is still skipped when the
+    block cache has this content.
     """
 
-    # 1️⃣ Load & chunk document
-    pages = load_document(file_path)
-    chunks = chunk_pages(pages)
+    # 1️⃣ Load → chunk → embed → index, streamed in fixed-size windows
+    parse_stats: dict = {}
+    embedder = Embedder(
+        app_state.embedding_model,
+        cache=app_state.embedding_cache,
+        pool=app_state.embedding_pool,
+        pool_threshold=config.EMBEDDING_POOL_THRESHOLD,
+    )
+
+    if config.CHUNKER == "token":
+        chunker = token_chunker(
+            embedder,
+            max_tokens=config.CHUNK_MAX_TOKENS,
+            overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+        )
+    else:
+        chunker = iter_chunks
+
+    previous = app_state.documents.get(filename)
+    page_hashes: list = []
 
-    # 2️⃣ Embed ALL chunks
-    embedder = Embedder(app_state.embedding_model)
-    embedded = embedder.embed_chunks(chunks)
+    # Table headers carried over from unchanged pages come from the
+    # cached blocks; without them only a full parse is exact
+    previous_headers = None
+    if not full and previous and previous.get("pages"):
+        previous_headers = table_headers(app_state.block_cache, previous["sha256"])
+
+    if (
+        previous_headers is not None
+        and app_state.vector_store.has_source(filename)
+    ):
+        # 2️⃣ Revised PDF: only pages whose content hash changed are
+        # re-parsed and re-embedded, then swapped in
+        counts = index_changed_pages(
+            file_path,
+            filename,
+            embedder,
+            app_state.vector_store,
+            app_state.lock,
+            str(VECTOR_INDEX_DIR),
+            previous["pages"],
+            window=config.INGEST_WINDOW,
+            stats=parse_stats,
+            progress=progress,
+            page_hashes=page_hashes,
+            chunker=chunker,
+            lexical_index=app_state.lexical_index,
+            table_store=app_state.table_store,
+            block_cache=app_state.block_cache,
+            sha256=sha256,
+            previous_sha256=previous["sha256"],
+            previous_headers=previous_headers,
+        )
+        total_chunks = previous["chunks"] - counts["replaced_chunks"] + counts["chunks"]
+    else:
+        # 2️⃣ Each window is added and flushed to FAISS as it is ready
+        # (re-uploads replace the previous version)
+        counts = index_document(
+            file_path,
+            filename,
+            embedder,
+            app_state.vector_store,
+            app_state.lock,
+            str(VECTOR_INDEX_DIR),
+            window=config.INGEST_WINDOW,
+            stats=parse_stats,
+            progress=progress,
+            page_hashes=page_hashes,
+            block_cache=app_state.block_cache,
+            sha256=sha256,
+            chunker=chunker,
+            lexical_index=app_state.lexical_index,
+            table_store=app_state.table_store,
+        )
+        total_chunks = counts["chunks"]
+
+    if not total_chunks:
+        # The previous version (if any) was replaced with nothing
+        if previous:
+            app_state.documents.remove(filename)
+            if app_state.block_cache is not None and previous["sha256"] != sha256:
+                app_state.block_cache.remove(previous["sha256"])
 
-    if not embedded:
         return {
             "status": "success",
             "filename": filename,
             "chunks": 0,
+            "embedding_cache": embedder.cache_stats,
             "info": "No embeddable content found"
         }
 
-    # 3️⃣ Persist to FAISS
-    with app_state.lock:
-        app_state.vector_store.add(
-            embeddings=[c["embedding"] for c in embedded],
-            texts=[c["text"] for c in embedded],
-            metadatas=[c["metadata"] for c in embedded],
-        )
-        app_state.vector_store.save(str(VECTOR_INDEX_DIR))
+    # The raw file may be gone when re-indexing from cached blocks
+    size = file_path.stat().st_size if file_path.exists() else previous["size"]
+
+    app_state.documents.record(
+        filename,
+        sha256,
+        size,
+        total_chunks,
+        pages=page_hashes,
+    )
+
+    # Cached blocks of the replaced version are no longer reachable
+    # (a revised PDF's new entry was merged from them above)
+    if app_state.block_cache is not None and previous and previous["sha256"] != sha256:
+        app_state.block_cache.remove(previous["sha256"])
 
     return {
         "status": "success",
         "filename": filename,
-        "pages": len(pages),
-        "chunks": len(embedded),
+        "pages": counts["blocks"],
+        "chunks": counts["chunks"],
+        "replaced_chunks": counts["replaced_chunks"],
+        "changed_pages": counts.get("changed_pages"),
+        "total_chunks": total_chunks,
+        # Same name, different bytes
+        "replacement": previous is not None or bool(counts["replaced_chunks"]),
+        "previous_sha256": previous["sha256"] if previous else None,
+        "sha256": sha256,
+        "parse": parse_stats,
+        "embedding_cache": embedder.cache_stats,
         "info": "Index updated successfully"
     }
 
+# ======================================================
+# 6️⃣ RE-INDEX FROM CACHED BLOCKS
+# ======================================================
+
+@router.post("/reindex", status_code=202)
+def reindex_documents(filename: Optional[str] = None):
+    """
+    Re-chunks and re-embeds every indexed document (or just filename)
+    in one background job, e.g. after changing chunking or the
+    embedding model. Documents in the block cache are not parsed again.
+    A document with an upload in flight gets its own re-index job,
+    queued behind that upload (its result carries the job_id).
+    """
+    if filename is not None:
+        if app_state.documents.get(filename) is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        filenames = [filename]
+    else:
+        filenames = app_state.documents.filenames()
+
+    try:
+        job = app_state.jobs.submit(
+            filename or "reindex",
+            lambda job: _run_reindex(job, filenames),
+        )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion queue is full. Try again later."
+        )
+
+    return job.to_dict()
+
+
+def _run_reindex(job: IngestJob, filenames: list):
+    results = {}
+
+    for done, filename in enumerate(filenames):
+        job.update(
+            "reindexing",
+            {"documents": len(filenames), "documents_done": done},
+            round(done / len(filenames), 3),
+        )
 
+        with app_state.jobs.exclusive(filename) as held:
+            if held:
+                result = _reindex_one(filename)
+            else:
+                # An upload of this document is queued or running; its
+                # re-index is queued behind it instead of waiting here
+                result = _queue_reindex(filename)
+
+        # None: deleted since the job was queued
+        if result is not None:
+            results[filename] = result
+
+    return {
+        "status": "success",
+        "documents": len(filenames),
+        "reindexed": sum(r["status"] == "success" for r in results.values()),
+        "queued": sum(r["status"] == "queued" for r in results.values()),
+        "results": results,
+    }
+
+
+def _queue_reindex(filename: str) -> dict:
+    try:
+        job = app_state.jobs.submit(
+            filename,
+            lambda job: _reindex_one(filename) or {
+                "status": "skipped",
+                "info": "Document deleted before it was re-indexed"
+            },
+            key=filename,
+        )
+    except QueueFullError:
+        return {"status": "skipped", "info": "Ingestion queue is full"}
+
+    return {"status": "queued", "job_id": job.id}
+
+
+def _reindex_one(filename: str) -> Optional[dict]:
+    entry = app_state.documents.get(filename)
+    if entry is None:
+        return None
+
+    file_path = UPLOAD_DIR / filename
+    cached = (
+        app_state.block_cache is not None
+        and app_state.block_cache.has(entry["sha256"])
+    )
+
+    if not cached and not file_path.exists():
+        return {
+            "status": "skipped",
+            "info": "Neither cached blocks nor the raw file are available"
+        }
+
+    try:
+        return _process_and_index(
+            file_path, filename, entry["sha256"], full=True
+        )
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "failed", "error": str(e)}
+
+# ======================================================
+# 7️⃣ DOCUMENT DELETE
+# ======================================================
+
+@router.delete("/documents/{filename}")
+def delete_document(filename: str):
+    with app_state.jobs.exclusive(filename) as held:
+        if held:
+            result = _delete_one(filename)
+            if result is None:
+                raise HTTPException(status_code=404, detail="Document not found")
+            return result
+
+    # An upload of this document is queued or running; deleting now
+    # would let its remaining windows bring the document back
+    try:
+        job = app_state.jobs.submit(
+            filename,
+            lambda job: _delete_one(filename) or {
+                "status": "not_found",
+                "filename": filename,
+                "info": "Document not found"
+            },
+            key=filename,
+        )
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion queue is full. Try again later."
+        )
+
+    return JSONResponse(status_code=202, content=job.to_dict())
+
+
+def _delete_one(filename: str) -> Optional[dict]:
+    with app_state.lock:
+        removed = app_state.vector_store.delete_source(filename)
+
+        if not removed:
+            return None
+
+        app_state.vector_store.flush(str(VECTOR_INDEX_DIR))
+
+        if app_state.lexical_index is not None:
+            app_state.lexical_index.delete_source(filename)
+            app_state.lexical_index.flush(str(VECTOR_INDEX_DIR))
+
+        if app_state.table_store is not None:
+            app_state.table_store.delete_source(filename)
+            app_state.table_store.flush(str(VECTOR_INDEX_DIR))
+
+    entry = app_state.documents.get(filename)
+    app_state.documents.remove(filename)
+
+    if app_state.block_cache is not None and entry:
+        app_state.block_cache.remove(entry["sha256"])
+
+    file_path = UPLOAD_DIR / filename
+    if file_path.exists():
+        file_path.unlink(missing_ok=True)
+
+    return {
+        "status": "success",
+        "filename": filename,
+        "chunks_removed": removed,
+        "info": "Document removed from index"
+    }
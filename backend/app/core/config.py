@@ -0,0 +1,125 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# -----------------------------
+# VECTOR INDEX
+# -----------------------------
+
+# flat | hnsw | ivf
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat")
+
+# float32 | fp16 | sq8 | pq
+VECTOR_ENCODING = os.getenv("VECTOR_ENCODING", "float32")
+
+# Re-score compressed-index candidates against exact float32 vectors
+VECTOR_RESCORE = os.getenv("VECTOR_RESCORE", "true").lower() == "true"
+
+# Stay exact (Flat) until the corpus reaches this many chunks
+VECTOR_PROMOTE_THRESHOLD = _env_int("VECTOR_PROMOTE_THRESHOLD", 100_000)
+
+HNSW_M = _env_int("HNSW_M", 32)
+HNSW_EF_SEARCH = _env_int("HNSW_EF_SEARCH", 64)
+IVF_NPROBE = _env_int("IVF_NPROBE", 16)
+
+# > 1 splits the index into independently searched shards
+VECTOR_SHARDS = _env_int("VECTOR_SHARDS", 1)
+
+# source_hash | round_robin
+VECTOR_SHARD_PARTITION = os.getenv("VECTOR_SHARD_PARTITION", "source_hash")
+
+# -----------------------------
+# EMBEDDINGS
+# -----------------------------
+
+# SQLite file for the content-addressed embedding cache ("" disables it)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite3")
+
+# LRU bound on cached vectors (~1.5 KB each at 384-d)
+EMBEDDING_CACHE_MAX_ENTRIES = _env_int("EMBEDDING_CACHE_MAX_ENTRIES", 500_000)
+
+# Worker processes for large ingests (0 embeds on the request thread)
+EMBEDDING_WORKERS = _env_int("EMBEDDING_WORKERS", 0)
+
+# Uncached chunk count at which an ingest switches to the worker pool
+EMBEDDING_POOL_THRESHOLD = _env_int("EMBEDDING_POOL_THRESHOLD", 2000)
+
+# Repeated chat questions are answered from this LRU of query vectors
+QUERY_CACHE_SIZE = _env_int("QUERY_CACHE_SIZE", 1024)
+
+# torch | onnx | onnx_int8 (embedding model and reranker)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+
+# int8 kernel target for onnx_int8: arm64 | avx2 | avx512 | avx512_vnni
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")
+
+# -----------------------------
+# QUERY MICRO-BATCHING
+# -----------------------------
+
+# > 1 lets concurrent chat queries arriving within the wait window
+# share one encode pass and one vector search, up to this many per
+# batch (1 = off; e.g. 32 under heavy concurrent chat load)
+QUERY_BATCH_MAX_SIZE = _env_int("QUERY_BATCH_MAX_SIZE", 1)
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+
+# -----------------------------
+# HYBRID (BM25 + VECTOR) RETRIEVAL
+# -----------------------------
+
+# Lexical BM25 index alongside FAISS, fused by reciprocal rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_LEXICAL_TOP_K = _env_int("HYBRID_LEXICAL_TOP_K", 40)
+HYBRID_RRF_K = _env_int("HYBRID_RRF_K", 60)
+
+# Lexical results arriving later than this (after the vector search
+# has started) are dropped and the vector ranking is used alone
+HYBRID_BUDGET_MS = float(os.getenv("HYBRID_BUDGET_MS", "50"))
+
+# -----------------------------
+# TABLE LOOKUP
+# -----------------------------
+
+# Extracted table rows kept as structured data; rows with a cell that
+# exactly matches a query term lead the evidence
+TABLE_LOOKUP = os.getenv("TABLE_LOOKUP", "true").lower() == "true"
+TABLE_LOOKUP_TOP_K = _env_int("TABLE_LOOKUP_TOP_K", 3)
+
+# -----------------------------
+# INGESTION
+# -----------------------------
+
+# Processes for page-parallel PDF text extraction (1 = serial)
+PDF_PARSE_WORKERS = _env_int("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1))
+
+# Largest accepted upload; bodies are streamed to disk, so this is a
+# disk / processing limit rather than a memory one
+UPLOAD_MAX_MB = _env_int("UPLOAD_MAX_MB", 20)
+
+# Parsed blocks per file content hash, reused by re-indexing
+# ("" disables the cache)
+BLOCK_CACHE_DIR = os.getenv("BLOCK_CACHE_DIR", "data/block_cache")
+
+# "chars": the 800-character LangChain splitter
+# "token": chunks sized in embedding-model tokens (tokenizer-aligned);
+# also packs short same-page blocks together, so chunk boundaries and
+# retrieval results change after a re-index
+CHUNKER = os.getenv("CHUNKER", "chars")
+
+# Token chunker: chunk size cap (0 = the model's limit) and overlap
+CHUNK_MAX_TOKENS = _env_int("CHUNK_MAX_TOKENS", 0)
+CHUNK_OVERLAP_TOKENS = _env_int("CHUNK_OVERLAP_TOKENS", 32)
+
+# Chunks embedded and indexed per window while streaming an upload
+INGEST_WINDOW = _env_int("INGEST_WINDOW", 512)
+
+# Background ingestion jobs running at once, and queued + running cap
+INGEST_WORKERS = _env_int("INGEST_WORKERS", 2)
+INGEST_QUEUE_SIZE = _env_int("INGEST_QUEUE_SIZE", 32)
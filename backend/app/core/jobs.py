@@ -0,0 +1,180 @@
+from typing import Callable, Deque, Dict, Iterator, Optional, Set, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Lock
+import time
+import traceback
+import uuid
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class IngestJob:
+    """
+    Status of one background ingestion, as reported by GET /api/jobs/{id}.
+    """
+
+    def __init__(self, filename: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.stage = JOB_QUEUED
+        self.progress: Optional[float] = 0.0
+        self.counts: Dict = {}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def update(self, stage: str, counts: Optional[Dict] = None, progress: Optional[float] = None):
+        self.stage = stage
+        if counts is not None:
+            self.counts = dict(counts)
+        self.progress = progress
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "counts": self.counts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobQueue:
+    """
+    Bounded background worker pool for document ingestion.
+
+    At most max_pending jobs may be queued or running; submit() raises
+    QueueFullError beyond that. Finished jobs are kept (oldest evicted
+    first) so clients can still poll their final status.
+
+    Jobs submitted with the same key (the document filename) run one
+    at a time, in submission order; later ones stay queued without
+    occupying a worker until the earlier one finishes.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, max_finished: int = 1000):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._pending = 0
+        self._lock = Lock()
+
+        # Keys with a job running (or held via exclusive()), and the
+        # jobs waiting for each of them
+        self._busy: Set[str] = set()
+        self._waiting: Dict[str, Deque[Tuple[IngestJob, Callable]]] = {}
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ingest-job"
+        )
+
+    def submit(
+        self,
+        filename: str,
+        fn: Callable[[IngestJob], Dict],
+        key: Optional[str] = None,
+    ) -> IngestJob:
+        """
+        Queues fn(job); its return value becomes job.result.
+        """
+        job = IngestJob(filename)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Ingestion queue is full")
+            self._pending += 1
+            self._jobs[job.id] = job
+
+            if key is not None:
+                if key in self._busy:
+                    self._waiting.setdefault(key, deque()).append((job, fn))
+                    return job
+                self._busy.add(key)
+
+        self._executor.submit(self._run, job, fn, key)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @contextmanager
+    def exclusive(self, key: str) -> Iterator[bool]:
+        """
+        Holds key for the block, as if it were a job for key, and yields
+        True; yields False (holding nothing) if a job for key is queued
+        or running. Never waits: a job blocked on a key could be waiting
+        for a job queued behind it on the same workers.
+        """
+        with self._lock:
+            held = key not in self._busy
+            if held:
+                self._busy.add(key)
+
+        try:
+            yield held
+        finally:
+            if held:
+                with self._lock:
+                    self._release(key)
+
+    def _release(self, key: str):
+        # Caller holds self._lock; the key passes to the next waiting job
+        waiting = self._waiting.get(key)
+        if waiting:
+            job, fn = waiting.popleft()
+            if not waiting:
+                del self._waiting[key]
+            self._executor.submit(self._run, job, fn, key)
+            return
+
+        self._busy.discard(key)
+
+    def _run(self, job: IngestJob, fn: Callable[[IngestJob], Dict], key: Optional[str]):
+        job.status = JOB_RUNNING
+        job.update(JOB_RUNNING)
+
+        try:
+            job.result = fn(job)
+            job.status = JOB_DONE
+            job.update(JOB_DONE, progress=1.0)
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e) or type(e).__name__
+            job.status = JOB_FAILED
+            job.update(JOB_FAILED, progress=job.progress)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._evict_finished()
+                if key is not None:
+                    self._release(key)
+
+    def _evict_finished(self):
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in (JOB_DONE, JOB_FAILED)
+        ]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
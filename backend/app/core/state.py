@@ -1,11 +1,21 @@
 from pathlib import Path
 from threading import Lock
 from app.embeddings.model import EmbeddingModel
-from app.vectorstore.faiss_store import FAISSVectorStore
+from app.embeddings.cache import EmbeddingCache
+from app.embeddings.pool import EmbeddingPool
+from app.vectorstore.faiss_store import FAISSVectorStore, MANIFEST_FILE, LEGACY_INDEX_FILE
+from app.vectorstore.sharded_store import ShardedVectorStore
 from app.retrieval.retriever import Retriever
+from app.retrieval.batcher import QueryBatcher
+from app.retrieval.bm25_index import BM25Index
+from app.retrieval.table_store import TableStore
 from app.retrieval.reranker import Reranker
 from app.llm.generator import AnswerGenerator
 from app.validation.validator import AnswerValidator
+from app.core import config
+from app.core.jobs import JobQueue
+from app.ingestion.registry import DocumentRegistry
+from app.ingestion.block_cache import BlockCache
 
 VECTOR_INDEX_DIR = Path("data/vector_index/veritas")
 
@@ -14,10 +24,23 @@ class AppState:
     def __init__(self):
         self.lock = Lock()
 
+        # Background ingestion (uploads return 202 + a job id)
+        self.jobs = JobQueue(
+            workers=config.INGEST_WORKERS,
+            max_pending=config.INGEST_QUEUE_SIZE,
+        )
+
         # Core AI components
         self.embedding_model = None
+        self.embedding_cache = None
+        self.embedding_pool = None
         self.vector_store = None
+        self.documents = None
+        self.block_cache = None
+        self.lexical_index = None
+        self.table_store = None
         self.retriever = None
+        self.query_batcher = None
         self.reranker = None
         self.generator = None
         self.validator = None
@@ -28,11 +51,32 @@ class AppState:
 
     def initialize(self):
         with self.lock:
-            self.embedding_model = EmbeddingModel()
-            self.vector_store = FAISSVectorStore(
-                dim=self.embedding_model.dimension
+            self.embedding_model = EmbeddingModel(
+                query_cache_size=config.QUERY_CACHE_SIZE,
+                backend=config.MODEL_BACKEND,
+                quantization=config.ONNX_QUANTIZATION,
             )
 
+            if config.EMBEDDING_CACHE_PATH:
+                self.embedding_cache = EmbeddingCache(
+                    config.EMBEDDING_CACHE_PATH,
+                    max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES,
+                )
+
+            if config.EMBEDDING_WORKERS > 0:
+                self.embedding_pool = EmbeddingPool(
+                    self.embedding_model.model_name,
+                    workers=config.EMBEDDING_WORKERS,
+                    backend=config.MODEL_BACKEND,
+                    quantization=config.ONNX_QUANTIZATION,
+                )
+
+            self.vector_store = self._create_vector_store()
+            self.documents = DocumentRegistry(VECTOR_INDEX_DIR / "documents.json")
+
+            if config.BLOCK_CACHE_DIR:
+                self.block_cache = BlockCache(config.BLOCK_CACHE_DIR)
+
             if VECTOR_INDEX_DIR.exists():
                 try:
                     self.vector_store.load(str(VECTOR_INDEX_DIR))
@@ -40,17 +84,134 @@ class AppState:
                 except Exception as e:
                     print(f"WARNING: Could not load index: {e}")
 
+            if config.HYBRID_SEARCH:
+                self.lexical_index = self._load_lexical_index()
+
+            if config.TABLE_LOOKUP:
+                self.table_store = self._load_table_store()
+
             self.retriever = Retriever(
                 self.embedding_model,
-                self.vector_store
+                self.vector_store,
+                lexical_index=self.lexical_index,
+                lexical_top_k=config.HYBRID_LEXICAL_TOP_K,
+                rrf_k=config.HYBRID_RRF_K,
+                budget_ms=config.HYBRID_BUDGET_MS,
+                table_store=self.table_store,
+                table_top_k=config.TABLE_LOOKUP_TOP_K,
             )
 
-            self.reranker = Reranker()
+            # Chat queries are micro-batched; the vector store's own lock
+            # makes searches safe alongside concurrent uploads
+            if config.QUERY_BATCH_MAX_SIZE > 1:
+                self.query_batcher = QueryBatcher(
+                    self.retriever,
+                    max_batch_size=config.QUERY_BATCH_MAX_SIZE,
+                    max_wait_ms=config.QUERY_BATCH_WAIT_MS,
+                )
+
+            self.reranker = Reranker(
+                backend=config.MODEL_BACKEND,
+                quantization=config.ONNX_QUANTIZATION,
+            )
             self.generator = AnswerGenerator()
             self.validator = AnswerValidator()
 
             print("INFO: AppState initialized successfully.")
 
+    def _load_lexical_index(self) -> BM25Index:
+        lexical_index = BM25Index()
+        lexical_index.load(str(VECTOR_INDEX_DIR))
+
+        # First start with an existing vector index (or one updated while
+        # hybrid search was off): rebuild from the stored chunks
+        if len(lexical_index) != self.vector_store.ntotal:
+            texts, metadatas = self.vector_store.live_records()
+            lexical_index = BM25Index()
+            lexical_index.add(texts, metadatas)
+            lexical_index.save(str(VECTOR_INDEX_DIR))
+            print(f"INFO: BM25 index built from {len(texts)} stored chunks")
+
+        return lexical_index
+
+    def _load_table_store(self) -> TableStore:
+        table_store = TableStore()
+        if TableStore.exists(str(VECTOR_INDEX_DIR)):
+            table_store.load(str(VECTOR_INDEX_DIR))
+            return table_store
+
+        # First start with an existing index: fill from cached blocks
+        # (only those parsed since table rows carry their cells, format 2)
+        filenames = self.documents.filenames()
+        stale = 0
+        for filename in filenames:
+            sha256 = self.documents.get(filename)["sha256"]
+            cached = (
+                self.block_cache is not None
+                and self.block_cache.has(sha256)
+                and self.block_cache.format(sha256) >= 2
+            )
+            if not cached:
+                stale += 1
+                continue
+
+            table_store.replace_source(filename, [
+                block for block in self.block_cache.iter_blocks(sha256, source=filename)
+                if block.get("block_type") == "table_row" and block.get("cells")
+            ])
+
+        table_store.flush(str(VECTOR_INDEX_DIR))
+        if filenames:
+            print(f"INFO: Table store built with {len(table_store)} rows from cached blocks")
+        if stale:
+            print(
+                f"WARNING: {stale} document(s) have no structured table rows; "
+                f"POST /api/reindex re-parses those whose raw file is kept"
+            )
+
+        return table_store
+
+    def _create_vector_store(self):
+        store_kwargs = dict(
+            index_type=config.VECTOR_INDEX_TYPE,
+            encoding=config.VECTOR_ENCODING,
+            promote_threshold=config.VECTOR_PROMOTE_THRESHOLD,
+            hnsw_m=config.HNSW_M,
+            ef_search=config.HNSW_EF_SEARCH,
+            nprobe=config.IVF_NPROBE,
+            rescore=config.VECTOR_RESCORE,
+        )
+
+        # An existing index keeps its layout regardless of config; that
+        # includes the single faiss.index written before manifests
+        if ShardedVectorStore.is_sharded(str(VECTOR_INDEX_DIR)):
+            sharded = True
+        elif any(
+            (VECTOR_INDEX_DIR / name).exists()
+            for name in (MANIFEST_FILE, LEGACY_INDEX_FILE)
+        ):
+            sharded = False
+            if config.VECTOR_SHARDS > 1:
+                print(
+                    f"WARNING: VECTOR_SHARDS={config.VECTOR_SHARDS} ignored: "
+                    f"{VECTOR_INDEX_DIR} holds an unsharded index"
+                )
+        else:
+            sharded = config.VECTOR_SHARDS > 1
+
+        if sharded:
+            return ShardedVectorStore(
+                dim=self.embedding_model.dimension,
+                num_shards=max(config.VECTOR_SHARDS, 1),
+                partition=config.VECTOR_SHARD_PARTITION,
+                **store_kwargs,
+            )
+
+        return FAISSVectorStore(
+            dim=self.embedding_model.dimension,
+            **store_kwargs,
+        )
+
 
 app_state = AppState()
 
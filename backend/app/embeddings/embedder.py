@@ -1,22 +1,52 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional
 from .model import EmbeddingModel
+from .cache import EmbeddingCache, text_hash
+from .pool import EmbeddingPool
 
 
 class Embedder:
     """
     Converts document chunks into embeddings.
     Embeds all answer-bearing chunks (text + table rows).
+
+    With a cache, texts embedded before (by the same model) are reused
+    and only misses are encoded. cache_stats describes the last call.
+
+    Texts are batched by token length rather than document order: short
+    table rows are grouped together instead of being padded to the
+    length of a long text chunk. A batch holds at most token_budget
+    padded tokens (and at most batch_size texts).
+
+    With a pool, ingests of at least pool_threshold uncached texts are
+    encoded across worker processes instead of on the calling thread.
     """
 
-    def __init__(self, model: EmbeddingModel, batch_size: int = 32):
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        batch_size: int = 256,
+        cache: Optional[EmbeddingCache] = None,
+        token_budget: int = 8192,
+        pool: Optional[EmbeddingPool] = None,
+        pool_threshold: int = 2000,
+    ):
         self.model = model
         self.batch_size = batch_size
+        self.token_budget = token_budget
+        self.cache = cache
+        self.cache_stats: Dict = {}
+        self.pool = pool
+        self.pool_threshold = pool_threshold
+
+        # Uncached texts already encoded by the current embed_stream()
+        self._streamed_misses = 0
 
     def embed_chunks(self, chunks: List[Dict]) -> List[Dict]:
         """
         Returns a flat list of embedded chunks.
         Each chunk corresponds to exactly one embedding.
         """
+        self.cache_stats = {}
 
         # Embed everything that can answer a question
         embeddable = [
@@ -28,32 +58,139 @@ class Embedder:
             return []
 
         texts = [c["text"] for c in embeddable]
+        vectors = self._embed(texts)
+
         embedded: List[Dict] = []
+        for chunk, vector in zip(embeddable, vectors):
+            embedded.append({
+                "embedding": vector,
+                "text": chunk["text"],
+                "metadata": {
+                    "chunk_id": chunk.get("chunk_id"),
+                    "block_id": chunk.get("block_id"),
+                    "block_type": chunk.get("block_type"),
+                    "table_id": chunk.get("table_id"),
+                    "row_index": chunk.get("row_index"),
+                    "source": chunk.get("source"),
+                    "page": chunk.get("page"),
+                    "doc_level": chunk.get("doc_level", False),
+                },
+            })
+
+        return embedded
+
+    def embed_stream(self, chunks: Iterable[Dict], window: int = 512) -> Iterator[List[Dict]]:
+        """
+        Streaming embed_chunks: embeds chunks window by window so only one
+        window is held in memory. cache_stats covers the whole stream.
+        """
+        hits = misses = 0
+        batch: List[Dict] = []
+        self._streamed_misses = 0
+
+        def flush_window() -> List[Dict]:
+            nonlocal hits, misses
+            embedded = self.embed_chunks(batch)
+            hits += self.cache_stats.get("hits", 0)
+            misses += self.cache_stats.get("misses", 0)
+            self._streamed_misses = misses
+            self.cache_stats = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            }
+            return embedded
+
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= window:
+                embedded = flush_window()
+                batch = []
+                if embedded:
+                    yield embedded
+
+        if batch:
+            embedded = flush_window()
+            if embedded:
+                yield embedded
+
+        self._streamed_misses = 0
+
+    def _embed(self, texts: List[str]) -> List:
+        """
+        One vector per text, in order. Cache hits are reused; each
+        distinct miss is encoded once.
+        """
+        namespace = self.model.cache_namespace
+        cached: Dict = {}
+        if self.cache is not None:
+            cached = self.cache.get_many(namespace, texts)
+
+        hashes = [text_hash(t) for t in texts]
+        misses: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached:
+                misses.setdefault(h, t)
+
+        miss_hashes = list(misses)
+        miss_texts = list(misses.values())
+        fresh: Dict[str, object] = {}
 
-        for i in range(0, len(texts), self.batch_size):
-            batch_texts = texts[i:i + self.batch_size]
-            batch_chunks = embeddable[i:i + self.batch_size]
+        batches = self._length_batches(miss_texts)
+        text_batches = [[miss_texts[j] for j in batch] for batch in batches]
 
-            vectors = self.model.embed_texts(batch_texts)
+        # A stream switches to the pool once its running total is large
+        total_misses = self._streamed_misses + len(miss_texts)
+        if self.pool is not None and total_misses >= self.pool_threshold:
+            encoded = self.pool.encode_batches(text_batches)
+        else:
+            encoded = (
+                self.model.embed_texts(t, batch_size=len(t))
+                for t in text_batches
+            )
 
-            if len(vectors) != len(batch_chunks):
+        for batch, batch_texts, vectors in zip(batches, text_batches, encoded):
+            batch_hashes = [miss_hashes[j] for j in batch]
+
+            if len(vectors) != len(batch_texts):
                 raise RuntimeError("Embedding count mismatch")
 
-            for chunk, vector in zip(batch_chunks, vectors):
-                embedded.append({
-                    "embedding": vector,
-                    "text": chunk["text"],
-                    "metadata": {
-                        "chunk_id": chunk.get("chunk_id"),
-                        "block_id": chunk.get("block_id"),
-                        "block_type": chunk.get("block_type"),
-                        "table_id": chunk.get("table_id"),
-                        "row_index": chunk.get("row_index"),
-                        "source": chunk.get("source"),
-                        "page": chunk.get("page"),
-                        "doc_level": chunk.get("doc_level", False),
-                    },
-                })
+            fresh.update(zip(batch_hashes, vectors))
 
-        return embedded
+            if self.cache is not None:
+                self.cache.put_many(namespace, batch_texts, vectors)
+
+        hits = sum(1 for h in hashes if h in cached)
+        self.cache_stats = {
+            "hits": hits,
+            "misses": len(texts) - hits,
+            "hit_rate": round(hits / len(texts), 4) if texts else 0.0,
+        }
+
+        return [cached[h] if h in cached else fresh[h] for h in hashes]
+
+    def _length_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Positions of texts grouped into batches of similar token length.
+        A batch costs len(batch) * longest tokens once padded, so it is
+        closed as soon as that would exceed the token budget.
+        """
+        lengths = self.model.token_lengths(texts)
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+        batches: List[List[int]] = []
+        batch: List[int] = []
+
+        for i in order:
+            # Sorted ascending, so the newest text is the longest
+            padded = (len(batch) + 1) * lengths[i]
+            if batch and (padded > self.token_budget or len(batch) >= self.batch_size):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+
+        if batch:
+            batches.append(batch)
+
+        return batches
 
@@ -1,30 +1,161 @@
 from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import List, Dict
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+from .onnx_backend import BACKEND_TORCH, BACKEND_ONNX_INT8, load_model
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split())
 
 
 class EmbeddingModel:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        query_cache_size: int = 1024,
+        backend: str = BACKEND_TORCH,
+        quantization: str = "avx2",
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.quantization = quantization
+        self.model = load_model(SentenceTransformer, model_name, backend, quantization)
 
-    def embed_texts(self, texts: List[str]):
+        # LRU of normalized query text -> vector; repeated questions
+        # skip the forward pass entirely
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+
+    def embed_texts(self, texts: List[str], batch_size: int = 32):
         if not texts:
             return []
 
         return self.model.encode(
             texts,
+            batch_size=batch_size,
             normalize_embeddings=True,
             show_progress_bar=False,
         )
 
+    @property
+    def cache_namespace(self) -> str:
+        """
+        Embedding cache key for this model: vectors from another backend
+        or int8 kernel target differ slightly and must not be mixed in.
+        """
+        if self.backend == BACKEND_ONNX_INT8:
+            return f"{self.model_name}|{self.backend}-{self.quantization}"
+        return f"{self.model_name}|{self.backend}"
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    def max_chunk_tokens(self) -> int:
+        """
+        Longest text (in tokens, special tokens excluded) the model
+        embeds without truncation.
+        """
+        specials = self.model.tokenizer.num_special_tokens_to_add(pair=False)
+        return self.model.max_seq_length - specials
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """
+        Tokenized length of each text (special tokens included),
+        capped at the model's max sequence length.
+        """
+        if not texts:
+            return []
+
+        max_length = self.model.max_seq_length
+        encoded = self.model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=max_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
     def embed_query(self, query: str):
         if not query:
             raise ValueError("Query text is empty")
 
-        return self.model.encode(
-            [query],
-            normalize_embeddings=True,
-            show_progress_bar=False,
-        )[0]
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: List[str]):
+        """
+        Encodes several queries in one forward pass.
+        Cached queries are served from the LRU; only misses hit the model.
+        """
+        if any(not q for q in queries):
+            raise ValueError("Query text is empty")
+
+        keys = [normalize_query(q) for q in queries]
+        found = self._cache_get(keys)
+
+        misses = list(dict.fromkeys(k for k in keys if k not in found))
+        if misses:
+            vectors = self.model.encode(
+                misses,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            fresh = dict(zip(misses, vectors))
+            self._cache_put(fresh)
+            found.update(fresh)
+
+        if not keys:
+            return np.empty((0, self.dimension), dtype="float32")
+
+        return np.stack([found[k] for k in keys])
+
+    # -----------------------------
+    # QUERY CACHE
+    # -----------------------------
+
+    def _cache_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._query_cache_lock:
+            for key in keys:
+                vector = self._query_cache.get(key)
+                if vector is None:
+                    self.query_cache_misses += 1
+                    continue
+
+                self._query_cache.move_to_end(key)
+                self.query_cache_hits += 1
+                found[key] = vector
+
+        return found
+
+    def _cache_put(self, vectors: Dict[str, np.ndarray]):
+        if self.query_cache_size <= 0:
+            return
+
+        with self._query_cache_lock:
+            for key, vector in vectors.items():
+                self._query_cache[key] = vector
+                self._query_cache.move_to_end(key)
+
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def query_cache_stats(self) -> Dict:
+        with self._query_cache_lock:
+            lookups = self.query_cache_hits + self.query_cache_misses
+            return {
+                "size": len(self._query_cache),
+                "max_size": self.query_cache_size,
+                "hits": self.query_cache_hits,
+                "misses": self.query_cache_misses,
+                "hit_rate": round(self.query_cache_hits / lookups, 4) if lookups else 0.0,
+            }
 
     @property
     def dimension(self) -> int:
@@ -33,4 +164,3 @@ class EmbeddingModel:
         Required for initializing FAISS index.
         """
         return self.model.get_sentence_embedding_dimension()
-
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx_int8"
+
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# Exported / quantized models are written here once and reused
+ONNX_MODEL_DIR = Path("data/onnx_models")
+
+
+def _int8_file(quantization: str) -> str:
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def load_model(model_cls, model_name: str, backend: str = BACKEND_TORCH, quantization: str = "avx2"):
+    """
+    Loads a SentenceTransformer or CrossEncoder on the requested backend.
+
+    - torch      the stock PyTorch model
+    - onnx       ONNX Runtime, fp32 (exported on first use)
+    - onnx_int8  ONNX Runtime with dynamic int8 quantization; the
+                 quantized graph is exported once to ONNX_MODEL_DIR
+
+    quantization picks the int8 kernel target: arm64 | avx2 | avx512 |
+    avx512_vnni. The ONNX backends need `sentence-transformers[onnx]`.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unsupported model backend: {backend}. "
+            f"Supported backends: {BACKENDS}"
+        )
+
+    if backend == BACKEND_TORCH:
+        return model_cls(model_name)
+
+    if backend == BACKEND_ONNX:
+        return model_cls(model_name, backend="onnx")
+
+    local_dir = ONNX_MODEL_DIR / model_name.replace("/", "__")
+    int8_file = _int8_file(quantization)
+
+    if not (local_dir / int8_file).exists():
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        print(f"INFO: Exporting int8 ONNX model for {model_name} ({quantization})")
+        model = model_cls(model_name, backend="onnx")
+        model.save(str(local_dir))
+        export_dynamic_quantized_onnx_model(
+            model,
+            quantization_config=quantization,
+            model_name_or_path=str(local_dir),
+        )
+
+    return model_cls(
+        str(local_dir),
+        backend="onnx",
+        model_kwargs={"file_name": int8_file},
+    )
@@ -0,0 +1,124 @@
+"""
+Checks that an ONNX backend stays close to the torch reference.
+
+    python -m app.embeddings.parity_check --backend onnx_int8
+
+- embeddings: cosine similarity to the torch vector, per text
+- reranking: top-k overlap and Spearman correlation of the scores
+
+Exits non-zero when any check is outside tolerance.
+"""
+from typing import List
+import argparse
+import sys
+import numpy as np
+from sentence_transformers import SentenceTransformer, CrossEncoder
+
+from app.embeddings.onnx_backend import (
+    BACKEND_TORCH,
+    BACKEND_ONNX_INT8,
+    BACKENDS,
+    load_model,
+)
+from app.retrieval.reranker import RERANKER_MODEL
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+SAMPLE_QUERY = "What is the maximum operating temperature of the inverter?"
+
+SAMPLE_PASSAGES = [
+    "The inverter operates between -25 °C and 60 °C ambient temperature.",
+    "Above 45 °C the output power is derated linearly.",
+    "Install the unit vertically on a non-flammable wall.",
+    "Keep at least 300 mm of clearance above and below the enclosure.",
+    "Rated AC output power: 5000 W at 230 V, 50 Hz.",
+    "Maximum DC input voltage is 600 V; MPPT range 120-550 V.",
+    "Use copper conductors rated for at least 90 °C.",
+    "The warranty does not cover damage caused by incorrect wiring.",
+    "Protection class IP65, suitable for outdoor installation.",
+    "Disconnect both AC and DC sources before opening the cover.",
+]
+
+
+def _spearman(a: np.ndarray, b: np.ndarray) -> float:
+    ra = np.argsort(np.argsort(a)).astype("float64")
+    rb = np.argsort(np.argsort(b)).astype("float64")
+    ra -= ra.mean()
+    rb -= rb.mean()
+    return float((ra @ rb) / np.sqrt((ra @ ra) * (rb @ rb)))
+
+
+def check_embeddings(backend: str, quantization: str, texts: List[str], min_cosine: float) -> bool:
+    reference = load_model(SentenceTransformer, EMBEDDING_MODEL, BACKEND_TORCH)
+    candidate = load_model(SentenceTransformer, EMBEDDING_MODEL, backend, quantization)
+
+    ref = reference.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+    got = candidate.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+
+    cosine = np.sum(ref * got, axis=1)
+    ok = float(cosine.min()) >= min_cosine
+
+    print(
+        f"Embeddings: min cosine {cosine.min():.4f}, "
+        f"mean {cosine.mean():.4f} (tolerance {min_cosine}) "
+        f"-> {'OK' if ok else 'FAIL'}"
+    )
+    return ok
+
+
+def check_rerank(
+    backend: str,
+    quantization: str,
+    query: str,
+    passages: List[str],
+    top_k: int,
+    min_spearman: float,
+) -> bool:
+    reference = load_model(CrossEncoder, RERANKER_MODEL, BACKEND_TORCH)
+    candidate = load_model(CrossEncoder, RERANKER_MODEL, backend, quantization)
+
+    pairs = [(query, p) for p in passages]
+    ref = np.asarray(reference.predict(pairs))
+    got = np.asarray(candidate.predict(pairs))
+
+    ref_top = set(np.argsort(-ref)[:top_k].tolist())
+    got_top = set(np.argsort(-got)[:top_k].tolist())
+    overlap = len(ref_top & got_top) / float(top_k)
+    rho = _spearman(ref, got)
+
+    ok = overlap == 1.0 and rho >= min_spearman
+
+    print(
+        f"Rerank: top-{top_k} overlap {overlap:.2f}, "
+        f"spearman {rho:.4f} (tolerance {min_spearman}) "
+        f"-> {'OK' if ok else 'FAIL'}"
+    )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default=BACKEND_ONNX_INT8, choices=BACKENDS)
+    parser.add_argument("--quantization", default="avx2")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--min-spearman", type=float, default=0.9)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [SAMPLE_QUERY] + SAMPLE_PASSAGES
+
+    ok = check_embeddings(args.backend, args.quantization, texts, args.min_cosine)
+    ok &= check_rerank(
+        args.backend,
+        args.quantization,
+        SAMPLE_QUERY,
+        SAMPLE_PASSAGES,
+        args.top_k,
+        args.min_spearman,
+    )
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+import multiprocessing
+import os
+import numpy as np
+
+from .onnx_backend import BACKEND_TORCH
+
+# Set in each worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_name: str, backend: str, quantization: str, threads: int):
+    global _worker_model
+
+    try:
+        import torch
+        # Workers split the cores between them instead of oversubscribing
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from .model import EmbeddingModel
+    _worker_model = EmbeddingModel(
+        model_name,
+        query_cache_size=0,
+        backend=backend,
+        quantization=quantization,
+    )
+
+
+def _encode(texts: List[str]) -> np.ndarray:
+    return np.asarray(
+        _worker_model.embed_texts(texts, batch_size=len(texts)),
+        dtype="float32",
+    )
+
+
+class EmbeddingPool:
+    """
+    Process pool for large ingests, with the embedding model loaded once
+    per worker. Batches are spread over the workers and come back in
+    submission order.
+
+    Workers are spawned (not forked, torch does not survive a fork) on
+    first use and kept for later ingests.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        backend: str = BACKEND_TORCH,
+        quantization: str = "avx2",
+    ):
+        self.model_name = model_name
+        self.workers = workers
+        self.backend = backend
+        self.quantization = quantization
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.backend, self.quantization, threads),
+                )
+                print(f"INFO: Embedding pool started ({self.workers} workers)")
+            return self._executor
+
+    def encode_batches(self, batches: List[List[str]]) -> List[np.ndarray]:
+        """
+        One array of vectors per batch, in the order given.
+
+        An ingest window usually sorts into only one or two length
+        batches, so batches are split until every worker has a piece
+        and the pieces are stitched back together.
+        """
+        splits = -(-self.workers // max(1, len(batches)))
+
+        pieces: List[List[str]] = []
+        owners: List[int] = []
+        for i, batch in enumerate(batches):
+            size = max(1, -(-len(batch) // splits))
+            for start in range(0, len(batch), size):
+                pieces.append(batch[start:start + size])
+                owners.append(i)
+
+        parts: List[List[np.ndarray]] = [[] for _ in batches]
+        for owner, vectors in zip(owners, self._get_executor().map(_encode, pieces)):
+            parts[owner].append(vectors)
+
+        return [np.vstack(p) if p else np.empty((0, 0), dtype="float32") for p in parts]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,119 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+import os
+import gzip
+import json
+import tempfile
+
+# Bumped when blocks gain fields that consumers rely on
+# (2: table rows carry "cells", 3: and their table's "headers")
+BLOCK_FORMAT = 3
+
+
+class BlockCache:
+    """
+    Parsed blocks (the output of iter_document) per file content hash,
+    so documents can be re-chunked and re-embedded without running
+    pdfplumber / camelot again.
+
+    One entry per sha256:
+    - <sha256>.blocks.jsonl.gz   one JSON block per line, gzip-compressed
+    - <sha256>.json              per-page hashes and parser stats
+
+    Entries are written through while a document is parsed and only
+    become visible once parsing has finished (header last).
+    """
+
+    def __init__(self, folder_path: str):
+        self.folder = Path(folder_path)
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def _blocks_path(self, sha256: str) -> Path:
+        return self.folder / f"{sha256}.blocks.jsonl.gz"
+
+    def _header_path(self, sha256: str) -> Path:
+        return self.folder / f"{sha256}.json"
+
+    def _temp_file(self, path: Path):
+        # Unique per writer: the same bytes uploaded under two names are
+        # parsed by two jobs at once and must not share a temp file
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix=path.name + ".", suffix=".tmp")
+        return os.fdopen(fd, "wb"), Path(tmp)
+
+    def has(self, sha256: str) -> bool:
+        return self._header_path(sha256).exists()
+
+    def header(self, sha256: str) -> Dict:
+        with open(self._header_path(sha256), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def format(self, sha256: str) -> int:
+        return self.header(sha256).get("format", 1)
+
+    def is_current(self, sha256: str) -> bool:
+        """
+        False for entries written in an older block format; those are
+        still usable, but re-parsing the file gives complete blocks.
+        """
+        return self.format(sha256) >= BLOCK_FORMAT
+
+    def iter_blocks(self, sha256: str, source: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Cached blocks in parse order. source, if given, overrides the
+        stored one (the same bytes may have been cached under another
+        filename).
+        """
+        with gzip.open(self._blocks_path(sha256), "rt", encoding="utf-8") as f:
+            for line in f:
+                block = json.loads(line)
+                if source is not None:
+                    block["source"] = source
+                yield block
+
+    def write_through(
+        self,
+        sha256: str,
+        blocks: Iterable[Dict],
+        stats: Optional[Dict] = None,
+        page_hashes: Optional[List[str]] = None,
+    ) -> Iterator[Dict]:
+        """
+        Yields blocks unchanged while writing them to the cache. The
+        entry is committed only if the input is consumed to the end;
+        stats and page_hashes are read at that point.
+        """
+        blocks_path = self._blocks_path(sha256)
+        header_path = self._header_path(sha256)
+        raw, tmp_path = self._temp_file(blocks_path)
+        header_tmp = None
+
+        try:
+            with raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                for block in blocks:
+                    f.write(json.dumps(block, separators=(",", ":")))
+                    f.write("\n")
+                    yield block
+
+            raw, header_tmp = self._temp_file(header_path)
+            with raw:
+                raw.write(json.dumps({
+                    "format": BLOCK_FORMAT,
+                    "pages": list(page_hashes or []),
+                    "stats": dict(stats or {}),
+                }).encode("utf-8"))
+
+            # Both replaces are atomic; a concurrent writer of the same
+            # content hash wrote identical blocks, so whichever lands
+            # last leaves a complete entry
+            os.replace(tmp_path, blocks_path)
+            os.replace(header_tmp, header_path)
+
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            if header_tmp is not None:
+                header_tmp.unlink(missing_ok=True)
+
+    def remove(self, sha256: str):
+        # Header first so a half-removed entry is never read
+        self._header_path(sha256).unlink(missing_ok=True)
+        self._blocks_path(sha256).unlink(missing_ok=True)
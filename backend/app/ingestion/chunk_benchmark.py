@@ -0,0 +1,88 @@
+"""
+Benchmarks the token-aware chunker against the character splitter.
+
+    python -m app.ingestion.chunk_benchmark data/raw_uploads/manual.pdf
+
+- throughput: blocks and chunks per second (parsing is not timed)
+- sizing: mean / max tokens per chunk, and chunks the embedding model
+  would silently truncate
+"""
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import argparse
+import sys
+import time
+import numpy as np
+
+from app.embeddings.model import EmbeddingModel
+from app.ingestion.loader import load_document
+from app.ingestion.chunker import iter_chunks, iter_token_chunks
+
+
+def _time_chunker(
+    chunker: Callable[[Iterable[Dict]], Iterator[Dict]],
+    blocks: List[Dict],
+    repeat: int,
+) -> Tuple[List[Dict], float]:
+    best = float("inf")
+    chunks: List[Dict] = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(chunker(blocks))
+        best = min(best, time.perf_counter() - start)
+
+    return chunks, best
+
+
+def _report(name: str, blocks: List[Dict], chunks: List[Dict], seconds: float, model: EmbeddingModel):
+    encoded = model.tokenizer(
+        [c["text"] for c in chunks],
+        add_special_tokens=True,
+        verbose=False,
+    )["input_ids"]
+    lengths = np.array([len(ids) for ids in encoded] or [0])
+    truncated = int((lengths > model.model.max_seq_length).sum())
+
+    print(
+        f"{name:>6}: {len(chunks)} chunks in {seconds * 1000:.1f} ms "
+        f"({len(blocks) / seconds:,.0f} blocks/s, {len(chunks) / seconds:,.0f} chunks/s) | "
+        f"tokens mean {lengths.mean():.0f}, max {lengths.max()} | "
+        f"truncated {truncated}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    blocks: List[Dict] = []
+    for file_path in args.files:
+        blocks.extend(load_document(file_path))
+    print(f"Loaded {len(blocks)} blocks from {len(args.files)} file(s)")
+
+    model = EmbeddingModel(query_cache_size=0)
+    max_tokens = model.max_chunk_tokens()
+
+    def token_chunker(items: Iterable[Dict]) -> Iterator[Dict]:
+        return iter_token_chunks(
+            items,
+            model.tokenizer,
+            max_tokens,
+            overlap_tokens=args.overlap_tokens,
+        )
+
+    chunks, seconds = _time_chunker(iter_chunks, blocks, args.repeat)
+    _report("chars", blocks, chunks, seconds, model)
+
+    chunks, seconds = _time_chunker(token_chunker, blocks, args.repeat)
+    _report("token", blocks, chunks, seconds, model)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,33 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Tuple
+from itertools import islice
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import uuid
 
+# Chunks shorter than this (in characters) carry no useful content
+MIN_CHUNK_CHARS = 30
+
+# Preferred token-split points, searched in the last quarter of a window
+SENTENCE_ENDS = (".", "!", "?", ":", ";")
+
 
 def _new_chunk_id() -> str:
     return uuid.uuid4().hex
 
 
 def chunk_pages(blocks: List[Dict]) -> List[Dict]:
+    return list(iter_chunks(blocks))
+
+
+def iter_chunks(blocks: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Streaming chunk_pages: chunks are yielded as blocks arrive.
+    """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=150,
         separators=["\n\n", "\n", ". ", " ", ""],
     )
 
-    chunks: List[Dict] = []
-
     for block in blocks:
         text = block.get("text", "").strip()
         if not text:
@@ -34,13 +46,13 @@ def chunk_pages(blocks: List[Dict]) -> List[Dict]:
         # TABLE ROWS (ATOMIC)
         # -----------------------------
         if block_type == "table_row":
-            chunks.append({
+            yield {
                 "chunk_id": _new_chunk_id(),
                 "text": text,
                 **base_metadata,
                 "table_id": block.get("table_id"),
                 "row_index": block.get("row_index"),
-            })
+            }
             continue
 
         # -----------------------------
@@ -49,15 +61,15 @@ def chunk_pages(blocks: List[Dict]) -> List[Dict]:
         if block.get("doc_level"):
             split_texts = splitter.split_text(text)
             for chunk_text in split_texts:
-                if len(chunk_text.strip()) < 30:
+                if len(chunk_text.strip()) < MIN_CHUNK_CHARS:
                     continue
 
-                chunks.append({
+                yield {
                     "chunk_id": _new_chunk_id(),
                     "text": chunk_text.strip(),
                     **base_metadata,
                     "doc_level": True,
-                })
+                }
             continue
 
         # -----------------------------
@@ -65,16 +77,203 @@ def chunk_pages(blocks: List[Dict]) -> List[Dict]:
         # -----------------------------
         split_texts = splitter.split_text(text)
         for chunk_text in split_texts:
-            if len(chunk_text.strip()) < 30:
+            if len(chunk_text.strip()) < MIN_CHUNK_CHARS:
                 continue
 
-            chunks.append({
+            yield {
                 "chunk_id": _new_chunk_id(),
                 "text": chunk_text.strip(),
                 **base_metadata,
                 "doc_level": False,
-            })
+            }
+
+# -----------------------------
+# TOKEN-AWARE CHUNKING
+# -----------------------------
+
+def _batched(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _word_start(offsets: List[Tuple[int, int]], i: int) -> bool:
+    # Token i starts a new word (not a "##" continuation of token i - 1)
+    return offsets[i][0] > offsets[i - 1][1]
+
+
+def _split_end(text: str, offsets: List[Tuple[int, int]], start: int, end: int) -> int:
+    """
+    Exclusive end token for a window [start, end): the last sentence end
+    in the window's final quarter, else the last word boundary.
+    """
+    lowest = start + max(1, (end - start) * 3 // 4)
+
+    for i in range(end, lowest - 1, -1):
+        if _word_start(offsets, i) and text[offsets[i - 1][1] - 1] in SENTENCE_ENDS:
+            return i
+
+    for i in range(end, start, -1):
+        if _word_start(offsets, i):
+            return i
+
+    return end
+
+
+def split_by_tokens(
+    text: str,
+    offsets: List[Tuple[int, int]],
+    max_tokens: int,
+    overlap_tokens: int = 32,
+) -> List[str]:
+    """
+    Splits text into pieces of at most max_tokens tokens, overlapping by
+    about overlap_tokens, using the tokenizer's character offsets. Cuts
+    fall on sentence ends where possible and never inside a word.
+    """
+    n = len(offsets)
+    if n <= max_tokens:
+        return [text]
+
+    pieces: List[str] = []
+    start = 0
+
+    while start < n:
+        end = min(start + max_tokens, n)
+        if end < n:
+            end = _split_end(text, offsets, start, end)
+
+        pieces.append(text[offsets[start][0]:offsets[end - 1][1]])
+        if end >= n:
+            break
+
+        start = max(end - overlap_tokens, start + 1)
+        while start < end and not _word_start(offsets, start):
+            start += 1
+
+    return pieces
+
 
-    return chunks
+def _text_chunk(text: str, block: Dict, doc_level: bool) -> Dict:
+    return {
+        "chunk_id": _new_chunk_id(),
+        "text": text,
+        "source": block.get("source"),
+        "page": block.get("page"),
+        "block_id": block.get("block_id"),
+        "block_type": "text",
+        "doc_level": doc_level,
+    }
+
+
+def iter_token_chunks(
+    blocks: Iterable[Dict],
+    tokenizer,
+    max_tokens: int,
+    overlap_tokens: int = 32,
+    batch_size: int = 256,
+) -> Iterator[Dict]:
+    """
+    iter_chunks measured in embedding-model tokens instead of characters.
+
+    Blocks are tokenized batch_size at a time with the model's (fast)
+    tokenizer, so no chunk exceeds max_tokens and none is silently
+    truncated at embedding time:
+    - table rows stay atomic
+    - doc-level blocks are split on their own and keep doc_level
+    - longer text blocks are split on token offsets (see split_by_tokens)
+    - consecutive short text blocks of the same page are packed together
+      up to max_tokens instead of becoming many tiny chunks
+    """
+    pack: List[Dict] = []
+    pack_tokens = 0
+
+    def packed() -> List[Dict]:
+        nonlocal pack, pack_tokens
+        if not pack:
+            return []
+
+        first = pack[0]
+        text = "\n".join(block["text"].strip() for block in pack)
+        pack, pack_tokens = [], 0
+
+        if len(text) < MIN_CHUNK_CHARS:
+            return []
+
+        return [_text_chunk(text, first, doc_level=False)]
+
+    for batch in _batched(blocks, batch_size):
+        texts = [
+            block.get("text", "").strip() for block in batch
+            if block.get("block_type", "text") != "table_row"
+        ]
+        encoded = iter(
+            tokenizer(
+                texts,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                verbose=False,
+            )["offset_mapping"]
+            if texts else []
+        )
+
+        for block in batch:
+            text = block.get("text", "").strip()
+
+            # -----------------------------
+            # TABLE ROWS (ATOMIC)
+            # -----------------------------
+            if block.get("block_type", "text") == "table_row":
+                if not text:
+                    continue
+
+                yield from packed()
+                yield {
+                    "chunk_id": _new_chunk_id(),
+                    "text": text,
+                    "source": block.get("source"),
+                    "page": block.get("page"),
+                    "block_id": block.get("block_id"),
+                    "block_type": "table_row",
+                    "table_id": block.get("table_id"),
+                    "row_index": block.get("row_index"),
+                }
+                continue
+
+            offsets = next(encoded)
+            if not text:
+                continue
+
+            # -----------------------------
+            # DOC-LEVEL BLOCKS (NEVER PACKED)
+            # -----------------------------
+            if block.get("doc_level"):
+                yield from packed()
+                for piece in split_by_tokens(text, offsets, max_tokens, overlap_tokens):
+                    if len(piece.strip()) >= MIN_CHUNK_CHARS:
+                        yield _text_chunk(piece.strip(), block, doc_level=True)
+                continue
+
+            # -----------------------------
+            # NORMAL TEXT
+            # -----------------------------
+            same_page = pack and (
+                (pack[0].get("source"), pack[0].get("page"))
+                == (block.get("source"), block.get("page"))
+            )
+            if not same_page or pack_tokens + len(offsets) + 1 > max_tokens:
+                yield from packed()
+
+            if len(offsets) <= max_tokens:
+                pack.append(block)
+                pack_tokens += len(offsets) + 1
+                continue
 
+            for piece in split_by_tokens(text, offsets, max_tokens, overlap_tokens):
+                if len(piece.strip()) >= MIN_CHUNK_CHARS:
+                    yield _text_chunk(piece.strip(), block, doc_level=False)
 
+    yield from packed()
@@ -1,15 +1,28 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 
-from .parser import parse_pdf, parse_docx, parse_txt
+from .parser import iter_pdf_blocks, parse_docx, parse_txt
 
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
 
+# Types with page numbers, and so per-page hashes
+PAGED_EXTENSIONS = {".pdf"}
 
-def load_document(file_path: Path) -> List[Dict]:
+
+def iter_document(
+    file_path: Path,
+    stats: Optional[Dict] = None,
+    previous_hashes: Optional[List[str]] = None,
+    page_hashes: Optional[List[str]] = None,
+    previous_headers: Optional[Dict[int, List[str]]] = None,
+) -> Iterator[Dict]:
     """
     Entry point for document ingestion.
-    Detects file type and routes to the appropriate parser.
+    Detects file type and routes to the appropriate parser, yielding
+    blocks as they are parsed (PDFs stream page by page).
+    stats, if given, collects parser statistics (PDF only).
+    page_hashes / previous_hashes / previous_headers: see
+    iter_pdf_blocks (PDF only).
     """
 
     if not file_path.exists():
@@ -22,7 +35,13 @@ def load_document(file_path: Path) -> List[Dict]:
         )
 
     if file_path.suffix.lower() == ".pdf":
-        pages = parse_pdf(file_path)
+        pages = iter_pdf_blocks(
+            file_path,
+            stats=stats,
+            previous_hashes=previous_hashes,
+            page_hashes=page_hashes,
+            previous_headers=previous_headers,
+        )
     elif file_path.suffix.lower() == ".docx":
         pages = parse_docx(file_path)
     elif file_path.suffix.lower() == ".txt":
@@ -31,11 +50,11 @@ def load_document(file_path: Path) -> List[Dict]:
         raise RuntimeError("Unhandled file type")
 
     # 🔒 Filter out empty or malformed pages early
-    clean_pages: List[Dict] = []
     for page in pages:
         text = page.get("text", "")
         if text and text.strip():
-            clean_pages.append(page)
+            yield page
 
-    return clean_pages
 
+def load_document(file_path: Path, stats: Optional[Dict] = None) -> List[Dict]:
+    return list(iter_document(file_path, stats))
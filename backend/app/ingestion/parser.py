@@ -1,5 +1,7 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import re
 import uuid
 
@@ -7,6 +9,11 @@ import pdfplumber
 from docx import Document
 
 from .table_extractor import extract_tables
+from .pdf_pages import extract_page_range, read_page, page_hash
+from app.core import config
+
+# Below this many pages per worker, process startup costs more than it saves
+MIN_PAGES_PER_WORKER = 25
 
 
 # -----------------------------
@@ -31,36 +38,141 @@ def _new_block_id() -> str:
 # PDF Parsing
 # -----------------------------
 
-def parse_pdf(file_path: Path) -> List[Dict]:
-    blocks: List[Dict] = []
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    # A few ranges per worker so one dense range does not stall the rest
+    size = max(1, -(-page_count // (workers * 4)))
+    return [
+        (start, min(start + size, page_count))
+        for start in range(0, page_count, size)
+    ]
+
+
+def _iter_pages(
+    file_path: Path,
+    workers: int,
+    stats: Optional[Dict] = None,
+) -> Iterator[Tuple[Optional[str], bool]]:
+    """
+    (raw text, table candidate) per page, in page order. Large PDFs are
+    split into page ranges and read in a process pool.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+
+        if stats is not None:
+            stats["pages"] = page_count
+
+        workers = min(workers, page_count // MIN_PAGES_PER_WORKER)
+        if workers <= 1:
+            for page in pdf.pages:
+                yield read_page(page)
+                # Drop the parsed layout so memory stays flat
+                page.close()
+            return
+
+    ranges = _page_ranges(page_count, workers)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        # map() yields in submission order, so pages stay in order
+        results = pool.map(
+            extract_page_range,
+            [file_path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges],
+        )
+        for pages in results:
+            yield from pages
+
+
+def iter_pdf_blocks(
+    file_path: Path,
+    workers: Optional[int] = None,
+    stats: Optional[Dict] = None,
+    previous_hashes: Optional[List[str]] = None,
+    page_hashes: Optional[List[str]] = None,
+    previous_headers: Optional[Dict[int, List[str]]] = None,
+) -> Iterator[Dict]:
+    """
+    Streaming parse_pdf: text blocks are yielded page by page, table
+    rows once all pages have been read.
+
+    page_hashes, if given, receives the content hash of every page.
+    Pages whose hash matches previous_hashes (the hashes of an earlier
+    version, by page number) are skipped: no blocks, no camelot.
+    previous_headers (the earlier version's table header row per page)
+    lets tables on changed pages inherit a header from a skipped page.
+    """
+    if workers is None:
+        workers = config.PDF_PARSE_WORKERS
+    previous_headers = previous_headers or {}
 
     # -------- TEXT EXTRACTION --------
-    with pdfplumber.open(file_path) as pdf:
-        for page_index, page in enumerate(pdf.pages):
-            page_number = page_index + 1
+    # Pages with a ruling grid are the only ones camelot needs to see
+    table_pages: List[int] = []
+    unchanged_pages: List[int] = []
+    page_count = 0
+
+    pages = _iter_pages(file_path, workers, stats)
+
+    for page_index, (raw_text, candidate) in enumerate(pages):
+        page_number = page_index + 1
+        page_count += 1
+
+        if stats is not None:
+            stats["pages_read"] = page_count
+
+        digest = page_hash(raw_text, candidate)
+        if page_hashes is not None:
+            page_hashes.append(digest)
+
+        if (
+            previous_hashes is not None
+            and page_index < len(previous_hashes)
+            and previous_hashes[page_index] == digest
+        ):
+            if stats is not None:
+                stats["unchanged_pages"] = stats.get("unchanged_pages", 0) + 1
+            unchanged_pages.append(page_number)
+            continue
 
-            raw_text = page.extract_text()
-            if not raw_text:
-                continue
+        if candidate:
+            table_pages.append(page_number)
+
+        if not raw_text:
+            continue
 
-            cleaned = _clean_text(raw_text)
-            paragraphs = _split_paragraphs(cleaned)
+        cleaned = _clean_text(raw_text)
+        paragraphs = _split_paragraphs(cleaned)
 
-            for para_index, paragraph in enumerate(paragraphs):
-                blocks.append({
-                    "block_id": _new_block_id(),
-                    "text": paragraph,
-                    "source": file_path.name,
-                    "page": page_number,
-                    "doc_level": page_index == 0 and para_index == 0,
-                    "block_type": "text",
-                })
+        for para_index, paragraph in enumerate(paragraphs):
+            yield {
+                "block_id": _new_block_id(),
+                "text": paragraph,
+                "source": file_path.name,
+                "page": page_number,
+                "doc_level": page_index == 0 and para_index == 0,
+                "block_type": "text",
+            }
 
     # -------- TABLE EXTRACTION --------
-    table_rows = extract_tables(file_path)
+    table_rows = extract_tables(
+        file_path,
+        pages=table_pages,
+        total_pages=page_count,
+        workers=workers,
+        stats=stats,
+        seed_headers={
+            page: previous_headers[page]
+            for page in unchanged_pages
+            if page in previous_headers
+        },
+    )
 
     for row in table_rows:
-        blocks.append({
+        yield {
             "block_id": row["block_id"],
             "text": row["text"],
             "source": file_path.name,
@@ -68,10 +180,22 @@ def parse_pdf(file_path: Path) -> List[Dict]:
             "doc_level": False,
             "block_type": "table_row",
             "table_id": row.get("table_id"),
-            "row_index": row.get("table_row"),
-        })
+            "row_index": row.get("row_index"),
+            "cells": row.get("cells"),
+            "headers": row.get("headers"),
+        }
 
-    return blocks
+
+def parse_pdf(
+    file_path: Path,
+    workers: Optional[int] = None,
+    stats: Optional[Dict] = None,
+) -> List[Dict]:
+    """
+    stats, if given, is filled with page / table-page counts (kept up
+    to date while streaming, so it doubles as progress).
+    """
+    return list(iter_pdf_blocks(file_path, workers, stats))
 
 
 # -----------------------------
@@ -115,6 +239,9 @@ def parse_docx(file_path: Path) -> List[Dict]:
                 "block_type": "table_row",
                 "table_id": table_id,
                 "row_index": row_index,
+                "cells": {
+                    f"col_{i}": value for i, value in enumerate(values) if value
+                },
             })
 
     return blocks
@@ -0,0 +1,72 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import hashlib
+
+import pdfplumber
+
+
+# Kept apart from parser.py so spawned workers only import pdfplumber,
+# not camelot / pandas
+
+# Lattice tables need a ruling grid: at least this many horizontal and
+# this many vertical line / rect edges on the page
+MIN_RULING_EDGES = 2
+
+
+def has_ruling_lines(page) -> bool:
+    """
+    Cheap table-page test from the page's vector graphics (no text or
+    image analysis). Pages without a ruling grid cannot yield lattice
+    tables, so camelot can skip them.
+    """
+    if len(page.lines) + len(page.rects) == 0:
+        return False
+
+    return (
+        len(page.horizontal_edges) >= MIN_RULING_EDGES
+        and len(page.vertical_edges) >= MIN_RULING_EDGES
+    )
+
+
+def read_page(page) -> Tuple[Optional[str], bool]:
+    """
+    (raw text, may contain a lattice table) for one page.
+    """
+    return page.extract_text(), has_ruling_lines(page)
+
+
+def page_hash(text: Optional[str], candidate: bool) -> str:
+    """
+    Content hash of one page as read by read_page(). Table cell text is
+    part of the page text, so edited tables change the hash as well.
+    """
+    digest = hashlib.sha256((text or "").encode("utf-8"))
+    digest.update(b"\x01" if candidate else b"\x00")
+    return digest.hexdigest()
+
+
+def extract_page_range(file_path: Path, start: int, end: int) -> List[Tuple[Optional[str], bool]]:
+    """
+    read_page() for pages [start, end). Runs in a worker process, which
+    opens the PDF itself.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        pages = []
+        for i in range(start, end):
+            page = pdf.pages[i]
+            pages.append(read_page(page))
+            page.close()
+        return pages
+
+
+def find_table_pages(file_path: Path) -> Tuple[List[int], int]:
+    """
+    1-based numbers of the pages that pass the ruling-line prefilter,
+    plus the total page count.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        pages = [
+            i + 1 for i, page in enumerate(pdf.pages)
+            if has_ruling_lines(page)
+        ]
+        return pages, len(pdf.pages)
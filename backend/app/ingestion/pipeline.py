@@ -0,0 +1,378 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from collections import deque
+
+from .loader import iter_document
+from .chunker import iter_chunks, iter_token_chunks
+from .block_cache import BlockCache
+from app.embeddings.embedder import Embedder
+from app.retrieval.bm25_index import BM25Index
+from app.retrieval.table_store import TableStore
+
+
+def _counted(items: Iterable[Dict], counts: Dict, key: str) -> Iterator[Dict]:
+    for item in items:
+        counts[key] += 1
+        yield item
+
+
+def _table_rows(items: Iterable[Dict], table_store: TableStore, source: str) -> Iterator[Dict]:
+    # Stages structured table rows on their way to the chunker, so none
+    # are held back here until the end of the document
+    for item in items:
+        if _is_table_row(item):
+            table_store.stage(source, [item])
+        yield item
+
+
+def _is_table_row(block: Dict) -> bool:
+    return block.get("block_type") == "table_row" and bool(block.get("cells"))
+
+
+def _collected(items: Iterable[Dict], out: List[Dict]) -> Iterator[Dict]:
+    for item in items:
+        out.append(item)
+        yield item
+
+
+def _cache_revision(
+    block_cache: BlockCache,
+    previous_sha256: str,
+    sha256: str,
+    changed_blocks: List[Dict],
+    pages: List[int],
+    page_hashes: List[str],
+):
+    """
+    Cache entry for a revised PDF: the previous version's cached blocks
+    of unchanged pages plus the re-parsed blocks of changed pages, in
+    parse order (text by page, then table rows by page).
+    """
+    if block_cache.has(sha256):
+        return
+    if not block_cache.has(previous_sha256) or not block_cache.is_current(previous_sha256):
+        return
+
+    replaced = set(pages)
+    kept = [
+        block for block in block_cache.iter_blocks(previous_sha256)
+        if int(block["page"]) not in replaced
+    ]
+    merged = sorted(
+        kept + changed_blocks,
+        key=lambda block: (block.get("block_type") == "table_row", int(block["page"])),
+    )
+
+    header = block_cache.header(previous_sha256)
+    stats = {
+        **header["stats"],
+        "pages": len(page_hashes),
+        "pages_read": len(page_hashes),
+    }
+
+    # Drains the generator so the entry is committed
+    deque(block_cache.write_through(sha256, merged, stats, page_hashes), maxlen=0)
+
+
+def table_headers(block_cache: Optional[BlockCache], sha256: str) -> Optional[Dict[int, List[str]]]:
+    """
+    Last table header row per page of a cached version, as
+    index_changed_pages needs it; None if the entry is missing or older
+    than block rows carrying their headers.
+    """
+    if block_cache is None or not block_cache.has(sha256) or not block_cache.is_current(sha256):
+        return None
+
+    headers: Dict[int, List[str]] = {}
+    for block in block_cache.iter_blocks(sha256):
+        if block.get("block_type") == "table_row" and block.get("headers"):
+            headers[int(block["page"])] = block["headers"]
+    return headers
+
+
+# Block stream -> chunk stream
+Chunker = Callable[[Iterable[Dict]], Iterator[Dict]]
+
+
+def token_chunker(embedder: Embedder, max_tokens: int = 0, overlap_tokens: int = 32) -> Chunker:
+    """
+    iter_token_chunks bound to the embedder's tokenizer; max_tokens is
+    capped at (and 0 means) what the model embeds without truncation.
+    """
+    limit = embedder.model.max_chunk_tokens()
+    if max_tokens <= 0 or max_tokens > limit:
+        max_tokens = limit
+
+    def chunker(blocks: Iterable[Dict]) -> Iterator[Dict]:
+        return iter_token_chunks(
+            blocks,
+            embedder.model.tokenizer,
+            max_tokens,
+            overlap_tokens=overlap_tokens,
+        )
+
+    return chunker
+
+
+def _document_blocks(
+    file_path: Path,
+    source: str,
+    stats: Dict,
+    page_hashes: Optional[List[str]],
+    block_cache: Optional[BlockCache],
+    sha256: Optional[str],
+) -> Iterable[Dict]:
+    """
+    Blocks from the block cache when this content was parsed before,
+    otherwise parsed from the file (and written through to the cache).
+    """
+    if block_cache is None or not sha256:
+        return iter_document(file_path, stats, page_hashes=page_hashes)
+
+    # Older-format entries are re-parsed while the file is still there
+    if block_cache.has(sha256) and (
+        block_cache.is_current(sha256) or not file_path.exists()
+    ):
+        header = block_cache.header(sha256)
+        stats.update(header["stats"])
+        stats["cached_blocks"] = True
+        if page_hashes is not None:
+            page_hashes.extend(header["pages"])
+        return block_cache.iter_blocks(sha256, source=source)
+
+    if page_hashes is None:
+        page_hashes = []
+
+    return block_cache.write_through(
+        sha256,
+        iter_document(file_path, stats, page_hashes=page_hashes),
+        stats=stats,
+        page_hashes=page_hashes,
+    )
+
+
+def index_document(
+    file_path: Path,
+    source: str,
+    embedder: Embedder,
+    vector_store,
+    lock,
+    index_dir: str,
+    window: int = 512,
+    stats: Optional[Dict] = None,
+    progress: Optional[Callable[[str, Dict], None]] = None,
+    page_hashes: Optional[List[str]] = None,
+    block_cache: Optional[BlockCache] = None,
+    sha256: Optional[str] = None,
+    chunker: Chunker = iter_chunks,
+    lexical_index: Optional[BM25Index] = None,
+    table_store: Optional[TableStore] = None,
+) -> Dict:
+    """
+    Streaming parse → chunk → embed → index.
+
+    Blocks and chunks flow through generators and are embedded and
+    added window by window, so peak memory is bounded by the window
+    rather than the document. Each window is flushed as a segment.
+
+    Windows are staged: they are not searchable until the last one is
+    in, and then replace any previous version of the document in one
+    step (a version without chunks just removes it). If ingestion fails
+    part-way, only the staged rows are dropped and the previous version
+    stays live.
+
+    progress, if given, is called as progress(stage, counts) when
+    parsing starts and after every indexed window; counts include the
+    parser stats (pages / pages_read for PDFs).
+
+    page_hashes, if given, receives the per-page content hashes (PDF
+    only) for a later index_changed_pages().
+
+    With a block_cache and the file's sha256, a previously parsed file
+    is not parsed again: its cached blocks are chunked and embedded.
+
+    chunker turns the block stream into chunks (iter_chunks, or a
+    token_chunker). A lexical_index, if given, receives every change
+    made to the vector store. A table_store, if given, is handed the
+    table rows as they are parsed and swaps them in with the chunks.
+    """
+    counts = {"blocks": 0, "chunks": 0, "replaced_chunks": 0}
+    if stats is None:
+        stats = {}
+
+    def report(stage: str):
+        if progress:
+            progress(stage, {**stats, **counts})
+
+    report("parsing")
+
+    blocks = _counted(
+        _document_blocks(file_path, source, stats, page_hashes, block_cache, sha256),
+        counts,
+        "blocks",
+    )
+    if table_store is not None:
+        blocks = _table_rows(blocks, table_store, source)
+    windows = embedder.embed_stream(chunker(blocks), window)
+
+    try:
+        for embedded in windows:
+            with lock:
+                embeddings = [c["embedding"] for c in embedded]
+                texts = [c["text"] for c in embedded]
+                metadatas = [c["metadata"] for c in embedded]
+
+                # Hidden from search until the last window is in
+                vector_store.stage(source, embeddings, texts, metadatas)
+                if lexical_index is not None:
+                    lexical_index.stage(source, texts, metadatas)
+
+                # Append-only: writes just this window's vectors and records
+                vector_store.flush(index_dir)
+
+            counts["chunks"] += len(embedded)
+            report("indexing")
+
+    except Exception:
+        # Only the new version's rows go; the previous one stays live
+        with lock:
+            vector_store.discard_staged(source)
+            if lexical_index is not None:
+                lexical_index.discard_staged(source)
+            if table_store is not None:
+                table_store.discard_staged(source)
+        raise
+
+    # A version without any chunks replaces the old one with nothing
+    with lock:
+        counts["replaced_chunks"] = vector_store.commit_staged(source)
+        vector_store.flush(index_dir)
+
+        if lexical_index is not None:
+            lexical_index.commit_staged(source)
+            lexical_index.flush(index_dir)
+
+        if table_store is not None:
+            table_store.commit_staged(source)
+            table_store.flush(index_dir)
+
+    return counts
+
+
+def index_changed_pages(
+    file_path: Path,
+    source: str,
+    embedder: Embedder,
+    vector_store,
+    lock,
+    index_dir: str,
+    previous_hashes: List[str],
+    window: int = 512,
+    stats: Optional[Dict] = None,
+    progress: Optional[Callable[[str, Dict], None]] = None,
+    page_hashes: Optional[List[str]] = None,
+    chunker: Chunker = iter_chunks,
+    lexical_index: Optional[BM25Index] = None,
+    table_store: Optional[TableStore] = None,
+    block_cache: Optional[BlockCache] = None,
+    sha256: Optional[str] = None,
+    previous_sha256: Optional[str] = None,
+    previous_headers: Optional[Dict[int, List[str]]] = None,
+) -> Dict:
+    """
+    Incremental re-index of a revised PDF.
+
+    Every page is read and hashed, but only pages whose hash differs
+    from previous_hashes are parsed into blocks, table-extracted,
+    chunked and embedded. Their old chunks (and those of pages that no
+    longer exist) are then swapped for the new ones in one step, so a
+    failure leaves the previous version untouched.
+
+    Only changed pages are held in memory until the swap.
+
+    With a block_cache, the new revision (sha256) gets a complete cache
+    entry, merged from the cached blocks of previous_sha256.
+
+    previous_headers (see table_headers) lets a table on a changed page
+    inherit its header from an unchanged page, as in a full parse.
+    """
+    counts = {"blocks": 0, "chunks": 0, "replaced_chunks": 0, "changed_pages": 0}
+    if stats is None:
+        stats = {}
+    if page_hashes is None:
+        page_hashes = []
+
+    def report(stage: str):
+        if progress:
+            progress(stage, {**stats, **counts})
+
+    report("parsing")
+
+    changed_blocks: List[Dict] = []
+    blocks = _collected(
+        _counted(
+            iter_document(
+                file_path,
+                stats,
+                previous_hashes=previous_hashes,
+                page_hashes=page_hashes,
+                previous_headers=previous_headers,
+            ),
+            counts,
+            "blocks",
+        ),
+        changed_blocks,
+    )
+
+    embedded: List[Dict] = []
+    for batch in embedder.embed_stream(chunker(blocks), window):
+        embedded.extend(batch)
+        counts["chunks"] = len(embedded)
+        report("embedding")
+
+    # Changed pages, plus pages cut from the end of the document
+    pages = [
+        i + 1 for i, digest in enumerate(page_hashes)
+        if i >= len(previous_hashes) or previous_hashes[i] != digest
+    ]
+    pages += list(range(len(page_hashes) + 1, len(previous_hashes) + 1))
+    counts["changed_pages"] = len(pages)
+
+    if pages:
+        texts = [c["text"] for c in embedded]
+        metadatas = [c["metadata"] for c in embedded]
+
+        with lock:
+            counts["replaced_chunks"] = vector_store.replace_pages(
+                source,
+                pages,
+                embeddings=[c["embedding"] for c in embedded],
+                texts=texts,
+                metadatas=metadatas,
+            )
+            vector_store.flush(index_dir)
+
+            if lexical_index is not None:
+                lexical_index.replace_pages(source, pages, texts, metadatas)
+                lexical_index.flush(index_dir)
+
+            if table_store is not None:
+                table_store.replace_pages(
+                    source,
+                    pages,
+                    [b for b in changed_blocks if _is_table_row(b)],
+                )
+                table_store.flush(index_dir)
+
+    if block_cache is not None and sha256 and previous_sha256:
+        _cache_revision(
+            block_cache,
+            previous_sha256,
+            sha256,
+            changed_blocks,
+            pages,
+            page_hashes,
+        )
+
+    report("indexing")
+    return counts
@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+from threading import Lock
+import os
+import json
+import time
+import hashlib
+
+# Read size for hashing files on disk
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentRegistry:
+    """
+    Content-hash registry of indexed documents: filename -> sha256 of
+    the uploaded bytes (plus size / chunk count / per-page hashes / time).
+
+    Lets uploads be classified before any parsing:
+    - same bytes as an indexed document (any name) -> duplicate
+    - known name with different bytes             -> replacement
+    - otherwise                                   -> new
+
+    Stored as one JSON file, rewritten atomically on every change.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = Lock()
+        self._documents: Dict[str, Dict] = {}
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._documents = json.load(f)
+
+    def get(self, filename: str) -> Optional[Dict]:
+        with self._lock:
+            return self._documents.get(filename)
+
+    def filenames(self) -> List[str]:
+        with self._lock:
+            return list(self._documents)
+
+    def find_by_hash(self, sha256: str) -> Optional[str]:
+        """
+        Name of an indexed document with exactly these bytes, if any.
+        """
+        with self._lock:
+            for filename, entry in self._documents.items():
+                if entry["sha256"] == sha256:
+                    return filename
+        return None
+
+    def record(
+        self,
+        filename: str,
+        sha256: str,
+        size: int,
+        chunks: int,
+        pages: Optional[List[str]] = None,
+    ):
+        """
+        pages: per-page content hashes (PDF only), for incremental
+        re-ingestion of later revisions.
+        """
+        with self._lock:
+            self._documents[filename] = {
+                "sha256": sha256,
+                "size": size,
+                "chunks": chunks,
+                "pages": pages or [],
+                "indexed_at": time.time(),
+            }
+            self._write()
+
+    def remove(self, filename: str):
+        with self._lock:
+            if self._documents.pop(filename, None) is not None:
+                self._write()
+
+    def _write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._documents, f)
+
+        os.replace(tmp_path, self.path)
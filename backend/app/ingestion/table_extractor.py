@@ -1,10 +1,17 @@
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import re
 import camelot
 import uuid
 import pandas as pd
 
+from .pdf_pages import find_table_pages
+
+# Camelot is only worth a worker process once each gets this many pages
+MIN_TABLE_PAGES_PER_WORKER = 4
+
 
 # -----------------------------
 # Utilities
@@ -64,19 +71,97 @@ def split_wide_table_by_headers(df: pd.DataFrame) -> List[pd.DataFrame]:
 # Table Extraction
 # -----------------------------
 
-def extract_tables(file_path: Path) -> List[Dict]:
-    rows: List[Dict] = []
-    last_known_headers = None
-
+def _read_tables(file_path: Path, pages: List[int]) -> List[Tuple[str, pd.DataFrame]]:
+    """
+    (page, dataframe) for every lattice table on the given pages, in
+    page order. Also the worker entry point for the process pool.
+    """
     tables = camelot.read_pdf(
         str(file_path),
-        pages="all",
+        pages=",".join(str(p) for p in pages),
         flavor="lattice",
         strip_text="\n"
     )
+    return [(table.page, table.df) for table in tables]
+
+
+def _read_tables_parallel(
+    file_path: Path,
+    pages: List[int],
+    workers: int,
+) -> List[Tuple[str, pd.DataFrame]]:
+    workers = min(workers, len(pages) // MIN_TABLE_PAGES_PER_WORKER)
+    if workers <= 1:
+        return _read_tables(file_path, pages)
+
+    # Contiguous page groups, a few per worker, concatenated in order
+    size = -(-len(pages) // (workers * 2))
+    groups = [pages[i:i + size] for i in range(0, len(pages), size)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        results = pool.map(_read_tables, [file_path] * len(groups), groups)
+        return [table for tables in results for table in tables]
+
+
+def extract_tables(
+    file_path: Path,
+    pages: Optional[List[int]] = None,
+    total_pages: Optional[int] = None,
+    workers: int = 1,
+    stats: Optional[Dict] = None,
+    seed_headers: Optional[Dict[int, List[str]]] = None,
+) -> List[Dict]:
+    """
+    pages are the 1-based candidate table pages (parse_pdf passes the
+    ones its prefilter found); when omitted the prefilter runs here.
+    Camelot never sees the other pages. stats, if given, receives the
+    page counts.
+
+    seed_headers holds the last header row of pages that are not
+    extracted this time (page -> headers, from an earlier parse), so a
+    table continuing from one of them keeps its header as it would in
+    a full parse. Rows of tables with their own header row carry it as
+    "headers".
+    """
+    rows: List[Dict] = []
+    last_known_headers = None
+    seeds = sorted((seed_headers or {}).items())
+
+    if pages is None:
+        pages, total_pages = find_table_pages(file_path)
+
+    if total_pages is None:
+        total_pages = len(pages)
+
+    skipped = total_pages - len(pages)
+    if stats is not None:
+        stats.update({
+            "pages": total_pages,
+            "table_pages": len(pages),
+            "skipped_table_pages": skipped,
+        })
+    print(f"INFO: Table prefilter skipped {skipped} of {total_pages} pages")
+
+    if not pages:
+        return rows
+
+    tables = _read_tables_parallel(file_path, pages, workers)
+
+    # Numbered per page, so ids stay stable when only some pages are
+    # re-extracted
+    tables_on_page: Dict[str, int] = {}
+
+    for table_page, base_df in tables:
+        # Header rows of skipped pages before this one, in page order
+        while seeds and seeds[0][0] < int(table_page):
+            last_known_headers = seeds.pop(0)[1]
+
+        table_index = tables_on_page.get(table_page, 0)
+        tables_on_page[table_page] = table_index + 1
 
-    for table_index, table in enumerate(tables):
-        base_df = table.df
         if base_df.empty:
             continue
 
@@ -112,23 +197,28 @@ def extract_tables(file_path: Path) -> List[Dict]:
                     continue
 
                 paired = []
+                # Structured copy of the row for exact lookups
+                cells = {}
                 for i, val in enumerate(values):
                     if i < len(headers) and val:
                         paired.append(f"{headers[i]}: {val}")
+                        cells.setdefault(headers[i] or f"col_{i}", val)
 
                 semantic_text = (
-                    f"Source: {file_path.name}, Page: {table.page} | "
+                    f"Source: {file_path.name}, Page: {table_page} | "
                     + " | ".join(paired)
                 )
 
                 rows.append({
                     "block_id": uuid.uuid4().hex,
                     "text": semantic_text,
-                    "page": table.page,
+                    "page": table_page,
                     # 🔑 unique visual table identity
-                    "table_id": f"table_{table_index}_part_{part_index}",
+                    "table_id": f"table_p{table_page}_{table_index}_part_{part_index}",
                     "block_type": "table_row",
-                    "row_index": row_index
+                    "row_index": row_index,
+                    "cells": cells,
+                    "headers": headers if is_header else None,
                 })
 
     return rows
@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.chat import router as chat_router
 from app.api.upload import router as upload_router
 from app.api.health import router as health_router
+from app.api.jobs import router as jobs_router
 from app.core.state import app_state
 
 from app.drive.drive_route import router as drive_router
@@ -13,8 +14,10 @@ async def lifespan(app: FastAPI):
     # 🔹 Startup
     app_state.initialize()
     yield
-    # 🔹 Shutdown (optional cleanup later)
-    # e.g. close connections, flush logs
+    # 🔹 Shutdown
+    app_state.jobs.shutdown()
+    if app_state.embedding_pool:
+        app_state.embedding_pool.shutdown()
 
 
 app = FastAPI(
@@ -39,5 +42,6 @@ app.add_middleware(
 app.include_router(upload_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 app.include_router(health_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
 app.include_router(drive_router)
 
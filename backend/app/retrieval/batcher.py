@@ -0,0 +1,83 @@
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import Future
+from threading import Thread
+import queue
+import time
+
+from app.retrieval.retriever import Retriever
+
+
+class QueryBatcher:
+    """
+    Dynamic micro-batching in front of Retriever.
+
+    Concurrent callers submit single queries; a worker thread gathers
+    whatever arrives within max_wait_ms (or until max_batch_size queries
+    are waiting) and serves them with one retrieve_batch() call, i.e.
+    one encode pass and one vector search per intent branch. Each caller
+    blocks only on its own result.
+    """
+
+    def __init__(
+        self,
+        retriever: Retriever,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.retriever = retriever
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: "queue.Queue[Tuple[str, Optional[List[str]], Future]]" = queue.Queue()
+        self._worker = Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def retrieve(self, query: str, sources: Optional[List[str]] = None) -> List[Dict]:
+        future: Future = Future()
+        self._queue.put((query, sources, future))
+        return future.result()
+
+    # -----------------------------
+    # WORKER
+    # -----------------------------
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._serve(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _collect(self) -> List[Tuple]:
+        # Block for the first query, then wait at most max_wait_ms for more
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _serve(self, batch: List[Tuple]):
+        # retrieve_batch takes one document scope, so group by it
+        groups: Dict[Tuple, List[Tuple]] = {}
+        for item in batch:
+            scope = tuple(item[1]) if item[1] else ()
+            groups.setdefault(scope, []).append(item)
+
+        for scope, items in groups.items():
+            results = self.retriever.retrieve_batch(
+                [query for query, _, _ in items],
+                sources=list(scope) or None,
+            )
+            for (_, _, future), result in zip(items, results):
+                future.set_result(result)
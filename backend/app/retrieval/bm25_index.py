@@ -0,0 +1,705 @@
+from typing import List, Dict, Optional, Set, Tuple
+from collections import Counter
+from itertools import chain
+from threading import RLock
+import os
+import re
+import json
+import math
+import time
+import numpy as np
+
+from app.vectorstore.record_store import (
+    CODED_COLUMNS,
+    ColumnarPart,
+    iter_part_rows,
+    remove_part,
+    write_part,
+)
+
+MANIFEST_FILE = "bm25_manifest.json"
+
+# Pre-segment layout (full texts in one gzip snapshot); removed on save
+LEGACY_SNAPSHOT_FILE = "bm25_snapshot.json.gz"
+
+# Identifier-friendly tokens: keeps "0x1a", "reg_ctrl1", "abc-123", "1.5"
+# whole (and also indexes their parts)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-/][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it of on or "
+    "the this that to was what when where which who why will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token not in STOPWORDS:
+            tokens.append(token)
+
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+
+    return tokens
+
+
+def _log_file(generation: int) -> str:
+    return f"bm25_log_{generation:06d}.jsonl"
+
+
+def _base_prefix(generation: int) -> str:
+    return f"bm25_base_{generation:06d}"
+
+
+def _postings_files(prefix: str) -> Dict[str, str]:
+    return {
+        "terms": f"{prefix}.terms.json",
+        "offsets": f"{prefix}.post_off.npy",
+        "slots": f"{prefix}.post_slot.npy",
+        "tfs": f"{prefix}.post_tf.npy",
+        "lengths": f"{prefix}.lengths.npy",
+    }
+
+
+def _matches(metadata: Dict, filters: Dict) -> bool:
+    for column, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+        if metadata.get(column) not in values:
+            return False
+    return True
+
+
+# -----------------------------
+# ON-DISK BASE SEGMENT
+# -----------------------------
+
+class _BaseSegment:
+    """
+    Read-only, memory-mapped chunks and postings as of the last
+    compaction. Slot i is row i of the columnar part; the postings of
+    term t are slots[offsets[t]:offsets[t + 1]] (ascending) with their
+    term frequencies.
+    """
+
+    def __init__(self, folder_path: str, prefix: str):
+        files = {
+            k: os.path.join(folder_path, v)
+            for k, v in _postings_files(prefix).items()
+        }
+
+        self.prefix = prefix
+        self.docs = ColumnarPart(folder_path, prefix)
+
+        with open(files["terms"], "r", encoding="utf-8") as f:
+            self.terms: Dict[str, int] = {
+                term: i for i, term in enumerate(json.load(f))
+            }
+
+        self.offsets = np.load(files["offsets"], mmap_mode="r")
+        self.slots = np.load(files["slots"], mmap_mode="r")
+        self.tfs = np.load(files["tfs"], mmap_mode="r")
+        self.lengths = np.load(files["lengths"], mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        t = self.terms.get(term)
+        if t is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        start, end = int(self.offsets[t]), int(self.offsets[t + 1])
+        return (
+            np.asarray(self.slots[start:end], dtype=np.int64),
+            np.asarray(self.tfs[start:end], dtype=np.float32),
+        )
+
+    def allowed(self, ids: np.ndarray, filters: Dict) -> np.ndarray:
+        """
+        Mask over ids of rows matching filters, read from the columnar
+        codes where possible.
+        """
+        mask = np.ones(len(ids), dtype=bool)
+
+        for column, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+
+            if column in CODED_COLUMNS:
+                codes = [
+                    code for code, known in enumerate(self.docs.vocab[column])
+                    if known in values
+                ]
+                mask &= np.isin(self.docs.codes[column][ids], codes)
+            elif column == "doc_level":
+                flags = [int(v) for v in values if isinstance(v, bool)]
+                mask &= np.isin(self.docs.doc_level[ids], flags)
+            else:
+                mask &= np.array(
+                    [_matches(self.docs.metadata_at(int(i)), {column: value}) for i in ids],
+                    dtype=bool,
+                )
+
+        return mask
+
+
+def _write_base(
+    folder_path: str,
+    prefix: str,
+    rows,
+    terms: List[str],
+    offsets: np.ndarray,
+    slots: np.ndarray,
+    tfs: np.ndarray,
+    lengths: np.ndarray,
+):
+    files = {
+        k: os.path.join(folder_path, v)
+        for k, v in _postings_files(prefix).items()
+    }
+
+    with open(files["terms"], "w", encoding="utf-8") as f:
+        json.dump(terms, f, separators=(",", ":"))
+    np.save(files["offsets"], offsets.astype(np.int64))
+    np.save(files["slots"], slots.astype(np.int32))
+    np.save(files["tfs"], tfs.astype(np.uint16))
+    np.save(files["lengths"], lengths.astype(np.int32))
+
+    # Columnar header last, as for vector store parts
+    write_part(folder_path, prefix, rows)
+
+
+def _remove_base(folder_path: str, prefix: str):
+    remove_part(folder_path, prefix)
+    for name in _postings_files(prefix).values():
+        path = os.path.join(folder_path, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class BM25Index:
+    """
+    Incremental BM25 inverted index over the same chunks as the vector
+    store, for exact identifiers (part numbers, register names, hex
+    codes) that dense vectors match poorly.
+
+    Mirrors the vector store's write API (add / delete_source /
+    delete_pages / replace_*), so the ingestion pipeline can apply every
+    change to both. Hits have the vector store's result shape, with
+    "bm25_score" in place of "score".
+
+    Storage follows the vector store: a compacted base segment plus
+    recent changes.
+    - bm25_base_NNNNNN.*       chunks (columnar, memory-mapped) and
+                               postings as flat arrays; nothing is
+                               tokenized or decoded on load
+    - bm25_log_NNNNNN.jsonl    changes since then, appended by flush()
+                               and replayed into the in-memory delta
+    - bm25_manifest.json       current generation (the commit point)
+
+    Deletes of base chunks are tombstones until the next compaction,
+    which flush() runs once the log is large relative to the index.
+
+    Searches score outside the index lock with numpy, skip terms found
+    in more than max_df_ratio of all chunks (unless nothing rarer
+    matched) and give up at an optional deadline.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_ratio: float = 0.1,
+        max_df_ratio: float = 0.25,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.max_df_ratio = max_df_ratio
+
+        self._lock = RLock()
+        self._reset()
+
+        # New versions of documents, applied by commit_staged()
+        self._staged: Dict[str, Tuple[List[str], List[Dict]]] = {}
+
+    def _reset(self):
+        self._base: Optional[_BaseSegment] = None
+        self._tombstones = np.zeros(0, dtype=bool)
+        self._base_live = 0
+        self._base_length = 0
+
+        # Chunks added since the base was written; slots continue after it
+        self._docs: Dict[int, Tuple[str, Dict]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._by_source: Dict[str, Set[int]] = {}
+        self._delta_length = 0
+        self._next_slot = 0
+
+        self._generation = 0
+        self._log_entries = 0
+        self._pending: List[Dict] = []
+
+    def __len__(self) -> int:
+        return self._base_live + len(self._docs)
+
+    # -----------------------------
+    # WRITES
+    # -----------------------------
+
+    def add(self, texts: List[str], metadatas: List[Dict]):
+        with self._lock:
+            self._add(texts, metadatas)
+            self._pending.append({"op": "add", "texts": texts, "metadatas": metadatas})
+
+    def delete_source(self, source: str) -> int:
+        with self._lock:
+            removed = self._delete(source, None)
+            self._pending.append({"op": "delete_source", "source": source})
+        return removed
+
+    def delete_pages(self, source: str, pages: List[int]) -> int:
+        with self._lock:
+            removed = self._delete(source, pages)
+            self._pending.append({"op": "delete_pages", "source": source, "pages": list(pages)})
+        return removed
+
+    def replace_source(self, source: str, texts: List[str], metadatas: List[Dict]) -> int:
+        with self._lock:
+            removed = self.delete_source(source)
+            self.add(texts, metadatas)
+        return removed
+
+    def replace_pages(
+        self,
+        source: str,
+        pages: List[int],
+        texts: List[str],
+        metadatas: List[Dict],
+    ) -> int:
+        with self._lock:
+            removed = self.delete_pages(source, pages)
+            if texts:
+                self.add(texts, metadatas)
+        return removed
+
+    def stage(self, source: str, texts: List[str], metadatas: List[Dict]):
+        """
+        Holds chunks of a new version of a document back from search
+        (and from the log) until commit_staged().
+        """
+        with self._lock:
+            staged_texts, staged_metadatas = self._staged.setdefault(source, ([], []))
+            staged_texts.extend(texts)
+            staged_metadatas.extend(metadatas)
+
+    def commit_staged(self, source: str) -> int:
+        """
+        Swaps the document's chunks for the staged ones (possibly none).
+        Returns the number of chunks replaced.
+        """
+        with self._lock:
+            texts, metadatas = self._staged.pop(source, ([], []))
+            removed = self.delete_source(source)
+            if texts:
+                self.add(texts, metadatas)
+        return removed
+
+    def discard_staged(self, source: str) -> int:
+        with self._lock:
+            texts, _ = self._staged.pop(source, ([], []))
+        return len(texts)
+
+    def _add(self, texts: List[str], metadatas: List[Dict]):
+        for text, metadata in zip(texts, metadatas):
+            slot = self._next_slot
+            self._next_slot += 1
+
+            terms = Counter(tokenize(text))
+            self._docs[slot] = (text, metadata)
+            self._lengths[slot] = sum(terms.values())
+            self._delta_length += self._lengths[slot]
+            self._by_source.setdefault(metadata.get("source"), set()).add(slot)
+
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[slot] = tf
+
+    def _delete(self, source: str, pages: Optional[List[int]]) -> int:
+        # Table rows may carry the page as a string
+        wanted = None if pages is None else {str(p) for p in pages}
+        removed = 0
+
+        if self._base is not None:
+            ids = self._base.docs.find("source", source)
+            ids = ids[~self._tombstones[ids]]
+            if wanted is not None:
+                ids = np.array([
+                    i for i in ids
+                    if str(self._base.docs.metadata_at(int(i)).get("page")) in wanted
+                ], dtype=np.int64)
+
+            self._tombstones[ids] = True
+            self._base_live -= len(ids)
+            self._base_length -= int(np.asarray(self._base.lengths)[ids].sum())
+            removed += len(ids)
+
+        slots = set(self._by_source.get(source, ()))
+        if wanted is not None:
+            slots = {
+                s for s in slots
+                if str(self._docs[s][1].get("page")) in wanted
+            }
+
+        for slot in slots:
+            text, _ = self._docs.pop(slot)
+            self._delta_length -= self._lengths.pop(slot)
+            self._by_source[source].discard(slot)
+
+            for term in set(tokenize(text)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(slot, None)
+                    if not postings:
+                        del self._postings[term]
+
+        if source in self._by_source and not self._by_source[source]:
+            del self._by_source[source]
+
+        return removed + len(slots)
+
+    # -----------------------------
+    # SEARCH
+    # -----------------------------
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 40,
+        filters: Optional[Dict] = None,
+        deadline: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        Top BM25 hits for query among chunks matching filters (same
+        filter dict as the vector store: source / block_type / doc_level).
+        deadline is a time.monotonic() value; past it, TimeoutError.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        # Consistent view of the index; scoring runs without the lock
+        with self._lock:
+            n_docs = len(self)
+            if not n_docs:
+                return []
+
+            base = self._base
+            tombstones = self._tombstones
+            avg_length = (self._base_length + self._delta_length) / n_docs
+            n_slots = self._next_slot
+            delta = {
+                term: dict(self._postings[term])
+                for term in terms if term in self._postings
+            }
+            delta_lengths = {
+                slot: self._lengths[slot]
+                for postings in delta.values() for slot in postings
+            }
+
+        matched = []
+        for term in terms:
+            if base is not None:
+                slots, tfs = base.postings(term)
+                live = ~tombstones[slots]
+                slots, tfs = slots[live], tfs[live]
+            else:
+                slots, tfs = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+            extra = delta.get(term, {})
+            df = len(slots) + len(extra)
+            if df:
+                matched.append((df, slots, tfs, extra))
+
+        if not matched:
+            return []
+
+        # Very common terms barely move the ranking but dominate the
+        # cost; always keep the rarest one
+        matched.sort(key=lambda m: m[0])
+        max_df = max(self.max_df_ratio * n_docs, matched[0][0])
+
+        scores = np.zeros(n_slots, dtype=np.float32)
+        for df, slots, tfs, extra in matched:
+            if df > max_df:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("BM25 search deadline exceeded")
+
+            if base is not None and len(slots):
+                lengths = np.asarray(base.lengths[slots], dtype=np.float32)
+            else:
+                lengths = np.empty(0, dtype=np.float32)
+
+            if extra:
+                slots = np.concatenate([slots, np.fromiter(extra.keys(), np.int64, len(extra))])
+                tfs = np.concatenate([tfs, np.fromiter(extra.values(), np.float32, len(extra))])
+                lengths = np.concatenate([lengths, np.fromiter(
+                    (delta_lengths[s] for s in extra), np.float32, len(extra)
+                )])
+
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / avg_length)
+            # Slots are unique within one term's postings
+            scores[slots] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        candidates = np.flatnonzero(scores)
+        n_base = len(tombstones)
+
+        if filters:
+            in_base = candidates < n_base
+            keep = np.zeros(len(candidates), dtype=bool)
+            if base is not None:
+                keep[in_base] = base.allowed(candidates[in_base], filters)
+            for i in np.flatnonzero(~in_base):
+                doc = self._docs.get(int(candidates[i]))
+                keep[i] = doc is not None and _matches(doc[1], filters)
+            candidates = candidates[keep]
+
+        if len(candidates) > top_k:
+            top = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        results = []
+        with self._lock:
+            # Compacted meanwhile: slot numbers changed, search again
+            if self._base is not base:
+                return self.search(query, top_k, filters, deadline)
+
+            for slot in candidates:
+                slot = int(slot)
+                if slot < n_base:
+                    if self._tombstones[slot]:
+                        continue
+                    text = base.docs.text_at(slot)
+                    metadata = base.docs.metadata_at(slot)
+                elif slot in self._docs:
+                    text, metadata = self._docs[slot]
+                else:
+                    # Deleted while scoring
+                    continue
+
+                results.append({
+                    "text": text,
+                    "metadata": metadata,
+                    # Not comparable to vector similarity scores
+                    "bm25_score": float(scores[slot]),
+                    "block_type": metadata.get("block_type", "text"),
+                })
+
+        return results
+
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 40,
+        filters: Optional[Dict] = None,
+        deadline: Optional[float] = None,
+    ) -> List[List[Dict]]:
+        return [self.search(q, top_k, filters, deadline) for q in queries]
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+
+    def flush(self, folder_path: str):
+        """
+        Appends the changes since the last flush to the log; compacts
+        once the log is large relative to the index.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+
+            os.makedirs(folder_path, exist_ok=True)
+            with open(os.path.join(folder_path, _log_file(self._generation)), "a", encoding="utf-8") as f:
+                for entry in self._pending:
+                    f.write(json.dumps(entry, separators=(",", ":")))
+                    f.write("\n")
+
+            self._log_entries += sum(
+                len(e["texts"]) if e["op"] == "add" else 1 for e in self._pending
+            )
+            self._pending = []
+
+            if self._log_entries > self.compact_ratio * max(len(self), 1):
+                self.save(folder_path)
+
+    def save(self, folder_path: str):
+        """
+        Compaction: live base chunks plus the delta become a new base
+        segment (postings are merged, not re-tokenized); starts a new,
+        empty log.
+        """
+        with self._lock:
+            os.makedirs(folder_path, exist_ok=True)
+            old_base = self._base
+            generation = self._generation + 1
+            prefix = _base_prefix(generation)
+
+            terms, offsets, slots, tfs, lengths, rows = self._merged()
+            if len(lengths):
+                _write_base(folder_path, prefix, rows, terms, offsets, slots, tfs, lengths)
+
+            manifest_path = os.path.join(folder_path, MANIFEST_FILE)
+            with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({
+                    "generation": generation,
+                    "base": prefix if len(lengths) else None,
+                }, f)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+            self._reset()
+            self._generation = generation
+            if len(lengths):
+                self._open_base(folder_path, prefix)
+
+            if old_base is not None:
+                _remove_base(folder_path, old_base.prefix)
+
+            # Older logs (and the legacy snapshot) are covered by the new base
+            for name in os.listdir(folder_path):
+                stale_log = name.startswith("bm25_log_") and name != _log_file(generation)
+                if stale_log or name == LEGACY_SNAPSHOT_FILE:
+                    os.remove(os.path.join(folder_path, name))
+
+    def _merged(self):
+        """
+        Postings (CSR), lengths and rows of all live chunks, base first.
+        """
+        base = self._base
+        delta_slots = sorted(self._docs)
+
+        if base is not None:
+            live = ~self._tombstones
+            new_ids = np.cumsum(live) - 1
+            terms = [None] * len(base.terms)
+            for term, t in base.terms.items():
+                terms[t] = term
+
+            entry_terms = np.repeat(
+                np.arange(len(terms), dtype=np.int64),
+                np.diff(np.asarray(base.offsets)),
+            )
+            base_slots = np.asarray(base.slots, dtype=np.int64)
+            keep = live[base_slots]
+            parts_terms = [entry_terms[keep]]
+            parts_slots = [new_ids[base_slots[keep]]]
+            parts_tfs = [np.asarray(base.tfs)[keep].astype(np.int64)]
+            lengths = [np.asarray(base.lengths)[live]]
+            n_live = int(live.sum())
+            base_rows = iter_part_rows([base.docs], live)
+        else:
+            terms = []
+            parts_terms, parts_slots, parts_tfs = [], [], []
+            lengths = []
+            n_live = 0
+            base_rows = iter([])
+
+        term_ids = {term: t for t, term in enumerate(terms)}
+        delta_terms, delta_ids, delta_tfs = [], [], []
+        position = {slot: n_live + i for i, slot in enumerate(delta_slots)}
+        for term, postings in self._postings.items():
+            if term not in term_ids:
+                term_ids[term] = len(terms)
+                terms.append(term)
+            for slot, tf in postings.items():
+                delta_terms.append(term_ids[term])
+                delta_ids.append(position[slot])
+                delta_tfs.append(tf)
+
+        parts_terms.append(np.array(delta_terms, dtype=np.int64))
+        parts_slots.append(np.array(delta_ids, dtype=np.int64))
+        parts_tfs.append(np.array(delta_tfs, dtype=np.int64))
+        lengths.append(np.array([self._lengths[s] for s in delta_slots], dtype=np.int64))
+
+        entry_terms = np.concatenate(parts_terms)
+        entry_slots = np.concatenate(parts_slots)
+        entry_tfs = np.concatenate(parts_tfs)
+        order = np.lexsort((entry_slots, entry_terms))
+
+        # Terms left without postings are dropped
+        counts = np.bincount(entry_terms, minlength=len(terms))
+        used = counts > 0
+        offsets = np.concatenate([[0], np.cumsum(counts[used])])
+
+        rows = chain(base_rows, (self._docs[s] for s in delta_slots))
+        return (
+            [term for term, u in zip(terms, used) if u],
+            offsets,
+            entry_slots[order],
+            # Counts beyond uint16 only occur in degenerate chunks
+            np.minimum(entry_tfs[order], np.iinfo(np.uint16).max),
+            np.concatenate(lengths),
+            rows,
+        )
+
+    def _open_base(self, folder_path: str, prefix: str):
+        self._base = _BaseSegment(folder_path, prefix)
+        self._tombstones = np.zeros(len(self._base), dtype=bool)
+        self._base_live = len(self._base)
+        self._base_length = int(np.asarray(self._base.lengths).sum())
+        self._next_slot = len(self._base)
+
+    def load(self, folder_path: str):
+        with self._lock:
+            self._reset()
+            self._staged = {}
+
+            manifest_path = os.path.join(folder_path, MANIFEST_FILE)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                self._generation = manifest["generation"]
+                if manifest["base"]:
+                    self._open_base(folder_path, manifest["base"])
+
+            log_path = os.path.join(folder_path, _log_file(self._generation))
+            if not os.path.exists(log_path):
+                return
+
+            with open(log_path, "rb+") as f:
+                good = 0
+                for line in f:
+                    # A torn last line is a flush that never completed;
+                    # cut it off so later appends stay readable
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        f.truncate(good)
+                        break
+                    good += len(line)
+
+                    if entry["op"] == "add":
+                        self._add(entry["texts"], entry["metadatas"])
+                        self._log_entries += len(entry["texts"])
+                    elif entry["op"] == "delete_source":
+                        self._delete(entry["source"], None)
+                        self._log_entries += 1
+                    elif entry["op"] == "delete_pages":
+                        self._delete(entry["source"], entry["pages"])
+                        self._log_entries += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len(self),
+                "base_documents": self._base_live,
+                "delta_documents": len(self._docs),
+                "base_terms": len(self._base.terms) if self._base is not None else 0,
+                "delta_terms": len(self._postings),
+                "log_entries": self._log_entries,
+            }
@@ -14,6 +14,22 @@ def filter_by_document_scope(
     ]
 
 
+def scope_filters(
+    allowed_sources: Optional[List[str]] = None,
+    **filters
+) -> Dict:
+    """
+    Builds a vector store filter dict (pushed down into the search)
+    from a document scope plus exact block_type / doc_level matches.
+    """
+    scoped = {k: v for k, v in filters.items() if v is not None}
+
+    if allowed_sources:
+        scoped["source"] = list(allowed_sources)
+
+    return scoped
+
+
 def filter_doc_level_first(
     results: List[Dict],
     limit: int = 5,
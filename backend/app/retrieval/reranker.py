@@ -1,12 +1,16 @@
 from typing import List, Dict
 from sentence_transformers import CrossEncoder
 from app.validation.question_type import is_metadata_question
+from app.embeddings.onnx_backend import BACKEND_TORCH, load_model
+
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
 
 class Reranker:
-    def __init__(self):
-        self.model = CrossEncoder(
-            "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    def __init__(self, backend: str = BACKEND_TORCH, quantization: str = "avx2"):
+        self.backend = backend
+        self.model = load_model(
+            CrossEncoder, RERANKER_MODEL, backend, quantization
         )
 
     def rerank(self, query: str, candidates: List[Dict]) -> List[Dict]:
@@ -1,78 +1,264 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import time
 from app.validation.question_type import is_metadata_question
 from app.embeddings.model import EmbeddingModel
 from app.vectorstore.faiss_store import FAISSVectorStore
+from app.retrieval.filters import scope_filters
+from app.retrieval.bm25_index import BM25Index
+from app.retrieval.table_store import TableStore
+
+
+def _matches(hit: Dict, filters: Dict) -> bool:
+    metadata = hit.get("metadata", {})
+    for column, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set)) else (value,)
+        if metadata.get(column) not in values:
+            return False
+    return True
 
 
 class Retriever:
+    """
+    Dense (FAISS) retrieval, optionally fused with a BM25 lexical index.
+
+    With a lexical_index, each batch is also searched lexically on a
+    separate thread while the queries are encoded and searched in FAISS.
+    The two rankings are merged by reciprocal rank fusion
+    (sum of 1 / (rrf_k + rank)). Lexical results that are not ready
+    budget_ms after the search started are skipped, so hybrid search
+    never adds more than that to a request; the lexical search itself
+    stops at the same deadline, so late work never queues up behind
+    later requests.
+
+    With a table_store, parameter queries are also looked up by exact
+    cell value ("REG_CTRL1", "0x1A"); up to table_top_k matching table
+    rows lead the evidence, ahead of the ranked results.
+    """
+
     def __init__(
         self,
         embedding_model: EmbeddingModel,
         vector_store: FAISSVectorStore,
+        lexical_index: Optional[BM25Index] = None,
+        lexical_top_k: int = 40,
+        rrf_k: int = 60,
+        budget_ms: float = 50.0,
+        table_store: Optional[TableStore] = None,
+        table_top_k: int = 3,
     ):
         self.embedding_model = embedding_model
         self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.lexical_top_k = lexical_top_k
+        self.rrf_k = rrf_k
+        self.budget_ms = budget_ms
+        self.table_store = table_store
+        self.table_top_k = table_top_k
+
+        self._lexical_pool: Optional[ThreadPoolExecutor] = None
+        if lexical_index is not None:
+            self._lexical_pool = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="bm25-search"
+            )
 
     # -----------------------------
     # MAIN ENTRY
     # -----------------------------
 
-    def retrieve(self, query: str) -> List[Dict]:
-        if self.vector_store.index.ntotal == 0:
-            return []
+    def retrieve(
+        self,
+        query: str,
+        sources: Optional[List[str]] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        sources optionally scopes the search to the given documents.
+        Scope and intent filters are applied inside the vector search,
+        so each branch gets a full top_k from its restricted set.
+        """
+        return self.retrieve_batch([query], sources, ef_search, nprobe)[0]
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        sources: Optional[List[str]] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[List[Dict]]:
+        """
+        Same as retrieve() for many queries: one encode call for all of
+        them and one vector search per intent branch.
+        """
+        results: List[List[Dict]] = [[] for _ in queries]
+        if not queries or self.vector_store.ntotal == 0:
+            return results
+
+        # Lexical search starts first and overlaps encoding + FAISS
+        lexical: Optional[Future] = None
+        if self.lexical_index is not None:
+            started = time.monotonic()
+            lexical = self._lexical_pool.submit(
+                self.lexical_index.search_batch,
+                queries,
+                self.lexical_top_k,
+                scope_filters(sources),
+                started + self.budget_ms / 1000.0,
+            )
+
+        query_vectors = self.embedding_model.embed_queries(queries)
+
+        # Per query: top_k and intent filters of the branch that served it
+        branches: List[tuple] = [(0, {}) for _ in queries]
+
+        def search(rows: List[int], top_k: int, **filters):
+            """
+            Fills results for the given queries.
+            """
+            if not rows:
+                return
 
-        query_vector = self.embedding_model.embed_query(query)
-        candidates = self.vector_store.search(
-            query_vector,
-            top_k=40
-        )
+            for row in rows:
+                branches[row] = (top_k, filters)
+
+            batch = self.vector_store.search_batch(
+                query_vectors[rows],
+                top_k=top_k,
+                ef_search=ef_search,
+                nprobe=nprobe,
+                filters=scope_filters(sources, **filters),
+            )
+
+            for row, hits in zip(rows, batch):
+                results[row] = hits
+
+        procedural, metadata, default = [], [], []
+        for row, query in enumerate(queries):
+            if self._is_procedural_query(query):
+                procedural.append(row)
+            elif is_metadata_question(query):
+                metadata.append(row)
+            else:
+                default.append(row)
 
         # -----------------------------
         # 1️⃣ PROCEDURAL / GUIDELINE QUESTIONS
+        # Installation, guidelines, wiring, precautions → TEXT ONLY
+        # (doc-level preference is applied in 5️⃣)
         # -----------------------------
-        if self._is_procedural_query(query):
-            return self._retrieve_procedural(candidates)
+        search(procedural, 40, block_type="text")
 
         # -----------------------------
         # 2️⃣ METADATA QUESTIONS
         # -----------------------------
-        if is_metadata_question(query):
-            doc_level = [
-                c for c in candidates
-                if c["metadata"].get("doc_level")
-                and c["block_type"] == "text"
-            ]
-            return doc_level or candidates
+        search(metadata, 40)
 
         # -----------------------------
         # 3️⃣ DEFAULT (PARAMETERS / TABLE FACTS)
         # -----------------------------
-        return candidates
+        search(default, 40)
 
-    # -----------------------------
-    # PROCEDURAL HANDLING
-    # -----------------------------
+        # -----------------------------
+        # 4️⃣ HYBRID: FUSE WITH BM25
+        # -----------------------------
+        if lexical is not None:
+            remaining = self.budget_ms / 1000.0 - (time.monotonic() - started)
+            try:
+                lexical_results = lexical.result(timeout=max(0.0, remaining))
+            except (FutureTimeoutError, TimeoutError):
+                # Either the wait or the search itself hit the deadline
+                # (distinct classes before Python 3.11). A search not
+                # started yet is dropped; a running one stops by itself
+                lexical.cancel()
+                print(
+                    f"WARNING: BM25 search exceeded {self.budget_ms:.0f} ms; "
+                    f"using vector results only"
+                )
+                lexical_results = None
+
+            if lexical_results is not None:
+                for row, (top_k, filters) in enumerate(branches):
+                    # Lexical hits follow the branch's intent filters
+                    hits = [h for h in lexical_results[row] if _matches(h, filters)]
+                    results[row] = self._fuse(results[row], hits, top_k)
+
+        # -----------------------------
+        # 5️⃣ PREFER DOC-LEVEL TEXT
+        # Only among the query's own top hits: a corpus-wide doc-level
+        # search would return title chunks however far from the query
+        # -----------------------------
+        for row in procedural:
+            results[row] = self._prefer_doc_level(results[row])[:10]
+
+        for row in metadata:
+            results[row] = self._prefer_doc_level(results[row])
+
+        # -----------------------------
+        # 6️⃣ EXACT TABLE LOOKUP
+        # Rows whose cells equal a query term go first
+        # -----------------------------
+        if self.table_store is not None:
+            for row in default:
+                exact = self.table_store.match(queries[row], sources, self.table_top_k)
+                if exact:
+                    results[row] = self._lead_with(exact, results[row])
+
+        return results
 
-    def _retrieve_procedural(self, candidates: List[Dict]) -> List[Dict]:
+    def _prefer_doc_level(self, hits: List[Dict]) -> List[Dict]:
+        doc_level = [
+            h for h in hits
+            if h["metadata"].get("doc_level") and h.get("block_type") == "text"
+        ]
+        return doc_level or hits
+
+    def _lead_with(self, exact: List[Dict], ranked: List[Dict]) -> List[Dict]:
         """
-        Installation, guidelines, wiring, precautions → TEXT ONLY
+        exact rows followed by the ranked hits, without the chunks of
+        those same rows.
         """
+        def row_key(hit: Dict) -> tuple:
+            metadata = hit.get("metadata", {})
+            return (
+                metadata.get("source"),
+                metadata.get("table_id"),
+                metadata.get("row_index"),
+            )
 
-        text_blocks = [
-            c for c in candidates
-            if c["block_type"] == "text"
+        seen = {row_key(hit) for hit in exact}
+        return exact + [
+            hit for hit in ranked
+            if hit.get("block_type") != "table_row" or row_key(hit) not in seen
         ]
 
-        # Strongly prefer doc-level + nearby narrative
-        doc_level = [
-            c for c in text_blocks
-            if c["metadata"].get("doc_level")
-        ]
+    def _fuse(self, dense: List[Dict], lexical: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Reciprocal rank fusion of two rankings of the same chunks.
+        """
+        if not lexical:
+            return dense
+
+        fused: Dict[str, Dict] = {}
+        scores: Dict[str, float] = {}
+
+        for ranking in (dense, lexical):
+            for rank, hit in enumerate(ranking):
+                key = hit["metadata"].get("chunk_id") or hit["text"]
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+                if key in fused:
+                    if "bm25_score" in hit:
+                        fused[key]["bm25_score"] = hit["bm25_score"]
+                else:
+                    fused[key] = dict(hit)
 
-        if doc_level:
-            return doc_level[:10]
+        order = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        for key in order:
+            fused[key]["rrf_score"] = round(scores[key], 6)
 
-        return text_blocks[:10]
+        return [fused[key] for key in order]
 
     # -----------------------------
     # INTENT DETECTION
@@ -0,0 +1,390 @@
+from typing import List, Dict, Iterable, Optional, Set
+from threading import RLock
+import os
+import re
+import json
+import gzip
+import hashlib
+
+TABLES_DIR = "tables"
+
+# Longest phrase (in words) tried as a lookup key
+MAX_KEY_WORDS = 4
+
+# Values found in more rows than this ("yes", "n/a", units) do not
+# identify a row
+MAX_KEY_ROWS = 50
+
+HEX_PATTERN = re.compile(r"^0x[0-9a-f]+$")
+INT_PATTERN = re.compile(r"^[+-]?\d+$")
+FLOAT_PATTERN = re.compile(r"^[+-]?(\d+\.\d*|\.\d+)$")
+WORD_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9._\-/]*[A-Za-z0-9]|[A-Za-z0-9]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it of on or "
+    "the this that to was what when where which who why will with".split()
+)
+
+
+def value_type(value: str) -> str:
+    v = value.strip().lower()
+    if HEX_PATTERN.match(v):
+        return "hex"
+    if INT_PATTERN.match(v):
+        return "int"
+    if FLOAT_PATTERN.match(v):
+        return "float"
+    return "str"
+
+
+def value_key(value: str) -> str:
+    """
+    Normalized lookup key: numbers by value ("0x001A" == "0x1a",
+    "05" == "5"), text case- and whitespace-insensitive.
+    """
+    v = " ".join(str(value).lower().split())
+    kind = value_type(v)
+
+    if kind == "hex":
+        return hex(int(v, 16))
+    if kind == "int":
+        return str(int(v))
+    if kind == "float":
+        return repr(float(v))
+    return v
+
+
+def _is_identifying(key: str) -> bool:
+    # Bare small numbers and stopwords would match half the tables
+    if key in STOPWORDS or len(key) < 2:
+        return False
+    return key.startswith("0x") or any(c.isalpha() for c in key)
+
+
+def _record(row: Dict) -> Optional[Dict]:
+    # Only what the store keeps of a table_row block
+    cells = row.get("cells") or {}
+    if not cells:
+        return None
+
+    return {
+        "table_id": row.get("table_id"),
+        "page": row.get("page"),
+        "row_index": row.get("row_index"),
+        "text": row.get("text", ""),
+        "cells": dict(cells),
+    }
+
+
+def _source_file(source: str) -> str:
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16] + ".json.gz"
+
+
+class TableStore:
+    """
+    Extracted table rows as structured data, for exact parameter lookups
+    ("default of REG_CTRL1") that should not need a vector search.
+
+    Rows are keyed by (source, table_id, row_index) and keep their cells
+    as {column: value}. Every column has a hash index from normalized
+    value to rows (see value_key), plus one index across all columns
+    for queries that do not name the column.
+
+    Persisted per source under <index dir>/tables/ as columns: each
+    column stores its inferred type (int / float / hex / str) and one
+    value per row (null where the row has no such cell). Values are
+    kept as the original strings ("1.10", "05") so cells read back
+    exactly as extracted; the type only shapes the lookup key.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._reset()
+
+    def _reset(self):
+        self._rows: Dict[int, Dict] = {}
+        self._by_source: Dict[str, Set[int]] = {}
+        self._columns: Dict[str, Dict[str, Set[int]]] = {}
+        self._any: Dict[str, Set[int]] = {}
+        self._next_id = 0
+
+        # Rows of new document versions, not looked up until committed
+        self._staged: Dict[str, List[Dict]] = {}
+
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -----------------------------
+    # WRITES
+    # -----------------------------
+
+    def replace_source(self, source: str, rows: Iterable[Dict]) -> int:
+        """
+        rows are table_row blocks (with "cells"). Returns the number of
+        rows replaced.
+        """
+        with self._lock:
+            removed = self._delete(source, None)
+            self._add(source, rows)
+            self._dirty.add(source)
+        return removed
+
+    def replace_pages(self, source: str, pages: List[int], rows: Iterable[Dict]) -> int:
+        with self._lock:
+            removed = self._delete(source, pages)
+            self._add(source, rows)
+            self._dirty.add(source)
+        return removed
+
+    def delete_source(self, source: str) -> int:
+        with self._lock:
+            removed = self._delete(source, None)
+            self._dirty.add(source)
+        return removed
+
+    def stage(self, source: str, rows: Iterable[Dict]):
+        """
+        Keeps rows of a new version of a document out of lookups (and
+        off disk) until commit_staged(), so ingestion can hand them over
+        as they are parsed.
+        """
+        with self._lock:
+            staged = self._staged.setdefault(source, [])
+            staged.extend(r for r in map(_record, rows) if r is not None)
+
+    def commit_staged(self, source: str) -> int:
+        """
+        Swaps the document's rows for the staged ones (possibly none).
+        Returns the number of rows replaced.
+        """
+        with self._lock:
+            removed = self._delete(source, None)
+            for record in self._staged.pop(source, []):
+                self._insert(source, record)
+            self._dirty.add(source)
+        return removed
+
+    def discard_staged(self, source: str) -> int:
+        with self._lock:
+            return len(self._staged.pop(source, []))
+
+    def _add(self, source: str, rows: Iterable[Dict]):
+        for record in map(_record, rows):
+            if record is not None:
+                self._insert(source, record)
+
+    def _insert(self, source: str, record: Dict):
+        row_id = self._next_id
+        self._next_id += 1
+
+        self._rows[row_id] = {"source": source, **record}
+        self._by_source.setdefault(source, set()).add(row_id)
+
+        for column, value in record["cells"].items():
+            key = value_key(value)
+            self._columns.setdefault(column, {}).setdefault(key, set()).add(row_id)
+            self._any.setdefault(key, set()).add(row_id)
+
+    def _delete(self, source: str, pages: Optional[List[int]]) -> int:
+        row_ids = set(self._by_source.get(source, ()))
+        if pages is not None:
+            # Camelot reports pages as strings
+            wanted = {str(p) for p in pages}
+            row_ids = {r for r in row_ids if str(self._rows[r]["page"]) in wanted}
+
+        for row_id in row_ids:
+            row = self._rows.pop(row_id)
+            self._by_source[source].discard(row_id)
+
+            for column, value in row["cells"].items():
+                key = value_key(value)
+                for index in (self._columns.get(column, {}), self._any):
+                    ids = index.get(key)
+                    if ids is not None:
+                        ids.discard(row_id)
+                        if not ids:
+                            del index[key]
+
+        if source in self._by_source and not self._by_source[source]:
+            del self._by_source[source]
+
+        return len(row_ids)
+
+    # -----------------------------
+    # LOOKUP
+    # -----------------------------
+
+    def lookup(self, column: str, value: str) -> List[Dict]:
+        """
+        Rows whose cell in column equals value (normalized).
+        """
+        with self._lock:
+            ids = self._columns.get(column, {}).get(value_key(value), ())
+            return [self._rows[i] for i in sorted(ids)]
+
+    def match(
+        self,
+        query: str,
+        sources: Optional[List[str]] = None,
+        limit: int = 5,
+    ) -> List[Dict]:
+        """
+        Rows holding a cell that exactly equals a word or phrase of the
+        query, best first. A row scores the words its matched cells
+        cover, plus half a point per query word that names one of its
+        columns ("default" -> default_value).
+        """
+        words = WORD_PATTERN.findall(query)
+        lowered = {w.lower() for w in words}
+        scores: Dict[int, float] = {}
+
+        with self._lock:
+            for n in range(1, MAX_KEY_WORDS + 1):
+                for start in range(len(words) - n + 1):
+                    key = value_key(" ".join(words[start:start + n]))
+                    if not _is_identifying(key):
+                        continue
+
+                    ids = self._any.get(key)
+                    if not ids or len(ids) > MAX_KEY_ROWS:
+                        continue
+
+                    for row_id in ids:
+                        scores[row_id] = scores.get(row_id, 0.0) + n
+
+            if sources:
+                allowed = set(sources)
+                scores = {
+                    r: s for r, s in scores.items()
+                    if self._rows[r]["source"] in allowed
+                }
+
+            for row_id in scores:
+                for column in self._rows[row_id]["cells"]:
+                    if lowered.intersection(column.split("_")):
+                        scores[row_id] += 0.5
+
+            best = sorted(scores, key=lambda r: (-scores[r], r))[:limit]
+            return [self._to_hit(self._rows[r]) for r in best]
+
+    def _to_hit(self, row: Dict) -> Dict:
+        # Same shape as a vector search hit, so it can lead the evidence
+        return {
+            "text": row["text"],
+            "metadata": {
+                "source": row["source"],
+                "page": row["page"],
+                "table_id": row["table_id"],
+                "row_index": row["row_index"],
+                "block_type": "table_row",
+                "cells": row["cells"],
+            },
+            "score": 1.0,
+            "block_type": "table_row",
+            "exact_match": True,
+        }
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+
+    def flush(self, folder_path: str):
+        """
+        Rewrites the files of the sources changed since the last flush.
+        """
+        folder = os.path.join(folder_path, TABLES_DIR)
+
+        with self._lock:
+            # The folder also marks the store as built (see exists())
+            os.makedirs(folder, exist_ok=True)
+            if not self._dirty:
+                return
+
+            for source in self._dirty:
+                path = os.path.join(folder, _source_file(source))
+                rows = [self._rows[r] for r in sorted(self._by_source.get(source, ()))]
+
+                if not rows:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    continue
+
+                with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+                    json.dump(self._columnar(source, rows), f, separators=(",", ":"))
+                os.replace(path + ".tmp", path)
+
+            self._dirty = set()
+
+    def _columnar(self, source: str, rows: List[Dict]) -> Dict:
+        names: List[str] = []
+        for row in rows:
+            for column in row["cells"]:
+                if column not in names:
+                    names.append(column)
+
+        columns = {}
+        for column in names:
+            values = [row["cells"].get(column) for row in rows]
+            kinds = {value_type(v) for v in values if v is not None}
+            kind = kinds.pop() if len(kinds) == 1 else "str"
+
+            columns[column] = {"type": kind, "values": values}
+
+        return {
+            "source": source,
+            "table_id": [row["table_id"] for row in rows],
+            "page": [row["page"] for row in rows],
+            "row_index": [row["row_index"] for row in rows],
+            "text": [row["text"] for row in rows],
+            "columns": columns,
+        }
+
+    def load(self, folder_path: str):
+        folder = os.path.join(folder_path, TABLES_DIR)
+
+        with self._lock:
+            self._reset()
+            if not os.path.isdir(folder):
+                return
+
+            for name in sorted(os.listdir(folder)):
+                if not name.endswith(".json.gz"):
+                    continue
+
+                with gzip.open(os.path.join(folder, name), "rt", encoding="utf-8") as f:
+                    data = json.load(f)
+
+                rows = []
+                for i in range(len(data["text"])):
+                    cells = {
+                        column: spec["values"][i]
+                        for column, spec in data["columns"].items()
+                        if spec["values"][i] is not None
+                    }
+                    rows.append({
+                        "table_id": data["table_id"][i],
+                        "page": data["page"][i],
+                        "row_index": data["row_index"][i],
+                        "text": data["text"][i],
+                        "cells": cells,
+                    })
+
+                self._add(data["source"], rows)
+
+    @staticmethod
+    def exists(folder_path: str) -> bool:
+        """
+        False until the first flush into folder_path, i.e. for an index
+        built before table rows were stored.
+        """
+        return os.path.isdir(os.path.join(folder_path, TABLES_DIR))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rows": len(self._rows),
+                "sources": len(self._by_source),
+                "columns": len(self._columns),
+            }
@@ -1,9 +1,91 @@
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
+from contextlib import contextmanager
+from threading import Condition, Lock, RLock, Thread
 import os
+import json
 import pickle
 import numpy as np
 import faiss
 
+from .record_store import RecordStore, part_exists, remove_part
+from .raw_vectors import RawVectors, vectors_file
+from .metadata_index import MetadataIndex, bitmap_selector
+from .index_factory import (
+    INDEX_FLAT,
+    INDEX_TYPES,
+    ENCODING_FLOAT32,
+    ENCODINGS,
+    build_flat_index,
+    build_index,
+    index_spec,
+    min_training_points,
+    bytes_per_vector,
+    to_similarity,
+    all_vectors,
+    search_params,
+    exclude_ids,
+)
+
+MANIFEST_FILE = "manifest.json"
+
+# Layout written before manifest.json existed
+LEGACY_INDEX_FILE = "faiss.index"
+LEGACY_RECORDS_PREFIX = "records"
+
+
+def _index_file(prefix: str) -> str:
+    return f"{prefix}.index"
+
+
+def _tombstones_file(prefix: str) -> str:
+    return f"{prefix}.tombstones.npy"
+
+
+class _ReadWriteLock:
+    """
+    Shared by searches, exclusive for the short in-memory updates of the
+    index, records and tombstones. A waiting writer holds back new
+    readers, so a stream of searches cannot starve ingestion.
+    Not reentrant.
+    """
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
 
 class FAISSVectorStore:
     """
@@ -11,12 +93,112 @@ class FAISSVectorStore:
 
     - All answer-bearing chunks (text + table rows) are embedded
     - FAISS is the single retrieval source
+    - Starts as an exact float32 Flat index and promotes itself to the
+      configured index type (HNSW / IVF) and encoding (fp16 / SQ8 / PQ)
+      once it is large enough
+    - An exact float32 copy of every vector is kept memory-mapped on disk
+      to re-score candidates from compressed indexes
+    - Records are positional (index_id == FAISS id). Deleted rows are
+      tombstoned and filtered out at search time until compaction drops
+      them and renumbers the survivors
+    - A new version of a document can be staged window by window: its
+      rows stay tombstoned (on disk too) until commit_staged() swaps
+      them for the old version's rows in one step
+    - Searches can be scoped by source / block_type / doc_level; the
+      filter is applied inside FAISS through an ID selector, so a full
+      top_k comes back from the restricted set
+
+    On-disk layout:
+    - base_NNNNNN.*    base snapshot (save / compaction)
+    - seg_NNNNNN.*     append-only segments (flush)
+    - tomb_NNNNNN.*    deleted ids not yet compacted away
+    - manifest.json    current base + segments + tombstones
     """
 
-    def __init__(self, dim: int):
+    def __init__(
+        self,
+        dim: int,
+        index_type: str = INDEX_FLAT,
+        encoding: str = ENCODING_FLOAT32,
+        promote_threshold: int = 100_000,
+        hnsw_m: int = 32,
+        ivf_nlist: Optional[int] = None,
+        pq_m: Optional[int] = None,
+        ef_search: int = 64,
+        nprobe: int = 16,
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        max_segments: int = 8,
+        compact_deleted_ratio: float = 0.2,
+        exact_filter_limit: int = 2048,
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unsupported index type: {index_type}. "
+                f"Supported types: {INDEX_TYPES}"
+            )
+
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                f"Unsupported encoding: {encoding}. "
+                f"Supported encodings: {ENCODINGS}"
+            )
+
         self.dim = dim
-        self.index = faiss.IndexFlatIP(dim)
-        self.records: List[Dict] = []
+        self.index_type = index_type
+        self.encoding = encoding
+        self.promote_threshold = promote_threshold
+        self.hnsw_m = hnsw_m
+        self.ivf_nlist = ivf_nlist
+        self.pq_m = pq_m
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.max_segments = max_segments
+        self.compact_deleted_ratio = compact_deleted_ratio
+        self.exact_filter_limit = exact_filter_limit
+
+        self.index = build_flat_index(dim)
+        self.records = RecordStore()
+        self.vectors = RawVectors(dim)
+        self.metadata_index = MetadataIndex(self.records)
+
+        self._base: Optional[str] = None
+        self._segments: List[str] = []
+        self._tombstones: Optional[str] = None
+        self._next_id = 1
+
+        # Sorted ids of deleted rows
+        self._deleted = np.empty(0, dtype=np.int64)
+        self._deleted_dirty = False
+
+        # Staged (not yet committed) rows per source; also in _deleted,
+        # but kept by save / compaction
+        self._staged: Dict[str, np.ndarray] = {}
+        self._folder_path: Optional[str] = None
+
+        # _lock serializes writers (including their disk writes);
+        # searches only take the shared side of _view, which writers
+        # hold exclusively just while they swap in-memory state
+        self._lock = RLock()
+        self._view = _ReadWriteLock()
+        self._compaction: Optional[Thread] = None
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Number of live (not deleted) vectors.
+        """
+        return self.index.ntotal - len(self._deleted)
+
+    @property
+    def active_index_type(self) -> str:
+        return index_spec(self.index)[0]
+
+    @property
+    def active_encoding(self) -> str:
+        return index_spec(self.index)[1]
 
     # -----------------------------
     # ADD EMBEDDINGS
@@ -28,46 +210,335 @@ class FAISSVectorStore:
         texts: List[str],
         metadatas: Optional[List[Dict]] = None,
     ):
+        vectors, metadatas = self._prepare(embeddings, texts, metadatas)
+
+        with self._lock:
+            with self._view.write():
+                self._append(vectors, texts, metadatas)
+
+            self._maybe_promote()
+
+    def _prepare(
+        self,
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]],
+    ) -> Tuple[np.ndarray, List[Dict]]:
         if metadatas is None:
             metadatas = [{} for _ in texts]
 
         if len(embeddings) != len(texts) or len(texts) != len(metadatas):
             raise ValueError("Embeddings, texts, and metadatas length mismatch")
 
-        vectors = np.array(embeddings, dtype="float32")
+        vectors = np.array(embeddings, dtype="float32").reshape(-1, self.dim)
         faiss.normalize_L2(vectors)
+        return vectors, metadatas
 
-        start_idx = len(self.records)
-        self.index.add(vectors)
+    def _append(self, vectors: np.ndarray, texts: List[str], metadatas: List[Dict]) -> np.ndarray:
+        # Caller holds self._lock and the view's write side
+        start = self.index.ntotal
+        if len(vectors):
+            self.index.add(vectors)
+            self.records.append(texts, metadatas)
+            self.vectors.append(vectors)
+        return np.arange(start, self.index.ntotal, dtype=np.int64)
 
-        for i, (text, metadata) in enumerate(zip(texts, metadatas)):
-            self.records.append({
-                "index_id": start_idx + i,
-                "text": text,
-                "metadata": metadata,
-                # Preserve block_type (text or table_row)
-                "block_type": metadata.get("block_type", "text"),
-            })
+    # -----------------------------
+    # INDEX PROMOTION
+    # -----------------------------
+
+    def _maybe_promote(self):
+        target = (self.index_type, self.encoding)
+
+        # Only the initial exact index is promoted; a promoted index keeps
+        # growing in place until the next explicit promote()
+        if index_spec(self.index) != (INDEX_FLAT, ENCODING_FLOAT32):
+            return
+
+        if target == (INDEX_FLAT, ENCODING_FLOAT32):
+            return
+
+        threshold = max(
+            self.promote_threshold,
+            min_training_points(self.index_type, self.encoding),
+        )
+        if self.index.ntotal < threshold:
+            return
+
+        self.promote()
+
+    def promote(self):
+        """
+        Rebuilds the index with the configured type and encoding from the
+        exact vectors. Positions (and therefore record ids) are preserved.
+        Searches keep using the current index until the swap.
+        """
+        with self._lock:
+            index = build_index(
+                self.index_type,
+                self.encoding,
+                self.dim,
+                self.vectors.all(),
+                hnsw_m=self.hnsw_m,
+                ivf_nlist=self.ivf_nlist,
+                pq_m=self.pq_m,
+            )
+            with self._view.write():
+                self.index = index
+
+        print(
+            f"INFO: Vector index promoted to {self.index_type}/{self.encoding} "
+            f"({self.index.ntotal} vectors)"
+        )
+
+    # -----------------------------
+    # DELETE / REPLACE
+    # -----------------------------
+
+    def delete_source(self, source: str) -> int:
+        """
+        Tombstones every live chunk of a document.
+        Returns the number of chunks removed.
+        """
+        with self._lock:
+            ids = self._live_ids(source)
+            with self._view.write():
+                self._tombstone(ids)
+
+        return len(ids)
+
+    def replace_source(
+        self,
+        source: str,
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ) -> int:
+        """
+        Swaps a document's chunks for a new set in one step.
+        Returns the number of chunks replaced.
+        """
+        vectors, metadatas = self._prepare(embeddings, texts, metadatas)
+
+        with self._lock:
+            ids = self._live_ids(source)
+            with self._view.write():
+                self._tombstone(ids)
+                self._append(vectors, texts, metadatas)
+
+            self._maybe_promote()
+
+        return len(ids)
+
+    def delete_pages(self, source: str, pages: List[int]) -> int:
+        """
+        Tombstones the live chunks of the given pages of a document.
+        Returns the number of chunks removed.
+        """
+        with self._lock:
+            ids = self._live_ids(source, pages)
+            with self._view.write():
+                self._tombstone(ids)
+
+        return len(ids)
+
+    def replace_pages(
+        self,
+        source: str,
+        pages: List[int],
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ) -> int:
+        """
+        Swaps the chunks of some pages of a document for a new set in one
+        step. Returns the number of chunks replaced.
+        """
+        vectors, metadatas = self._prepare(embeddings, texts, metadatas)
+
+        with self._lock:
+            ids = self._live_ids(source, pages)
+            with self._view.write():
+                self._tombstone(ids)
+                self._append(vectors, texts, metadatas)
+
+            self._maybe_promote()
+
+        return len(ids)
+
+    def stage(
+        self,
+        source: str,
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ):
+        """
+        Adds chunks of a new version of a document without making them
+        searchable. They are persisted as tombstoned, so a crash before
+        commit_staged() leaves only the previous version.
+        """
+        vectors, metadatas = self._prepare(embeddings, texts, metadatas)
+
+        with self._lock:
+            with self._view.write():
+                ids = self._append(vectors, texts, metadatas)
+                self._tombstone(ids)
+
+            self._staged[source] = np.concatenate(
+                [self._staged.get(source, np.empty(0, dtype=np.int64)), ids]
+            )
+            self._maybe_promote()
+
+    def commit_staged(self, source: str) -> int:
+        """
+        Swaps the document's live chunks for the staged ones (possibly
+        none). Returns the number of chunks replaced.
+        """
+        with self._lock:
+            staged = self._staged.pop(source, np.empty(0, dtype=np.int64))
+            ids = self._live_ids(source)
+
+            with self._view.write():
+                self._tombstone(ids)
+                if len(staged):
+                    self._deleted = np.setdiff1d(self._deleted, staged)
+                    self._deleted_dirty = True
+
+        return len(ids)
+
+    def discard_staged(self, source: str) -> int:
+        """
+        Drops the staged chunks of a document (they are already
+        tombstoned). Returns how many there were.
+        """
+        with self._lock:
+            staged = self._staged.pop(source, np.empty(0, dtype=np.int64))
+        return len(staged)
+
+    def _live_ids(self, source: str, pages: Optional[List[int]] = None) -> np.ndarray:
+        ids = self.records.find("source", source)
+        ids = np.setdiff1d(ids, self._deleted)
+
+        if pages is not None:
+            # Table rows may carry the page as a string
+            wanted = {str(p) for p in pages}
+            ids = np.array([
+                i for i in ids
+                if str(self.records.get(int(i))["metadata"].get("page")) in wanted
+            ], dtype=np.int64)
+
+        return ids
+
+    def _tombstone(self, ids: np.ndarray):
+        # Caller holds self._lock and the view's write side
+        if len(ids):
+            self._deleted = np.union1d(self._deleted, ids)
+            self._deleted_dirty = True
+
+    def _reclaimable(self) -> np.ndarray:
+        """
+        Deleted ids that save / compaction may drop: all but staged rows.
+        """
+        if not self._staged:
+            return self._deleted
+        return np.setdiff1d(self._deleted, np.concatenate(list(self._staged.values())))
+
+    def _renumber_staged(self, dropped: np.ndarray):
+        for source, ids in self._staged.items():
+            self._staged[source] = ids - np.searchsorted(dropped, ids)
+
+    def live_records(self) -> Tuple[List[str], List[Dict]]:
+        """
+        Texts and metadata of every live chunk, in id order (e.g. to
+        build a secondary index over the same chunks).
+        """
+        with self._lock:
+            keep = np.flatnonzero(self._live_mask(len(self.records)))
+            records = [self.records.get(int(i)) for i in keep]
+
+        return [r["text"] for r in records], [r["metadata"] for r in records]
+
+    def has_source(self, source: str) -> bool:
+        with self._view.read():
+            ids = self.records.find("source", source)
+            return len(np.setdiff1d(ids, self._deleted)) > 0
+
+    def _selector(self):
+        if not len(self._deleted):
+            return None
+        return exclude_ids(self._deleted)
+
+    def _allowed_mask(self, filters: Dict) -> np.ndarray:
+        """
+        Live rows matching every filter, as a bitmap over all FAISS ids.
+        """
+        n_rows = self.index.ntotal
+        return self.metadata_index.mask(filters, n_rows) & self._live_mask(n_rows)
 
     # -----------------------------
     # SEARCH
     # -----------------------------
 
-    def search(self, query_embedding: List[float], top_k: int = 10) -> List[Dict]:
-        if self.index.ntotal == 0:
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rescore: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """
+        filters restricts the search to matching chunks, e.g.
+        {"source": ["a.pdf", "b.pdf"], "block_type": "text"}.
+        """
+        return self.search_batch(
+            [query_embedding], top_k, ef_search, nprobe, rescore, filters
+        )[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 10,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rescore: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+    ) -> List[List[Dict]]:
+        """
+        Searches many queries with a single FAISS call.
+        Returns one result list per query, in query order.
+        """
+        if not len(query_embeddings):
             return []
 
-        query_vec = np.array([query_embedding], dtype="float32")
-        faiss.normalize_L2(query_vec)
+        query_vecs = np.array(query_embeddings, dtype="float32").reshape(-1, self.dim)
+        faiss.normalize_L2(query_vecs)
 
-        scores, indices = self.index.search(query_vec, top_k)
+        # Runs alongside other searches and waits only for in-memory
+        # swaps, not for a writer's flush or a compaction
+        with self._view.read():
+            if self.index.ntotal == 0:
+                return [[] for _ in query_embeddings]
 
+            scores, indices = self._search_ids(
+                query_vecs, top_k, ef_search, nprobe, rescore, filters
+            )
+
+            return [
+                self._to_results(row_scores, row_ids)
+                for row_scores, row_ids in zip(scores, indices)
+            ]
+
+    def _to_results(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict]:
         results = []
-        for score, idx in zip(scores[0], indices[0]):
+        for score, idx in zip(scores, indices):
             if idx == -1:
                 continue
 
-            record = self.records[idx]
+            # Only the returned rows are decoded from the record store
+            record = self.records.get(int(idx))
             results.append({
                 "text": record["text"],
                 "metadata": record["metadata"],
@@ -77,20 +548,514 @@ class FAISSVectorStore:
 
         return results
 
+    def _search_ids(
+        self,
+        query_vecs: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rescore: Optional[bool] = None,
+        filters: Optional[Dict] = None,
+    ):
+        """
+        Raw FAISS search over normalized query vectors.
+        Compressed indexes over-fetch and are re-scored against the exact
+        float32 vectors when rescoring is on.
+
+        With filters, small allowed sets are scored exactly against the
+        raw vectors (an ANN graph walk would mostly visit rejected ids);
+        larger ones are pushed into FAISS as a bitmap selector.
+        """
+        selector = self._selector()
+
+        if filters:
+            allowed = self._allowed_mask(filters)
+            ids = np.flatnonzero(allowed)
+
+            if len(ids) <= self.exact_filter_limit:
+                candidates = np.broadcast_to(ids, (len(query_vecs), len(ids)))
+                return self._rescore(query_vecs, candidates, top_k)
+
+            selector = bitmap_selector(allowed)
+
+        if rescore is None:
+            rescore = self.rescore
+        rescore = rescore and self.active_encoding != ENCODING_FLOAT32
+
+        fetch_k = top_k * self.rescore_factor if rescore else top_k
+
+        params = search_params(
+            self.index,
+            fetch_k,
+            ef_search=ef_search or self.ef_search,
+            nprobe=nprobe or self.nprobe,
+            selector=selector,
+        )
+
+        distances, indices = self.index.search(query_vecs, fetch_k, params=params)
+        scores = to_similarity(self.index, distances)
+
+        if not rescore:
+            return scores, indices
+
+        return self._rescore(query_vecs, indices, top_k)
+
+    def _rescore(self, query_vecs: np.ndarray, indices: np.ndarray, top_k: int):
+        out_scores = np.full((len(query_vecs), top_k), -np.inf, dtype="float32")
+        out_ids = np.full((len(query_vecs), top_k), -1, dtype="int64")
+
+        for q, (query_vec, ids) in enumerate(zip(query_vecs, indices)):
+            ids = ids[ids != -1]
+            if not len(ids):
+                continue
+
+            exact = self.vectors.take(ids) @ query_vec
+            order = np.argsort(-exact)[:top_k]
+
+            out_scores[q, :len(order)] = exact[order]
+            out_ids[q, :len(order)] = ids[order]
+
+        return out_scores, out_ids
+
+    # -----------------------------
+    # STATS
+    # -----------------------------
+
+    def stats(self) -> Dict:
+        code_size = bytes_per_vector(self.index)
+        return {
+            "ntotal": self.ntotal,
+            "deleted": len(self._deleted),
+            "index_type": self.index_type,
+            "encoding": self.encoding,
+            "active_index_type": self.active_index_type,
+            "active_encoding": self.active_encoding,
+            "bytes_per_vector": code_size,
+            "compression": round(self.dim * 4 / code_size, 2),
+            "rescore": self.rescore and self.active_encoding != ENCODING_FLOAT32,
+        }
+
+    def measure_recall(
+        self,
+        top_k: int = 10,
+        sample_size: int = 200,
+        rescore: Optional[bool] = None,
+        seed: int = 0,
+    ) -> float:
+        """
+        recall@k of the active index against exact float32 search, using
+        stored vectors as queries. Cost grows with the corpus; meant for
+        on-demand reporting, not the request path.
+        """
+        with self._lock:
+            live = np.setdiff1d(np.arange(self.index.ntotal), self._deleted)
+            if not len(live):
+                return 1.0
+
+            exact_index = build_flat_index(self.dim)
+            exact_index.add(self.vectors.all())
+
+            rng = np.random.default_rng(seed)
+            sample = rng.choice(live, size=min(sample_size, len(live)), replace=False)
+            queries = self.vectors.take(sample)
+
+            k = min(top_k, len(live))
+            _, truth = exact_index.search(
+                queries, k, params=search_params(exact_index, k, selector=self._selector())
+            )
+            _, found = self._search_ids(queries, k, rescore=rescore)
+
+        hits = sum(
+            len(set(t[t != -1]) & set(f[f != -1]))
+            for t, f in zip(truth, found)
+        )
+        return hits / float(truth.size)
+
     # -----------------------------
     # PERSISTENCE
     # -----------------------------
 
     def save(self, folder_path: str):
+        """
+        Full rewrite as a new base snapshot. Drops all segments and
+        reclaims deleted rows.
+        """
         os.makedirs(folder_path, exist_ok=True)
+        self._wait_for_compaction()
+
+        with self._lock:
+            if self._folder_path != folder_path:
+                # Overwriting a folder this store did not load from
+                existing = self._read_manifest(folder_path)
+                self._next_id = max(self._next_id, existing.get("next_id", 1))
+
+            base = self._new_name("base")
+            dropped = self._reclaimable()
+            keep = self._live_mask(self.index.ntotal, dropped) if len(dropped) else None
+
+            # A full rewrite swaps everything; searches wait for it (it
+            # only runs on explicit saves and a folder's first flush)
+            with self._view.write():
+                self.vectors.save(folder_path, base, keep)
+                replaced = self.records.save(folder_path, base, keep)
+
+                if keep is not None:
+                    self.index = self._rebuild_index(self.vectors.all())
+                    # Only staged rows stay tombstoned, renumbered past the gaps
+                    staged = np.setdiff1d(self._deleted, dropped)
+                    self._deleted = staged - np.searchsorted(dropped, staged)
+                    self._renumber_staged(dropped)
+                    self.metadata_index.invalidate()
+
+            faiss.write_index(self.index, os.path.join(folder_path, _index_file(base)))
 
-        faiss.write_index(self.index, os.path.join(folder_path, "faiss.index"))
+            if self._folder_path != folder_path:
+                replaced = (
+                    [existing["base"]] + existing["segments"]
+                    if existing else []
+                )
+                if existing.get("tombstones"):
+                    replaced.append(existing["tombstones"])
+            elif self._tombstones:
+                replaced.append(self._tombstones)
 
-        with open(os.path.join(folder_path, "records.pkl"), "wb") as f:
-            pickle.dump(self.records, f)
+            self._base = base
+            self._segments = []
+            self._tombstones = None
+            if len(self._deleted):
+                self._tombstones = self._new_name("tomb")
+                np.save(
+                    os.path.join(folder_path, _tombstones_file(self._tombstones)),
+                    self._deleted,
+                )
+            self._deleted_dirty = False
+            self._folder_path = folder_path
+            self._write_manifest(folder_path)
+
+            for prefix in replaced:
+                self._remove_files(folder_path, prefix)
+
+        self._remove_legacy_files(folder_path)
+
+    def flush(self, folder_path: str):
+        """
+        Persists only what was added since the last save / flush as a new
+        append-only segment. Once max_segments have piled up they are
+        merged back into the base snapshot in a background thread.
+        """
+        if self._folder_path != folder_path:
+            # No base snapshot in this folder to append to yet
+            self.save(folder_path)
+            return
+
+        with self._lock:
+            if not self.vectors.has_pending and not self._deleted_dirty:
+                return
+
+            if self.vectors.has_pending:
+                prefix = self._new_name("seg")
+                self.vectors.write_segment(folder_path, prefix)
+                self.records.write_segment(folder_path, prefix)
+                with self._view.write():
+                    self.vectors.open_segment(folder_path, prefix)
+                    self.records.open_segment(folder_path, prefix)
+                self._segments.append(prefix)
+
+            old_tombstones = None
+            if self._deleted_dirty:
+                old_tombstones = self._tombstones
+                self._tombstones = self._new_name("tomb")
+                np.save(
+                    os.path.join(folder_path, _tombstones_file(self._tombstones)),
+                    self._deleted,
+                )
+                self._deleted_dirty = False
+
+            self._write_manifest(folder_path)
+
+            if old_tombstones:
+                self._remove_files(folder_path, old_tombstones)
+
+            deleted_ratio = len(self._reclaimable()) / max(1, self.index.ntotal)
+            if (
+                len(self._segments) >= self.max_segments
+                or deleted_ratio >= self.compact_deleted_ratio
+            ):
+                self._start_compaction(folder_path)
 
     def load(self, folder_path: str):
-        self.index = faiss.read_index(os.path.join(folder_path, "faiss.index"))
+        self._wait_for_compaction()
+
+        with self._lock:
+            with self._view.write():
+                self._load(folder_path)
+
+            # A Flat index saved below the threshold is promoted here (to the
+            # persisted mode) once it has grown past it; a different
+            # configured mode only takes effect after a rebuild
+            self._maybe_promote()
+
+    def _load(self, folder_path: str):
+        manifest = self._read_manifest(folder_path)
+
+        if not manifest:
+            self._load_legacy(folder_path)
+            return
+
+        self._base = manifest["base"]
+        self._segments = manifest["segments"]
+        self._tombstones = manifest.get("tombstones")
+        self._next_id = manifest["next_id"]
+
+        # The persisted mode wins over the constructor arguments
+        self.index_type = manifest.get("index_type", self.index_type)
+        self.encoding = manifest.get("encoding", self.encoding)
+
+        parts = [self._base] + self._segments
+        self.index = faiss.read_index(
+            os.path.join(folder_path, _index_file(self._base))
+        )
+        self.records.load(folder_path, parts)
+        self.vectors.load(folder_path, parts)
+
+        # Replay append-only segments on top of the base snapshot
+        for prefix in self._segments:
+            self.index.add(
+                np.load(os.path.join(folder_path, vectors_file(prefix)))
+            )
+
+        if self.index.ntotal != len(self.records):
+            raise RuntimeError(
+                f"Index / record count mismatch: "
+                f"{self.index.ntotal} vectors, {len(self.records)} records"
+            )
+
+        self._deleted = np.empty(0, dtype=np.int64)
+        if self._tombstones:
+            self._deleted = np.load(
+                os.path.join(folder_path, _tombstones_file(self._tombstones))
+            )
+        self._deleted_dirty = False
+        self._staged = {}
+
+        self._folder_path = folder_path
+        self.metadata_index.invalidate()
+
+    def _load_legacy(self, folder_path: str):
+        """
+        Folders written before manifest.json hold a single faiss.index
+        plus records.* (or an even older records.pkl). They are converted
+        on the next save.
+        """
+        self.index = faiss.read_index(os.path.join(folder_path, LEGACY_INDEX_FILE))
+        self.records = RecordStore()
+        self.vectors = RawVectors(self.dim)
+        self.vectors.append(all_vectors(self.index))
+        self._deleted = np.empty(0, dtype=np.int64)
+        self.metadata_index.invalidate(self.records)
+
+        if part_exists(folder_path, LEGACY_RECORDS_PREFIX):
+            self.records.load(folder_path, [LEGACY_RECORDS_PREFIX])
+        else:
+            with open(os.path.join(folder_path, "records.pkl"), "rb") as f:
+                legacy = pickle.load(f)
+
+            self.records.append(
+                [r["text"] for r in legacy],
+                [r["metadata"] for r in legacy],
+            )
+
+    def _remove_legacy_files(self, folder_path: str):
+        for name in (LEGACY_INDEX_FILE, "records.pkl"):
+            path = os.path.join(folder_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+        remove_part(folder_path, LEGACY_RECORDS_PREFIX)
+
+    def _new_name(self, kind: str) -> str:
+        name = f"{kind}_{self._next_id:06d}"
+        self._next_id += 1
+        return name
+
+    def _read_manifest(self, folder_path: str) -> Dict:
+        path = os.path.join(folder_path, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, folder_path: str):
+        """
+        The manifest is the commit point: files it does not name are
+        either not written yet or about to be removed.
+        """
+        path = os.path.join(folder_path, MANIFEST_FILE)
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "base": self._base,
+                "segments": self._segments,
+                "tombstones": self._tombstones,
+                "next_id": self._next_id,
+                "index_type": self.index_type,
+                "encoding": self.encoding,
+            }, f)
+
+        os.replace(tmp_path, path)
+
+    def _remove_files(self, folder_path: str, prefix: str):
+        remove_part(folder_path, prefix)
+
+        for name in (_index_file(prefix), vectors_file(prefix), _tombstones_file(prefix)):
+            path = os.path.join(folder_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    # -----------------------------
+    # COMPACTION
+    # -----------------------------
+
+    def _live_mask(self, n_rows: int, deleted: Optional[np.ndarray] = None) -> np.ndarray:
+        if deleted is None:
+            deleted = self._deleted
+        keep = np.ones(n_rows, dtype=bool)
+        keep[deleted[deleted < n_rows]] = False
+        return keep
+
+    def _rebuild_index(self, vectors: np.ndarray):
+        """
+        Fresh index with the same type / encoding as the current one, or
+        an exact Flat index again when deletes left too few vectors to
+        train its codec (promoted again once it has grown back).
+        """
+        exact = index_spec(self.index) == (INDEX_FLAT, ENCODING_FLOAT32)
+        floor = min_training_points(self.index_type, self.encoding)
+
+        if exact or len(vectors) < floor:
+            if not exact:
+                print(
+                    f"INFO: {len(vectors)} vectors left, below the {floor} needed "
+                    f"to train {self.index_type}/{self.encoding}; index is Flat again"
+                )
+            index = build_flat_index(self.dim)
+            index.add(vectors)
+            return index
+
+        return build_index(
+            self.index_type,
+            self.encoding,
+            self.dim,
+            vectors,
+            hnsw_m=self.hnsw_m,
+            ivf_nlist=self.ivf_nlist,
+            pq_m=self.pq_m,
+        )
+
+    def _start_compaction(self, folder_path: str):
+        if self._compaction and self._compaction.is_alive():
+            return
+
+        # Taken right after a flush, so every row lives in a saved part
+        # and the snapshot covers exactly the parts being merged
+        n_parts = len(self.records.part_prefixes)
+        n_rows = self.records.saved_rows
+        deleted = self._reclaimable().copy()
+        base = self._new_name("base")
+
+        # Without deletes the live index is already the merged index
+        index_bytes = None if len(deleted) else faiss.serialize_index(self.index)
+
+        self._compaction = Thread(
+            target=self._compact,
+            args=(folder_path, base, n_parts, n_rows, deleted, index_bytes),
+            daemon=True,
+        )
+        self._compaction.start()
+
+    def _compact(
+        self,
+        folder_path: str,
+        base: str,
+        n_parts: int,
+        n_rows: int,
+        deleted: np.ndarray,
+        index_bytes,
+    ):
+        """
+        Merges the base snapshot and the first segments into a new base,
+        dropping deleted rows. The writes and any index rebuild happen
+        outside the lock; only the final swap blocks adds and searches.
+        """
+        keep = self._live_mask(n_rows, deleted) if len(deleted) else None
+
+        try:
+            self.vectors.write_merged(folder_path, base, n_parts, keep)
+            self.records.write_merged(folder_path, base, n_parts, keep)
+
+            if index_bytes is not None:
+                new_index = faiss.deserialize_index(index_bytes)
+            else:
+                merged_vectors = np.load(
+                    os.path.join(folder_path, vectors_file(base))
+                )
+                new_index = self._rebuild_index(merged_vectors)
+
+            faiss.write_index(new_index, os.path.join(folder_path, _index_file(base)))
+        except Exception as e:
+            self._remove_files(folder_path, base)
+            print(f"WARNING: Index compaction failed: {e}")
+            return
+
+        with self._lock:
+            if keep is not None:
+                # Rows added after the snapshot go on top of the rebuilt index
+                total = self.index.ntotal
+                if total > n_rows:
+                    new_index.add(self.vectors.rows(n_rows, total))
+
+            with self._view.write():
+                if keep is not None:
+                    # Deletes made after the snapshot (and staged rows),
+                    # renumbered past the gaps
+                    later = np.setdiff1d(self._deleted, deleted)
+                    self._deleted = later - np.searchsorted(deleted, later)
+                    self._renumber_staged(deleted)
+                    self._deleted_dirty = True
+                    self.index = new_index
+
+                self.vectors.swap_merged(folder_path, base, n_parts)
+                merged = self.records.swap_merged(folder_path, base, n_parts)
+                self.metadata_index.invalidate()
+
+            self._base = base
+            self._segments = [p for p in self._segments if p not in merged]
+
+            if self._deleted_dirty:
+                merged.append(self._tombstones)
+                self._tombstones = None
+                if len(self._deleted):
+                    self._tombstones = self._new_name("tomb")
+                    np.save(
+                        os.path.join(folder_path, _tombstones_file(self._tombstones)),
+                        self._deleted,
+                    )
+                self._deleted_dirty = False
+
+            self._write_manifest(folder_path)
+
+            for prefix in merged:
+                if prefix:
+                    self._remove_files(folder_path, prefix)
+
+        print(
+            f"INFO: Compacted {n_parts} index parts into {base} "
+            f"({len(deleted)} deleted rows reclaimed)"
+        )
 
-        with open(os.path.join(folder_path, "records.pkl"), "rb") as f:
-            self.records = pickle.load(f)
+    def _wait_for_compaction(self):
+        compaction = self._compaction
+        if compaction and compaction.is_alive():
+            compaction.join()
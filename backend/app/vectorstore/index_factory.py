@@ -0,0 +1,251 @@
+from typing import Optional, Tuple
+import math
+import numpy as np
+import faiss
+
+
+INDEX_FLAT = "flat"
+INDEX_HNSW = "hnsw"
+INDEX_IVF = "ivf"
+
+INDEX_TYPES = (INDEX_FLAT, INDEX_HNSW, INDEX_IVF)
+
+ENCODING_FLOAT32 = "float32"
+ENCODING_FP16 = "fp16"
+ENCODING_SQ8 = "sq8"
+ENCODING_PQ = "pq"
+
+ENCODINGS = (ENCODING_FLOAT32, ENCODING_FP16, ENCODING_SQ8, ENCODING_PQ)
+
+# FAISS wants ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+# 8-bit PQ sub-quantizers have 256 centroids each
+PQ_CENTROIDS = 256
+
+
+# -----------------------------
+# BUILD
+# -----------------------------
+
+def build_flat_index(dim: int):
+    return faiss.IndexFlatIP(dim)
+
+
+def default_pq_m(dim: int) -> int:
+    """
+    Largest sub-quantizer count <= dim / 4 that divides dim
+    (96 bytes per vector for 384-d MiniLM, i.e. 16x smaller).
+    """
+    m = max(1, dim // 4)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _codec(encoding: str, dim: int, pq_m: Optional[int]) -> str:
+    if encoding == ENCODING_FLOAT32:
+        return "Flat"
+    if encoding == ENCODING_FP16:
+        return "SQfp16"
+    if encoding == ENCODING_SQ8:
+        return "SQ8"
+    if encoding == ENCODING_PQ:
+        m = pq_m or default_pq_m(dim)
+        if dim % m:
+            raise ValueError(f"PQ sub-quantizers ({m}) must divide dim ({dim})")
+        return f"PQ{m}"
+
+    raise ValueError(
+        f"Unsupported encoding: {encoding}. "
+        f"Supported encodings: {ENCODINGS}"
+    )
+
+
+def _ivf_nlist(n: int, nlist: Optional[int]) -> int:
+    """
+    nlist defaults to ~4 * sqrt(n) and is capped by the training set size.
+    """
+    if nlist is None:
+        nlist = int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // MIN_POINTS_PER_CENTROID))
+
+
+def factory_string(
+    index_type: str,
+    encoding: str,
+    dim: int,
+    n: int,
+    hnsw_m: int = 32,
+    ivf_nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+) -> str:
+    codec = _codec(encoding, dim, pq_m)
+
+    if index_type == INDEX_FLAT:
+        return codec
+    if index_type == INDEX_HNSW:
+        return f"HNSW{hnsw_m}" if codec == "Flat" else f"HNSW{hnsw_m}_{codec}"
+    if index_type == INDEX_IVF:
+        return f"IVF{_ivf_nlist(n, ivf_nlist)},{codec}"
+
+    raise ValueError(
+        f"Unsupported index type: {index_type}. "
+        f"Supported types: {INDEX_TYPES}"
+    )
+
+
+def min_training_points(index_type: str, encoding: str) -> int:
+    points = 1
+    if index_type == INDEX_IVF:
+        points = MIN_POINTS_PER_CENTROID
+    if encoding == ENCODING_PQ:
+        # Every sub-quantizer trains PQ_CENTROIDS centroids
+        points = max(points, MIN_POINTS_PER_CENTROID * PQ_CENTROIDS)
+    return points
+
+
+def build_index(
+    index_type: str,
+    encoding: str,
+    dim: int,
+    vectors: np.ndarray,
+    hnsw_m: int = 32,
+    ivf_nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+):
+    """
+    Builds an index of the requested type / encoding, trains it on the
+    given vectors if the codec needs it, and fills it.
+    """
+    description = factory_string(
+        index_type, encoding, dim, len(vectors),
+        hnsw_m=hnsw_m, ivf_nlist=ivf_nlist, pq_m=pq_m,
+    )
+    index = faiss.index_factory(dim, description, faiss.METRIC_INNER_PRODUCT)
+
+    if not index.is_trained:
+        index.train(vectors)
+
+    if len(vectors):
+        index.add(vectors)
+
+    return index
+
+
+# -----------------------------
+# INSPECTION
+# -----------------------------
+
+def index_kind(index) -> str:
+    index = faiss.downcast_index(index)
+
+    if isinstance(index, faiss.IndexHNSW):
+        return INDEX_HNSW
+    if isinstance(index, faiss.IndexIVF):
+        return INDEX_IVF
+    return INDEX_FLAT
+
+
+def index_encoding(index) -> str:
+    index = faiss.downcast_index(index)
+
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return ENCODING_PQ
+
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+            return ENCODING_FP16
+        return ENCODING_SQ8
+
+    return ENCODING_FLOAT32
+
+
+def index_spec(index) -> Tuple[str, str]:
+    return index_kind(index), index_encoding(index)
+
+
+def bytes_per_vector(index) -> int:
+    """
+    Size of one stored code (graph / list overhead not included).
+    """
+    index = faiss.downcast_index(index)
+
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+
+    if isinstance(index, faiss.IndexIVF):
+        return index.code_size
+
+    return index.sa_code_size()
+
+
+def to_similarity(index, distances: np.ndarray) -> np.ndarray:
+    """
+    Some composite indexes (e.g. HNSW + PQ) only search in L2.
+    For unit vectors ||a - b||^2 = 2 - 2 * <a, b>, so the inner product
+    is recovered exactly and scores stay comparable across modes.
+    """
+    if index.metric_type == faiss.METRIC_L2:
+        return 1.0 - distances / 2.0
+    return distances
+
+
+def all_vectors(index) -> np.ndarray:
+    """
+    Reads every stored vector back out of an index.
+    """
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype="float32")
+
+    if index_kind(index) == INDEX_IVF:
+        # IVF lists are not addressable by id without a direct map
+        faiss.extract_index_ivf(index).make_direct_map()
+
+    return index.reconstruct_n(0, index.ntotal)
+
+
+# -----------------------------
+# SEARCH-TIME PARAMETERS
+# -----------------------------
+
+def search_params(
+    index,
+    top_k: int,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    selector=None,
+):
+    """
+    Per-query knobs plus an optional IDSelector restricting which ids may
+    be returned. Returns None when nothing needs overriding.
+    """
+    kind = index_kind(index)
+    extra = {"sel": selector} if selector is not None else {}
+
+    if kind == INDEX_HNSW and ef_search is not None:
+        # efSearch below k silently truncates the result list
+        return faiss.SearchParametersHNSW(efSearch=max(ef_search, top_k), **extra)
+
+    if kind == INDEX_IVF and nprobe is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe, **extra)
+
+    if selector is not None:
+        return faiss.SearchParameters(**extra)
+
+    return None
+
+
+def exclude_ids(ids: np.ndarray):
+    """
+    IDSelector matching every id except the given ones.
+    The batch selector is attached to the returned object so it is not
+    garbage-collected while FAISS still points at it.
+    """
+    batch = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype="int64"))
+    selector = faiss.IDSelectorNot(batch)
+    selector.referenced_objects = [batch]
+    return selector
@@ -0,0 +1,78 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+import faiss
+
+from .record_store import RecordStore, FILTERABLE_COLUMNS
+
+
+def _as_values(value) -> Tuple:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(value)
+    return (value,)
+
+
+class MetadataIndex:
+    """
+    Inverted index from (column, value) to row ids for the filterable
+    record columns: source, block_type and doc_level.
+
+    Postings are computed from the columnar record store on first use and
+    cached. Appends are picked up automatically; anything that renumbers
+    rows (compaction, reload) must call invalidate(). Filters combine as
+    AND across columns and OR across the values given for one column, e.g.
+
+        {"source": ["a.pdf", "b.pdf"], "block_type": "text"}
+    """
+
+    def __init__(self, records: RecordStore):
+        self.records = records
+        self._postings: Dict[Tuple[str, object], np.ndarray] = {}
+        self._rows = 0
+
+    def invalidate(self, records: Optional[RecordStore] = None):
+        if records is not None:
+            self.records = records
+        self._postings = {}
+        self._rows = 0
+
+    def ids(self, column: str, value) -> np.ndarray:
+        if column not in FILTERABLE_COLUMNS:
+            raise ValueError(
+                f"Unsupported filter column: {column}. "
+                f"Supported columns: {FILTERABLE_COLUMNS}"
+            )
+
+        if len(self.records) != self._rows:
+            self._postings = {}
+            self._rows = len(self.records)
+
+        key = (column, value)
+        if key not in self._postings:
+            self._postings[key] = self.records.find(column, value)
+        return self._postings[key]
+
+    def mask(self, filters: Dict, n_rows: int) -> np.ndarray:
+        """
+        Boolean bitmap over [0, n_rows) of rows matching every filter.
+        """
+        allowed = np.ones(n_rows, dtype=bool)
+
+        for column, value in filters.items():
+            column_mask = np.zeros(n_rows, dtype=bool)
+            for v in _as_values(value):
+                column_mask[self.ids(column, v)] = True
+            allowed &= column_mask
+
+        return allowed
+
+
+def bitmap_selector(mask: np.ndarray):
+    """
+    FAISS IDSelectorBitmap over a boolean mask (bit i of byte i // 8,
+    least significant first). The packed buffer is attached to the
+    selector so it outlives the search call.
+    """
+    bits = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits))
+    selector.referenced_objects = [bits]
+    return selector
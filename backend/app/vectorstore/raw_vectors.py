@@ -0,0 +1,174 @@
+from typing import List, Optional
+from bisect import bisect_right
+import os
+import numpy as np
+
+
+def vectors_file(prefix: str) -> str:
+    return f"{prefix}.vectors.npy"
+
+
+class RawVectors:
+    """
+    Exact float32 copy of every normalized vector, laid out in the same
+    parts as RecordStore (base + segments + in-memory tail).
+
+    Saved parts are memory-mapped, so they cost disk rather than RAM.
+    Used to rebuild / promote the FAISS index and to re-score candidates
+    coming out of a compressed index.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._parts: List[np.ndarray] = []
+        self._prefixes: List[str] = []
+        self._starts: List[int] = []
+        self._pending: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return self.saved_rows + sum(len(v) for v in self._pending)
+
+    @property
+    def saved_rows(self) -> int:
+        if not self._parts:
+            return 0
+        return self._starts[-1] + len(self._parts[-1])
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def append(self, vectors: np.ndarray):
+        self._pending.append(vectors)
+
+    def take(self, ids: np.ndarray) -> np.ndarray:
+        out = np.empty((len(ids), self.dim), dtype="float32")
+        pending = self._pending_matrix() if self._pending else None
+
+        for row, index_id in enumerate(ids):
+            index_id = int(index_id)
+            if index_id < self.saved_rows:
+                p = bisect_right(self._starts, index_id) - 1
+                out[row] = self._parts[p][index_id - self._starts[p]]
+            else:
+                out[row] = pending[index_id - self.saved_rows]
+
+        return out
+
+    def rows(self, start: int, end: int) -> np.ndarray:
+        return self.take(np.arange(start, end))
+
+    def all(self) -> np.ndarray:
+        arrays = list(self._parts) + list(self._pending)
+        if not arrays:
+            return np.empty((0, self.dim), dtype="float32")
+        return np.ascontiguousarray(np.concatenate(arrays), dtype="float32")
+
+    def _pending_matrix(self) -> np.ndarray:
+        if len(self._pending) > 1:
+            self._pending = [np.concatenate(self._pending)]
+        return self._pending[0]
+
+    def _open(self, folder_path: str, prefix: str):
+        self._starts.append(self.saved_rows)
+        self._parts.append(
+            np.load(os.path.join(folder_path, vectors_file(prefix)), mmap_mode="r")
+        )
+        self._prefixes.append(prefix)
+
+    def _reset(self):
+        self._parts = []
+        self._prefixes = []
+        self._starts = []
+
+    def _write(
+        self,
+        folder_path: str,
+        prefix: str,
+        arrays: List[np.ndarray],
+        keep: Optional[np.ndarray] = None,
+    ) -> int:
+        if keep is not None:
+            # keep is indexed across all arrays, in order
+            kept, offset = [], 0
+            for a in arrays:
+                kept.append(a[keep[offset:offset + len(a)]])
+                offset += len(a)
+            arrays = kept
+
+        rows = sum(len(a) for a in arrays)
+        out = np.lib.format.open_memmap(
+            os.path.join(folder_path, vectors_file(prefix)),
+            mode="w+",
+            dtype="float32",
+            shape=(rows, self.dim),
+        )
+
+        offset = 0
+        for a in arrays:
+            out[offset:offset + len(a)] = a
+            offset += len(a)
+
+        out.flush()
+        del out
+        return rows
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+
+    def save(
+        self,
+        folder_path: str,
+        prefix: str,
+        keep: Optional[np.ndarray] = None,
+    ) -> List[str]:
+        self._write(folder_path, prefix, list(self._parts) + self._pending, keep)
+
+        replaced = [p for p in self._prefixes if p != prefix]
+        self._reset()
+        self._pending = []
+        self._open(folder_path, prefix)
+        return replaced
+
+    def write_segment(self, folder_path: str, prefix: str) -> int:
+        """
+        Writes the in-memory rows as a new part; open_segment() then
+        swaps it in for them.
+        """
+        return self._write(folder_path, prefix, self._pending)
+
+    def open_segment(self, folder_path: str, prefix: str):
+        self._pending = []
+        self._open(folder_path, prefix)
+
+    def load(self, folder_path: str, prefixes: List[str]):
+        self._reset()
+        self._pending = []
+
+        for prefix in prefixes:
+            self._open(folder_path, prefix)
+
+    # -----------------------------
+    # COMPACTION
+    # -----------------------------
+
+    def write_merged(
+        self,
+        folder_path: str,
+        prefix: str,
+        n_parts: int,
+        keep: Optional[np.ndarray] = None,
+    ) -> int:
+        return self._write(folder_path, prefix, self._parts[:n_parts], keep)
+
+    def swap_merged(self, folder_path: str, prefix: str, n_parts: int) -> List[str]:
+        merged = self._prefixes[:n_parts]
+        remaining = self._prefixes[n_parts:]
+
+        self._reset()
+        self._open(folder_path, prefix)
+        for segment_prefix in remaining:
+            self._open(folder_path, segment_prefix)
+
+        return merged
@@ -0,0 +1,369 @@
+from typing import List, Dict, Optional
+from bisect import bisect_right
+from itertools import chain
+import os
+import json
+import numpy as np
+
+
+# Metadata keys stored as dictionary-encoded int32 columns
+CODED_COLUMNS = ("source", "block_type")
+
+# doc_level is stored as uint8: 0 / 1, or MISSING when not a plain bool
+DOC_LEVEL_MISSING = 255
+
+# Columns that can be matched without decoding rows
+FILTERABLE_COLUMNS = CODED_COLUMNS + ("doc_level",)
+
+# Code for "key not present" in a coded column
+CODE_MISSING = -1
+
+
+def _columnar_files(prefix: str) -> Dict[str, str]:
+    return {
+        "header": f"{prefix}.json",
+        "text_off": f"{prefix}.text_off.npy",
+        "text": f"{prefix}.text.bin",
+        "meta_off": f"{prefix}.meta_off.npy",
+        "meta": f"{prefix}.meta.bin",
+        "doc_level": f"{prefix}.doc_level.npy",
+        **{name: f"{prefix}.{name}.npy" for name in CODED_COLUMNS},
+    }
+
+
+def _open_blob(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+# -----------------------------
+# ON-DISK PART
+# -----------------------------
+
+class ColumnarPart:
+    """
+    Read-only, memory-mapped block of records.
+
+    Layout (one file per column):
+    - text blob + uint64 offsets
+    - metadata blob (JSON per row, minus the columnar keys) + offsets
+    - dictionary-encoded source / block_type codes
+    - doc_level flags
+
+    Nothing is decoded until a row is requested.
+    """
+
+    def __init__(self, folder_path: str, prefix: str):
+        files = {
+            k: os.path.join(folder_path, v)
+            for k, v in _columnar_files(prefix).items()
+        }
+
+        with open(files["header"], "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        self.rows: int = header["rows"]
+        self.vocab: Dict[str, List] = header["vocab"]
+
+        self.text_off = np.load(files["text_off"], mmap_mode="r")
+        self.text = _open_blob(files["text"])
+        self.meta_off = np.load(files["meta_off"], mmap_mode="r")
+        self.meta = _open_blob(files["meta"])
+        self.doc_level = np.load(files["doc_level"], mmap_mode="r")
+        self.codes = {
+            name: np.load(files[name], mmap_mode="r")
+            for name in CODED_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def text_at(self, i: int) -> str:
+        start, end = int(self.text_off[i]), int(self.text_off[i + 1])
+        return bytes(self.text[start:end]).decode("utf-8")
+
+    def metadata_at(self, i: int) -> Dict:
+        start, end = int(self.meta_off[i]), int(self.meta_off[i + 1])
+        metadata = json.loads(bytes(self.meta[start:end]).decode("utf-8"))
+
+        for name in CODED_COLUMNS:
+            code = int(self.codes[name][i])
+            if code != CODE_MISSING:
+                metadata[name] = self.vocab[name][code]
+
+        flag = int(self.doc_level[i])
+        if flag != DOC_LEVEL_MISSING:
+            metadata["doc_level"] = bool(flag)
+
+        return metadata
+
+    def find(self, name: str, value) -> np.ndarray:
+        """
+        Local row ids whose column `name` equals value.
+        """
+        if name == "doc_level":
+            if not isinstance(value, bool):
+                return np.empty(0, dtype=np.int64)
+            return np.flatnonzero(self.doc_level == int(value))
+
+        for code, known in enumerate(self.vocab[name]):
+            if known == value:
+                return np.flatnonzero(self.codes[name] == code)
+        return np.empty(0, dtype=np.int64)
+
+
+def write_part(folder_path: str, prefix: str, rows) -> int:
+    """
+    Writes (text, metadata) pairs as one columnar part.
+    Returns the number of rows written.
+    """
+    files = {
+        k: os.path.join(folder_path, v)
+        for k, v in _columnar_files(prefix).items()
+    }
+
+    vocab: Dict[str, List] = {name: [] for name in CODED_COLUMNS}
+    lookup: Dict[str, Dict] = {name: {} for name in CODED_COLUMNS}
+    codes: Dict[str, List[int]] = {name: [] for name in CODED_COLUMNS}
+    doc_level: List[int] = []
+    text_off = [0]
+    meta_off = [0]
+
+    with open(files["text"], "wb") as text_f, open(files["meta"], "wb") as meta_f:
+        for text, metadata in rows:
+            remainder = dict(metadata)
+
+            for name in CODED_COLUMNS:
+                if name not in remainder:
+                    codes[name].append(CODE_MISSING)
+                    continue
+
+                value = remainder.pop(name)
+                key = json.dumps(value)
+                if key not in lookup[name]:
+                    lookup[name][key] = len(vocab[name])
+                    vocab[name].append(value)
+                codes[name].append(lookup[name][key])
+
+            if isinstance(remainder.get("doc_level"), bool):
+                doc_level.append(int(remainder.pop("doc_level")))
+            else:
+                doc_level.append(DOC_LEVEL_MISSING)
+
+            text_bytes = text.encode("utf-8")
+            meta_bytes = json.dumps(remainder, separators=(",", ":")).encode("utf-8")
+
+            text_f.write(text_bytes)
+            meta_f.write(meta_bytes)
+            text_off.append(text_off[-1] + len(text_bytes))
+            meta_off.append(meta_off[-1] + len(meta_bytes))
+
+    np.save(files["text_off"], np.array(text_off, dtype=np.uint64))
+    np.save(files["meta_off"], np.array(meta_off, dtype=np.uint64))
+    np.save(files["doc_level"], np.array(doc_level, dtype=np.uint8))
+    for name in CODED_COLUMNS:
+        np.save(files[name], np.array(codes[name], dtype=np.int32))
+
+    # Header last: a part without a header is never opened
+    with open(files["header"], "w", encoding="utf-8") as f:
+        json.dump({"rows": len(doc_level), "vocab": vocab}, f)
+
+    return len(doc_level)
+
+
+def part_exists(folder_path: str, prefix: str) -> bool:
+    header = _columnar_files(prefix)["header"]
+    return os.path.exists(os.path.join(folder_path, header))
+
+
+def remove_part(folder_path: str, prefix: str):
+    # Header first so a half-removed part is never opened
+    files = _columnar_files(prefix)
+    for key in ["header"] + [k for k in files if k != "header"]:
+        path = os.path.join(folder_path, files[key])
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def iter_part_rows(parts: List[ColumnarPart], keep: Optional[np.ndarray] = None):
+    """
+    Yields (text, metadata) for every row of the given parts, skipping
+    rows whose entry in keep (indexed across all parts) is False.
+    """
+    offset = 0
+    for part in parts:
+        for i in range(len(part)):
+            if keep is None or keep[offset + i]:
+                yield part.text_at(i), part.metadata_at(i)
+        offset += len(part)
+
+
+# -----------------------------
+# RECORD STORE
+# -----------------------------
+
+class RecordStore:
+    """
+    Positional record storage for FAISSVectorStore.
+
+    Saved rows live in memory-mapped ColumnarParts (a base part plus any
+    append-only segments, in insertion order); rows added since the last
+    save are kept in memory. Only rows that are actually read get
+    decoded into Python objects.
+
+    Parts are immutable once written. File removal is left to the caller
+    so it can happen after the new layout has been committed.
+    """
+
+    def __init__(self):
+        self._parts: List[ColumnarPart] = []
+        self._prefixes: List[str] = []
+        self._starts: List[int] = []
+        self._pending: List[tuple] = []
+
+    def __len__(self) -> int:
+        return self.saved_rows + len(self._pending)
+
+    @property
+    def saved_rows(self) -> int:
+        if not self._parts:
+            return 0
+        return self._starts[-1] + len(self._parts[-1])
+
+    @property
+    def part_prefixes(self) -> List[str]:
+        return list(self._prefixes)
+
+    def append(self, texts: List[str], metadatas: List[Dict]):
+        self._pending.extend(zip(texts, metadatas))
+
+    def find(self, name: str, value) -> np.ndarray:
+        """
+        Row ids whose metadata[name] equals value (filterable columns
+        only). Saved parts are scanned column-wise without decoding rows.
+        """
+        if name not in FILTERABLE_COLUMNS:
+            raise ValueError(f"Not a filterable column: {name}")
+
+        found = [
+            part.find(name, value) + start
+            for part, start in zip(self._parts, self._starts)
+        ]
+
+        saved = self.saved_rows
+        found.append(np.array([
+            saved + i
+            for i, (_, metadata) in enumerate(self._pending)
+            if name in metadata and metadata[name] == value
+        ], dtype=np.int64))
+
+        return np.concatenate(found).astype(np.int64)
+
+    def get(self, index_id: int) -> Dict:
+        if index_id < self.saved_rows:
+            p = bisect_right(self._starts, index_id) - 1
+            part = self._parts[p]
+            local = index_id - self._starts[p]
+            text = part.text_at(local)
+            metadata = part.metadata_at(local)
+        else:
+            text, metadata = self._pending[index_id - self.saved_rows]
+
+        return {
+            "index_id": index_id,
+            "text": text,
+            "metadata": metadata,
+            # Preserve block_type (text or table_row)
+            "block_type": metadata.get("block_type", "text"),
+        }
+
+    def _open(self, folder_path: str, prefix: str):
+        self._starts.append(self.saved_rows)
+        self._parts.append(ColumnarPart(folder_path, prefix))
+        self._prefixes.append(prefix)
+
+    def _reset(self):
+        self._parts = []
+        self._prefixes = []
+        self._starts = []
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+
+    def save(
+        self,
+        folder_path: str,
+        prefix: str,
+        keep: Optional[np.ndarray] = None,
+    ) -> List[str]:
+        """
+        Full rewrite of every row (or only rows marked in keep) into a
+        single part. Returns the prefixes of the parts it replaced.
+        """
+        saved = self.saved_rows
+        pending = [
+            row for i, row in enumerate(self._pending)
+            if keep is None or keep[saved + i]
+        ]
+        rows = chain(iter_part_rows(self._parts, keep), pending)
+        write_part(folder_path, prefix, rows)
+
+        replaced = [p for p in self._prefixes if p != prefix]
+        self._reset()
+        self._pending = []
+        self._open(folder_path, prefix)
+        return replaced
+
+    def write_segment(self, folder_path: str, prefix: str) -> int:
+        """
+        Writes the in-memory rows as a new part without touching
+        anything already on disk (or in memory); open_segment() then
+        swaps it in for them, so the slow write can overlap readers.
+        """
+        return write_part(folder_path, prefix, self._pending)
+
+    def open_segment(self, folder_path: str, prefix: str):
+        self._pending = []
+        self._open(folder_path, prefix)
+
+    def load(self, folder_path: str, prefixes: List[str]):
+        self._reset()
+        self._pending = []
+
+        for prefix in prefixes:
+            self._open(folder_path, prefix)
+
+    # -----------------------------
+    # COMPACTION
+    # -----------------------------
+
+    def write_merged(
+        self,
+        folder_path: str,
+        prefix: str,
+        n_parts: int,
+        keep: Optional[np.ndarray] = None,
+    ) -> int:
+        """
+        Writes the first n_parts parts (minus rows not in keep) as one new
+        part. Safe to run while new segments are being appended.
+        """
+        parts = self._parts[:n_parts]
+        return write_part(folder_path, prefix, iter_part_rows(parts, keep))
+
+    def swap_merged(self, folder_path: str, prefix: str, n_parts: int) -> List[str]:
+        """
+        Replaces the first n_parts parts with the part written by
+        write_merged(). Returns the prefixes that were merged away.
+        """
+        merged = self._prefixes[:n_parts]
+        remaining = self._prefixes[n_parts:]
+
+        self._reset()
+        self._open(folder_path, prefix)
+        for segment_prefix in remaining:
+            self._open(folder_path, segment_prefix)
+
+        return merged
@@ -0,0 +1,343 @@
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, RLock
+import os
+import json
+import zlib
+
+from .faiss_store import FAISSVectorStore
+
+SHARDS_FILE = "shards.json"
+
+PARTITION_SOURCE_HASH = "source_hash"
+PARTITION_ROUND_ROBIN = "round_robin"
+
+PARTITIONS = (PARTITION_SOURCE_HASH, PARTITION_ROUND_ROBIN)
+
+
+def _shard_dir(folder_path: str, shard_index: int) -> str:
+    return os.path.join(folder_path, f"shard_{shard_index:02d}")
+
+
+class ShardedVectorStore:
+    """
+    Drop-in replacement for FAISSVectorStore that partitions chunks over
+    several independent FAISSVectorStore shards.
+
+    - source_hash keeps every chunk of a document on one shard
+    - round_robin spreads chunks evenly regardless of document
+
+    Searches fan out to all shards in parallel threads (FAISS releases
+    the GIL) and the per-shard top-k lists are merged by score.
+    Deletes are broadcast, so chunks never have to be routed back to the
+    shard they were written to. That is what lets add_shard() work
+    without moving or re-embedding existing data.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        num_shards: int = 2,
+        partition: str = PARTITION_SOURCE_HASH,
+        **store_kwargs,
+    ):
+        if partition not in PARTITIONS:
+            raise ValueError(
+                f"Unsupported partition: {partition}. "
+                f"Supported partitions: {PARTITIONS}"
+            )
+
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+
+        self.dim = dim
+        self.partition = partition
+        self.store_kwargs = store_kwargs
+
+        self.shards: List[FAISSVectorStore] = [
+            self._new_shard() for _ in range(num_shards)
+        ]
+
+        self._next_shard = 0
+        self._lock = RLock()
+        # Guards swapping the shard list and pool; held only briefly, so
+        # searches never wait for a write holding _lock
+        self._layout_lock = Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=num_shards, thread_name_prefix="vector-shard"
+        )
+
+    def _new_shard(self) -> FAISSVectorStore:
+        return FAISSVectorStore(dim=self.dim, **self.store_kwargs)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.shards)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    def add_shard(self) -> int:
+        """
+        Adds an empty shard. Existing chunks stay where they are; new
+        documents start hashing across the larger shard set.
+        """
+        with self._lock:
+            self._swap_shards(self.shards + [self._new_shard()])
+            return self.num_shards - 1
+
+    def _swap_shards(self, shards: List[FAISSVectorStore]):
+        """
+        Installs a new shard list and a pool sized for it. Searches that
+        already submitted to the old pool finish there.
+        """
+        with self._layout_lock:
+            old_pool = self._pool
+            self.shards = shards
+            self._pool = ThreadPoolExecutor(
+                max_workers=len(shards), thread_name_prefix="vector-shard"
+            )
+        old_pool.shutdown(wait=False)
+
+    # -----------------------------
+    # ROUTING
+    # -----------------------------
+
+    def _shard_for_source(self, source: Optional[str]) -> int:
+        key = (source or "").encode("utf-8")
+        return zlib.crc32(key) % self.num_shards
+
+    def _route(self, metadatas: List[Dict]) -> List[int]:
+        if self.partition == PARTITION_SOURCE_HASH:
+            return [self._shard_for_source(m.get("source")) for m in metadatas]
+
+        routes = []
+        for _ in metadatas:
+            routes.append(self._next_shard)
+            self._next_shard = (self._next_shard + 1) % self.num_shards
+        return routes
+
+    # -----------------------------
+    # ADD / DELETE
+    # -----------------------------
+
+    def add(
+        self,
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ):
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+
+        if len(embeddings) != len(texts) or len(texts) != len(metadatas):
+            raise ValueError("Embeddings, texts, and metadatas length mismatch")
+
+        with self._lock:
+            for shard_index, rows in self._batches(metadatas).items():
+                self.shards[shard_index].add(
+                    [embeddings[i] for i in rows],
+                    [texts[i] for i in rows],
+                    [metadatas[i] for i in rows],
+                )
+
+    def _batches(self, metadatas: List[Dict]) -> Dict[int, List[int]]:
+        batches: Dict[int, List[int]] = {}
+        for i, shard_index in enumerate(self._route(metadatas)):
+            batches.setdefault(shard_index, []).append(i)
+        return batches
+
+    def delete_source(self, source: str) -> int:
+        with self._lock:
+            return sum(shard.delete_source(source) for shard in self.shards)
+
+    def replace_source(
+        self,
+        source: str,
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ) -> int:
+        with self._lock:
+            removed = self.delete_source(source)
+            self.add(embeddings, texts, metadatas)
+
+        return removed
+
+    def delete_pages(self, source: str, pages: List[int]) -> int:
+        with self._lock:
+            return sum(shard.delete_pages(source, pages) for shard in self.shards)
+
+    def replace_pages(
+        self,
+        source: str,
+        pages: List[int],
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ) -> int:
+        with self._lock:
+            removed = self.delete_pages(source, pages)
+            if texts:
+                self.add(embeddings, texts, metadatas)
+
+        return removed
+
+    def stage(
+        self,
+        source: str,
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+    ):
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+
+        if len(embeddings) != len(texts) or len(texts) != len(metadatas):
+            raise ValueError("Embeddings, texts, and metadatas length mismatch")
+
+        with self._lock:
+            for shard_index, rows in self._batches(metadatas).items():
+                self.shards[shard_index].stage(
+                    source,
+                    [embeddings[i] for i in rows],
+                    [texts[i] for i in rows],
+                    [metadatas[i] for i in rows],
+                )
+
+    def commit_staged(self, source: str) -> int:
+        # Broadcast like deletes: round_robin stages on every shard
+        with self._lock:
+            return sum(shard.commit_staged(source) for shard in self.shards)
+
+    def discard_staged(self, source: str) -> int:
+        with self._lock:
+            return sum(shard.discard_staged(source) for shard in self.shards)
+
+    def live_records(self) -> Tuple[List[str], List[Dict]]:
+        texts: List[str] = []
+        metadatas: List[Dict] = []
+        for shard in self.shards:
+            shard_texts, shard_metadatas = shard.live_records()
+            texts.extend(shard_texts)
+            metadatas.extend(shard_metadatas)
+        return texts, metadatas
+
+    def has_source(self, source: str) -> bool:
+        return any(shard.has_source(source) for shard in self.shards)
+
+    # -----------------------------
+    # SEARCH
+    # -----------------------------
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        **search_kwargs,
+    ) -> List[Dict]:
+        return self.search_batch([query_embedding], top_k, **search_kwargs)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 10,
+        **search_kwargs,
+    ) -> List[List[Dict]]:
+        # Shards and pool must match: add_shard() / load() swap both
+        with self._layout_lock:
+            shards = [s for s in self.shards if s.ntotal > 0]
+            futures = [
+                self._pool.submit(shard.search_batch, query_embeddings, top_k, **search_kwargs)
+                for shard in shards
+            ]
+
+        if not futures:
+            return [[] for _ in query_embeddings]
+
+        merged: List[List[Dict]] = [[] for _ in query_embeddings]
+        for future in futures:
+            for results, shard_results in zip(merged, future.result()):
+                results.extend(shard_results)
+
+        for results in merged:
+            results.sort(key=lambda r: r["score"], reverse=True)
+            del results[top_k:]
+
+        return merged
+
+    # -----------------------------
+    # STATS
+    # -----------------------------
+
+    def stats(self) -> Dict:
+        shard_stats = [shard.stats() for shard in self.shards]
+        return {
+            "ntotal": self.ntotal,
+            "num_shards": self.num_shards,
+            "partition": self.partition,
+            "shards": shard_stats,
+        }
+
+    def measure_recall(self, top_k: int = 10, **kwargs) -> float:
+        """
+        Size-weighted mean of per-shard recall@k.
+        """
+        total = self.ntotal
+        if total == 0:
+            return 1.0
+
+        return sum(
+            shard.measure_recall(top_k=top_k, **kwargs) * shard.ntotal
+            for shard in self.shards
+        ) / total
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+
+    def save(self, folder_path: str):
+        with self._lock:
+            self._write_layout(folder_path)
+            for i, shard in enumerate(self.shards):
+                shard.save(_shard_dir(folder_path, i))
+
+    def flush(self, folder_path: str):
+        with self._lock:
+            self._write_layout(folder_path)
+            for i, shard in enumerate(self.shards):
+                shard.flush(_shard_dir(folder_path, i))
+
+    def load(self, folder_path: str):
+        with open(os.path.join(folder_path, SHARDS_FILE), "r", encoding="utf-8") as f:
+            layout = json.load(f)
+
+        with self._lock:
+            # Loaded aside, so searches keep using the current shards
+            shards = [self._new_shard() for _ in range(layout["num_shards"])]
+
+            for i, shard in enumerate(shards):
+                shard_dir = _shard_dir(folder_path, i)
+                if os.path.exists(shard_dir):
+                    shard.load(shard_dir)
+
+            self.partition = layout["partition"]
+            self._swap_shards(shards)
+
+    def _write_layout(self, folder_path: str):
+        os.makedirs(folder_path, exist_ok=True)
+        path = os.path.join(folder_path, SHARDS_FILE)
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "num_shards": self.num_shards,
+                "partition": self.partition,
+            }, f)
+
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def is_sharded(folder_path: str) -> bool:
+        return os.path.exists(os.path.join(folder_path, SHARDS_FILE))
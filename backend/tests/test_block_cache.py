@@ -0,0 +1,82 @@
+from threading import Thread
+import os
+
+import pytest
+
+from app.ingestion.block_cache import BLOCK_FORMAT, BlockCache
+
+BLOCKS = [{"block_id": str(i), "text": f"block {i}", "page": 1} for i in range(500)]
+
+
+def _drain(block_cache: BlockCache, sha256: str, blocks=BLOCKS, **kwargs):
+    return list(block_cache.write_through(sha256, iter(blocks), **kwargs))
+
+
+def test_entry_is_committed_once_the_stream_is_consumed(tmp_path):
+    block_cache = BlockCache(str(tmp_path))
+    stream = block_cache.write_through("abc", iter(BLOCKS), {"pages": 1}, ["p1"])
+
+    next(stream)
+    assert not block_cache.has("abc")
+
+    assert len(list(stream)) == len(BLOCKS) - 1
+    assert block_cache.is_current("abc")
+    assert block_cache.header("abc") == {"format": BLOCK_FORMAT, "pages": ["p1"], "stats": {"pages": 1}}
+    assert list(block_cache.iter_blocks("abc", source="b.pdf"))[0] == {**BLOCKS[0], "source": "b.pdf"}
+
+
+def test_abandoned_or_failed_stream_leaves_nothing(tmp_path):
+    block_cache = BlockCache(str(tmp_path))
+
+    stream = block_cache.write_through("abc", iter(BLOCKS))
+    next(stream)
+    stream.close()
+
+    def failing():
+        yield BLOCKS[0]
+        raise RuntimeError("parse failed")
+
+    with pytest.raises(RuntimeError):
+        list(block_cache.write_through("def", failing()))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_writers_of_the_same_content(tmp_path):
+    # Two uploads of identical bytes under different names
+    block_cache = BlockCache(str(tmp_path))
+    errors = []
+
+    def write():
+        try:
+            _drain(block_cache, "abc", stats={"pages": 1}, page_hashes=["p1"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ["abc.blocks.jsonl.gz", "abc.json"]
+    assert list(block_cache.iter_blocks("abc")) == BLOCKS
+
+    # A later writer replaces a complete entry
+    _drain(block_cache, "abc", blocks=BLOCKS[:1])
+    assert list(block_cache.iter_blocks("abc")) == BLOCKS[:1]
+
+
+def test_remove_and_older_formats(tmp_path):
+    block_cache = BlockCache(str(tmp_path))
+    _drain(block_cache, "abc")
+
+    with open(tmp_path / "abc.json", "w", encoding="utf-8") as f:
+        f.write('{"pages": [], "stats": {}}')
+    assert block_cache.format("abc") == 1
+    assert not block_cache.is_current("abc")
+
+    block_cache.remove("abc")
+    assert not block_cache.has("abc")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,122 @@
+from app.retrieval.bm25_index import BM25Index, tokenize
+
+
+def _chunk(source: str, text: str, page: int = 1, block_type: str = "text"):
+    return text, {"source": source, "page": page, "block_type": block_type, "chunk_id": text}
+
+
+def _index(chunks, **kwargs) -> BM25Index:
+    index = BM25Index(**kwargs)
+    index.add([t for t, _ in chunks], [m for _, m in chunks])
+    return index
+
+
+CHUNKS = [
+    _chunk("a.pdf", "REG_CTRL1 resets to 0x1A after power on"),
+    _chunk("a.pdf", "The control register enables the clock", page=2),
+    _chunk("b.pdf", "Clock tree overview and power domains"),
+    _chunk("b.pdf", "Register: REG_STAT | Default: 0x00", block_type="table_row"),
+]
+
+
+def _texts(hits):
+    return [hit["text"] for hit in hits]
+
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    tokens = tokenize("Set REG_CTRL1 to 0x1A (rev 1.5) for the abc-123 part")
+
+    assert {"reg_ctrl1", "reg", "ctrl1", "0x1a", "1.5", "abc-123", "abc", "123"} <= set(tokens)
+    assert "the" not in tokens and "for" not in tokens
+
+
+def test_exact_identifier_ranks_first():
+    index = _index(CHUNKS)
+
+    hits = index.search("what is the default of reg_ctrl1")
+    assert hits[0]["text"] == CHUNKS[0][0]
+    assert hits[0]["bm25_score"] > 0
+
+
+def test_rarer_terms_outweigh_common_ones():
+    index = _index(CHUNKS)
+
+    # "clock" is in two chunks, "tree" in one
+    assert index.search("clock tree")[0]["text"] == CHUNKS[2][0]
+
+
+def test_filters_restrict_the_hits():
+    index = _index(CHUNKS)
+
+    assert _texts(index.search("clock", filters={"source": "a.pdf"})) == [CHUNKS[1][0]]
+    assert _texts(index.search("register", filters={"block_type": "table_row"})) == [CHUNKS[3][0]]
+
+
+def test_deletes_and_page_replacement():
+    index = _index(CHUNKS)
+
+    assert index.delete_source("b.pdf") == 2
+    assert index.search("tree") == []
+
+    text, metadata = _chunk("a.pdf", "The status register latches faults", page=2)
+    assert index.replace_pages("a.pdf", [2], [text], [metadata]) == 1
+    assert _texts(index.search("register")) == [text]
+
+
+def test_staged_chunks_are_hidden_until_committed():
+    index = _index(CHUNKS)
+    text, metadata = _chunk("a.pdf", "Revised watchdog timeout table")
+
+    index.stage("a.pdf", [text], [metadata])
+    assert index.search("watchdog") == []
+    assert index.search("0x1a") != []
+
+    assert index.commit_staged("a.pdf") == 2
+    assert _texts(index.search("watchdog")) == [text]
+    assert index.search("0x1a") == []
+
+    index.stage("b.pdf", [text], [metadata])
+    assert index.discard_staged("b.pdf") == 1
+    assert len(index) == 3
+
+
+def test_flushed_log_and_compacted_base_reload(tmp_path):
+    index = _index(CHUNKS[:2], compact_ratio=100)
+    index.flush(str(tmp_path))
+    index.add(*zip(*CHUNKS[2:]))
+    index.delete_source("a.pdf")
+    index.flush(str(tmp_path))
+
+    replayed = BM25Index()
+    replayed.load(str(tmp_path))
+    assert len(replayed) == 2
+    assert replayed.search("0x1a") == []
+    assert _texts(replayed.search("tree")) == [CHUNKS[2][0]]
+
+    index.save(str(tmp_path))
+    compacted = BM25Index()
+    compacted.load(str(tmp_path))
+    assert compacted.stats()["base_documents"] == 2
+    assert _texts(compacted.search("tree")) == [CHUNKS[2][0]]
+    assert _texts(compacted.search("register", filters={"block_type": "table_row"})) == [CHUNKS[3][0]]
+
+    # Tombstoned base rows stay out after a reload from the log
+    compacted.delete_source("b.pdf")
+    compacted.flush(str(tmp_path))
+    reloaded = BM25Index()
+    reloaded.load(str(tmp_path))
+    assert len(reloaded) == 0
+    assert reloaded.search("tree") == []
+
+
+def test_torn_log_line_is_dropped(tmp_path):
+    index = _index(CHUNKS, compact_ratio=100)
+    index.flush(str(tmp_path))
+
+    log = next(tmp_path.glob("bm25_log_*.jsonl"))
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "texts": ["half')
+
+    reloaded = BM25Index()
+    reloaded.load(str(tmp_path))
+    assert len(reloaded) == len(CHUNKS)
@@ -0,0 +1,195 @@
+import numpy as np
+import pytest
+
+from app.vectorstore.faiss_store import FAISSVectorStore
+
+DIM = 8
+
+
+def _chunks(source: str, n: int, seed: int = 0, page: int = 1):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(n, DIM)).astype("float32")
+    texts = [f"{source} chunk {i}" for i in range(n)]
+    metadatas = [
+        {"source": source, "page": page, "chunk_id": f"{source}-{seed}-{i}"}
+        for i in range(n)
+    ]
+    return embeddings, texts, metadatas
+
+
+def _sources(store: FAISSVectorStore, query, top_k: int = 100):
+    return {hit["metadata"]["source"] for hit in store.search(query, top_k=top_k)}
+
+
+def test_flat_index_promotes_once_past_threshold():
+    store = FAISSVectorStore(DIM, index_type="hnsw", promote_threshold=50)
+
+    store.add(*_chunks("a.pdf", 40))
+    assert store.active_index_type == "flat"
+
+    store.add(*_chunks("b.pdf", 20, seed=1))
+    assert store.active_index_type == "hnsw"
+    assert store.ntotal == 60
+
+    embeddings, _, _ = _chunks("b.pdf", 20, seed=1)
+    hit = store.search(embeddings[3], top_k=1)[0]
+    assert hit["text"] == "b.pdf chunk 3"
+
+
+def test_delete_source_hides_its_chunks():
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 10))
+    store.add(*_chunks("b.pdf", 10, seed=1))
+
+    assert store.delete_source("a.pdf") == 10
+    assert store.ntotal == 10
+    assert not store.has_source("a.pdf")
+
+    query = _chunks("a.pdf", 1)[0][0]
+    assert _sources(store, query) == {"b.pdf"}
+
+
+def test_replace_pages_swaps_only_those_pages():
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 5, page=1))
+    store.add(*_chunks("a.pdf", 5, seed=1, page=2))
+
+    replaced = store.replace_pages("a.pdf", [2], *_chunks("a.pdf", 3, seed=2, page=2))
+
+    assert replaced == 5
+    assert store.ntotal == 8
+    hits = store.search(_chunks("a.pdf", 1)[0][0], top_k=100)
+    assert sorted(h["metadata"]["chunk_id"] for h in hits if h["metadata"]["page"] == 2) == [
+        "a.pdf-2-0", "a.pdf-2-1", "a.pdf-2-2",
+    ]
+
+
+def test_save_reclaims_deleted_rows_and_reloads(tmp_path):
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 10))
+    store.add(*_chunks("b.pdf", 10, seed=1))
+    store.delete_source("a.pdf")
+    store.save(str(tmp_path))
+
+    assert store.index.ntotal == 10
+    assert store.stats()["deleted"] == 0
+
+    loaded = FAISSVectorStore(DIM)
+    loaded.load(str(tmp_path))
+    assert loaded.ntotal == 10
+    assert _sources(loaded, _chunks("b.pdf", 1, seed=1)[0][0]) == {"b.pdf"}
+
+
+def test_flushed_deletes_survive_reload(tmp_path):
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 10))
+    store.flush(str(tmp_path))
+    store.add(*_chunks("b.pdf", 10, seed=1))
+    store.delete_source("a.pdf")
+    store.flush(str(tmp_path))
+
+    loaded = FAISSVectorStore(DIM)
+    loaded.load(str(tmp_path))
+    assert loaded.ntotal == 10
+    assert not loaded.has_source("a.pdf")
+    assert loaded.has_source("b.pdf")
+
+
+def test_compaction_merges_segments_and_renumbers(tmp_path):
+    store = FAISSVectorStore(DIM, max_segments=3)
+    store.add(*_chunks("a.pdf", 10))
+    store.flush(str(tmp_path))
+
+    for seed, source in enumerate(["b.pdf", "c.pdf", "d.pdf"], start=1):
+        store.add(*_chunks(source, 10, seed=seed))
+        store.flush(str(tmp_path))
+    store._wait_for_compaction()
+    assert store._segments == []
+
+    # A quarter of the rows deleted is past compact_deleted_ratio
+    store.delete_source("b.pdf")
+    store.flush(str(tmp_path))
+    store._wait_for_compaction()
+
+    assert store.index.ntotal == store.ntotal == 30
+    assert not store.has_source("b.pdf")
+
+    # Ids stay positional after the gaps are closed
+    query = _chunks("d.pdf", 10, seed=3)[0][4]
+    assert store.search(query, top_k=1)[0]["text"] == "d.pdf chunk 4"
+
+    loaded = FAISSVectorStore(DIM)
+    loaded.load(str(tmp_path))
+    assert loaded.ntotal == 30
+    assert loaded.search(query, top_k=1)[0]["text"] == "d.pdf chunk 4"
+
+
+def test_staged_rows_replace_the_old_version_on_commit(tmp_path):
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 10))
+    store.flush(str(tmp_path))
+
+    store.stage("a.pdf", *_chunks("a.pdf", 4, seed=1))
+    store.flush(str(tmp_path))
+    query = _chunks("a.pdf", 4, seed=1)[0][0]
+    assert store.ntotal == 10
+    assert store.search(query, top_k=1)[0]["metadata"]["chunk_id"].startswith("a.pdf-0-")
+
+    assert store.commit_staged("a.pdf") == 10
+    assert store.ntotal == 4
+    assert store.search(query, top_k=1)[0]["metadata"]["chunk_id"] == "a.pdf-1-0"
+
+
+def test_crashed_or_discarded_staging_leaves_the_old_version(tmp_path):
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 10))
+    store.flush(str(tmp_path))
+
+    store.stage("a.pdf", *_chunks("a.pdf", 4, seed=1))
+    store.flush(str(tmp_path))
+
+    # As after a crash mid-ingest: staged rows are persisted tombstoned
+    loaded = FAISSVectorStore(DIM)
+    loaded.load(str(tmp_path))
+    assert loaded.ntotal == 10
+
+    assert store.discard_staged("a.pdf") == 4
+    store.save(str(tmp_path))
+    assert store.index.ntotal == store.ntotal == 10
+
+
+def test_staged_rows_survive_save(tmp_path):
+    store = FAISSVectorStore(DIM)
+    store.add(*_chunks("a.pdf", 10))
+    store.add(*_chunks("b.pdf", 10, seed=1))
+    store.delete_source("b.pdf")
+
+    store.stage("a.pdf", *_chunks("a.pdf", 4, seed=2))
+    store.save(str(tmp_path))
+    assert store.ntotal == 10
+
+    store.commit_staged("a.pdf")
+    assert store.ntotal == 4
+    query = _chunks("a.pdf", 4, seed=2)[0][2]
+    assert store.search(query, top_k=1)[0]["metadata"]["chunk_id"] == "a.pdf-2-2"
+
+
+def test_pq_save_below_training_floor_falls_back_to_flat(tmp_path):
+    store = FAISSVectorStore(DIM, encoding="pq", promote_threshold=0, pq_m=2)
+    # 256 centroids need 256 * 39 training points
+    store.add(*_chunks("a.pdf", 10_000))
+    assert store.active_encoding == "pq"
+
+    store.delete_source("a.pdf")
+    store.add(*_chunks("b.pdf", 10, seed=1))
+    store.save(str(tmp_path))
+
+    assert store.active_index_type == "flat"
+    assert store.ntotal == 10
+
+
+def test_mismatched_lengths_are_rejected():
+    store = FAISSVectorStore(DIM)
+    embeddings, texts, metadatas = _chunks("a.pdf", 3)
+    with pytest.raises(ValueError):
+        store.add(embeddings, texts[:2], metadatas)
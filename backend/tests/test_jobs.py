@@ -0,0 +1,132 @@
+from threading import Event, Lock
+import time
+
+import pytest
+
+from app.core.jobs import JOB_DONE, JOB_FAILED, JobQueue, QueueFullError
+
+
+def _wait(*jobs, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while any(job.status not in (JOB_DONE, JOB_FAILED) for job in jobs):
+        assert time.time() < deadline, "jobs did not finish"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=2, max_pending=8)
+    yield queue
+    queue.shutdown()
+
+
+def test_jobs_with_the_same_key_run_one_at_a_time_in_order(queue):
+    running = 0
+    overlap = False
+    order = []
+    lock = Lock()
+
+    def work(i):
+        def fn(job):
+            nonlocal running, overlap
+            with lock:
+                running += 1
+                overlap = overlap or running > 1
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+                order.append(i)
+            return {"i": i}
+        return fn
+
+    jobs = [queue.submit("a.pdf", work(i), key="a.pdf") for i in range(4)]
+    _wait(*jobs)
+
+    assert not overlap
+    assert order == [0, 1, 2, 3]
+    assert [job.result for job in jobs] == [{"i": i} for i in range(4)]
+
+
+def test_other_keys_are_not_held_up(queue):
+    release = Event()
+    blocked = queue.submit("a.pdf", lambda job: release.wait(5), key="a.pdf")
+    other = queue.submit("b.pdf", lambda job: {"ok": True}, key="b.pdf")
+
+    _wait(other)
+    assert blocked.status != JOB_DONE
+
+    release.set()
+    _wait(blocked)
+
+
+def test_failed_job_releases_its_key(queue):
+    def fail(job):
+        raise RuntimeError("boom")
+
+    failed = queue.submit("a.pdf", fail, key="a.pdf")
+    after = queue.submit("a.pdf", lambda job: {"ok": True}, key="a.pdf")
+    _wait(failed, after)
+
+    assert failed.status == JOB_FAILED
+    assert failed.error == "boom"
+    assert after.status == JOB_DONE
+
+
+def test_submit_beyond_max_pending_raises():
+    queue = JobQueue(workers=1, max_pending=2)
+    release = Event()
+    try:
+        jobs = [queue.submit("a.pdf", lambda job: release.wait(5)) for _ in range(2)]
+        with pytest.raises(QueueFullError):
+            queue.submit("a.pdf", lambda job: None)
+    finally:
+        release.set()
+        _wait(*jobs)
+        queue.shutdown()
+
+
+def test_exclusive_holds_the_key_for_the_block(queue):
+    with queue.exclusive("a.pdf") as held:
+        assert held
+        job = queue.submit("a.pdf", lambda job: {"ok": True}, key="a.pdf")
+        time.sleep(0.05)
+        assert job.status == "queued"
+
+    _wait(job)
+    assert job.status == JOB_DONE
+
+
+def test_exclusive_does_not_wait_for_a_busy_key(queue):
+    release = Event()
+    job = queue.submit("a.pdf", lambda job: release.wait(5), key="a.pdf")
+
+    with queue.exclusive("a.pdf") as held:
+        assert not held
+
+    release.set()
+    _wait(job)
+    with queue.exclusive("a.pdf") as held:
+        assert held
+
+
+def test_exclusive_from_a_job_on_a_single_worker_does_not_deadlock():
+    queue = JobQueue(workers=1)
+    try:
+        submitted = Event()
+
+        def reindex(job):
+            # As /api/reindex does for each document; the job for b.pdf
+            # is queued behind this one on the only worker
+            submitted.wait(5)
+            with queue.exclusive("b.pdf") as held:
+                return {"held": held}
+
+        outer = queue.submit("all", reindex)
+        queued = queue.submit("b.pdf", lambda job: {"ok": True}, key="b.pdf")
+        submitted.set()
+        _wait(outer, queued, timeout=2.0)
+
+        assert outer.result == {"held": False}
+        assert queued.status == JOB_DONE
+    finally:
+        queue.shutdown()
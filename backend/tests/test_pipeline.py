@@ -0,0 +1,234 @@
+from pathlib import Path
+from collections import deque
+from threading import RLock
+import hashlib
+
+import numpy as np
+import pytest
+
+for _module in ("docx", "camelot", "pandas", "langchain_text_splitters", "sentence_transformers"):
+    pytest.importorskip(_module)
+
+from app.ingestion.block_cache import BlockCache
+from app.ingestion.pipeline import _cache_revision, index_document, table_headers
+from app.retrieval.bm25_index import BM25Index
+from app.retrieval.table_store import TableStore
+from app.vectorstore.faiss_store import FAISSVectorStore
+
+DIM = 8
+SOURCE = "manual.pdf"
+
+
+def _vector(text: str) -> np.ndarray:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()[:DIM]
+    return np.frombuffer(digest, dtype=np.uint8).astype("float32") + 1.0
+
+
+class FakeEmbedder:
+    """
+    Stands in for Embedder.embed_stream; raises once fail_at windows
+    have been handed out.
+    """
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+
+    def embed_stream(self, chunks, window=512):
+        batch = []
+        windows = 0
+        for chunk in chunks:
+            batch.append({
+                "embedding": _vector(chunk["text"]),
+                "text": chunk["text"],
+                "metadata": {
+                    "chunk_id": chunk["block_id"],
+                    "block_type": chunk["block_type"],
+                    "source": chunk["source"],
+                    "page": chunk["page"],
+                },
+            })
+            if len(batch) == window:
+                if windows == self.fail_at:
+                    raise RuntimeError("embedding failed")
+                windows += 1
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _blocks(version: str, n_text: int = 5, n_rows: int = 2):
+    blocks = [
+        {
+            "block_id": f"{version}-text-{i}",
+            "text": f"{version} paragraph {i}",
+            "source": SOURCE,
+            "page": 1,
+            "block_type": "text",
+        }
+        for i in range(n_text)
+    ]
+    blocks += [
+        {
+            "block_id": f"{version}-row-{i}",
+            "text": f"Register: {version}_REG{i} | Default: 0x{i}",
+            "source": SOURCE,
+            "page": "2",
+            "block_type": "table_row",
+            "table_id": "table_p2_0_part_0",
+            "row_index": i,
+            "cells": {"register": f"{version}_REG{i}", "default": f"0x{i}"},
+        }
+        for i in range(n_rows)
+    ]
+    return blocks
+
+
+@pytest.fixture
+def stores(tmp_path):
+    return {
+        "vector_store": FAISSVectorStore(DIM),
+        "lexical_index": BM25Index(),
+        "table_store": TableStore(),
+        "block_cache": BlockCache(str(tmp_path / "blocks")),
+        "index_dir": str(tmp_path / "index"),
+    }
+
+
+def _index(stores, version: str, embedder: FakeEmbedder, **block_counts):
+    block_cache = stores["block_cache"]
+    deque(block_cache.write_through(version, _blocks(version, **block_counts)), maxlen=0)
+
+    return index_document(
+        Path("missing") / SOURCE,
+        SOURCE,
+        embedder,
+        stores["vector_store"],
+        RLock(),
+        stores["index_dir"],
+        window=2,
+        block_cache=block_cache,
+        sha256=version,
+        chunker=lambda blocks: blocks,
+        lexical_index=stores["lexical_index"],
+        table_store=stores["table_store"],
+    )
+
+
+def _live_texts(stores):
+    texts, _ = stores["vector_store"].live_records()
+    return sorted(texts)
+
+
+def test_new_version_replaces_the_old_one(stores):
+    _index(stores, "v1", FakeEmbedder())
+    counts = _index(stores, "v2", FakeEmbedder(), n_text=3)
+
+    assert counts["replaced_chunks"] == 7
+    assert counts["chunks"] == 5
+    assert all(t.startswith(("v2 ", "Register: v2_")) for t in _live_texts(stores))
+    assert stores["lexical_index"].search("v1") == []
+    assert len(stores["lexical_index"].search("v2", top_k=10)) == 5
+    assert stores["table_store"].lookup("register", "v1_REG0") == []
+    assert len(stores["table_store"].lookup("register", "v2_REG0")) == 1
+
+
+def test_failure_part_way_leaves_the_previous_version(stores):
+    _index(stores, "v1", FakeEmbedder())
+    before = _live_texts(stores)
+
+    with pytest.raises(RuntimeError):
+        _index(stores, "v2", FakeEmbedder(fail_at=2))
+
+    assert _live_texts(stores) == before
+    assert stores["vector_store"]._staged == {}
+    assert stores["lexical_index"].search("v2") == []
+    assert len(stores["lexical_index"].search("v1", top_k=10)) == 7
+    assert len(stores["table_store"].lookup("register", "v1_REG1")) == 1
+    assert stores["table_store"].lookup("register", "v2_REG1") == []
+
+    # Nothing of the failed attempt comes back after a reload
+    stores["vector_store"].save(stores["index_dir"])
+    reloaded = FAISSVectorStore(DIM)
+    reloaded.load(stores["index_dir"])
+    assert sorted(reloaded.live_records()[0]) == before
+
+
+def test_version_without_chunks_removes_the_old_one(stores):
+    _index(stores, "v1", FakeEmbedder())
+    counts = _index(stores, "v2", FakeEmbedder(), n_text=0, n_rows=0)
+
+    assert counts["replaced_chunks"] == 7
+    assert _live_texts(stores) == []
+    assert not stores["vector_store"].has_source(SOURCE)
+    assert stores["lexical_index"].search("v1") == []
+    assert len(stores["table_store"]) == 0
+
+
+def _page_blocks(version: str, page: int):
+    return [
+        {
+            "block_id": f"{version}-t{page}",
+            "text": f"{version} text {page}",
+            "page": page,
+            "block_type": "text",
+        },
+        {
+            "block_id": f"{version}-r{page}",
+            "text": f"{version} row {page}",
+            "page": str(page),
+            "block_type": "table_row",
+            "cells": {"c": f"{version}{page}"},
+            "headers": ["c"] if page == 1 else None,
+        },
+    ]
+
+
+def _cached(block_cache: BlockCache, sha256: str, pages: int, stats=None):
+    blocks = [b for p in range(1, pages + 1) for b in _page_blocks(sha256, p)]
+    # Parse order: text by page, then table rows by page
+    blocks.sort(key=lambda b: (b["block_type"] == "table_row", int(b["page"])))
+    hashes = [f"{sha256}-{p}" for p in range(1, pages + 1)]
+    deque(block_cache.write_through(sha256, blocks, stats or {"tables": pages}, hashes), maxlen=0)
+
+
+def test_cache_revision_merges_unchanged_and_changed_pages_in_parse_order(tmp_path):
+    block_cache = BlockCache(str(tmp_path))
+    _cached(block_cache, "v1", pages=3)
+
+    changed = _page_blocks("v2", 2)
+    _cache_revision(block_cache, "v1", "v2", changed, [2], ["v1-1", "v2-2", "v1-3"])
+
+    ids = [b["block_id"] for b in block_cache.iter_blocks("v2")]
+    assert ids == ["v1-t1", "v2-t2", "v1-t3", "v1-r1", "v2-r2", "v1-r3"]
+
+    header = block_cache.header("v2")
+    assert header["pages"] == ["v1-1", "v2-2", "v1-3"]
+    assert header["stats"]["tables"] == 3
+    assert header["stats"]["pages"] == 3
+    assert table_headers(block_cache, "v2") == {1: ["c"]}
+
+
+def test_cache_revision_drops_pages_cut_from_the_end(tmp_path):
+    block_cache = BlockCache(str(tmp_path))
+    _cached(block_cache, "v1", pages=3)
+
+    _cache_revision(block_cache, "v1", "v2", [], [3], ["v1-1", "v1-2"])
+
+    pages = {int(b["page"]) for b in block_cache.iter_blocks("v2")}
+    assert pages == {1, 2}
+    assert block_cache.header("v2")["stats"]["pages"] == 2
+
+
+def test_cache_revision_needs_a_current_previous_entry(tmp_path):
+    block_cache = BlockCache(str(tmp_path))
+
+    _cache_revision(block_cache, "v1", "v2", _page_blocks("v2", 1), [1], ["v2-1"])
+    assert not block_cache.has("v2")
+    assert table_headers(block_cache, "v1") is None
+
+    # An existing entry for the new content is left alone
+    _cached(block_cache, "v1", pages=2)
+    _cached(block_cache, "v2", pages=1)
+    _cache_revision(block_cache, "v1", "v2", _page_blocks("x", 1), [1], ["x-1"])
+    assert [b["block_id"] for b in block_cache.iter_blocks("v2")] == ["v2-t1", "v2-r1"]
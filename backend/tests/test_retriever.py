@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from app.retrieval.bm25_index import BM25Index
+from app.retrieval.retriever import Retriever
+from app.vectorstore.faiss_store import FAISSVectorStore
+
+
+def _hit(chunk_id: str, **extra):
+    return {"text": chunk_id, "metadata": {"chunk_id": chunk_id}, "block_type": "text", **extra}
+
+
+def _ids(hits):
+    return [hit["metadata"]["chunk_id"] for hit in hits]
+
+
+@pytest.fixture
+def retriever():
+    return Retriever(embedding_model=None, vector_store=None, rrf_k=60)
+
+
+def test_fuse_ranks_chunks_found_by_both_first(retriever):
+    dense = [_hit("a"), _hit("b"), _hit("c")]
+    lexical = [_hit("c", bm25_score=7.0), _hit("d", bm25_score=3.0)]
+
+    fused = retriever._fuse(dense, lexical, top_k=10)
+
+    # c: 1/63 + 1/61 beats a: 1/61 alone
+    assert _ids(fused) == ["c", "a", "b", "d"]
+    assert fused[0]["rrf_score"] == round(1 / 63 + 1 / 61, 6)
+    assert fused[0]["bm25_score"] == 7.0
+
+
+def test_fuse_keeps_dense_order_without_lexical_hits(retriever):
+    dense = [_hit("a"), _hit("b")]
+    assert retriever._fuse(dense, [], top_k=1) is dense
+
+
+def test_fuse_truncates_to_top_k(retriever):
+    dense = [_hit(str(i)) for i in range(5)]
+    lexical = [_hit(str(i)) for i in reversed(range(5))]
+
+    assert len(retriever._fuse(dense, lexical, top_k=3)) == 3
+
+
+class FakeModel:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_queries(self, queries):
+        return np.stack([self.vectors[q] for q in queries])
+
+
+def test_retrieve_fuses_bm25_into_vector_results():
+    texts = [
+        "Status register overview",
+        "REG_CTRL1 resets to 0x1A",
+        "Unrelated wiring notes",
+    ]
+    metadatas = [
+        {"source": "a.pdf", "page": 1, "block_type": "text", "chunk_id": str(i)}
+        for i in range(len(texts))
+    ]
+    embeddings = np.eye(3, 8, dtype="float32")
+
+    vector_store = FAISSVectorStore(8)
+    vector_store.add(embeddings, texts, metadatas)
+    lexical_index = BM25Index()
+    lexical_index.add(texts, metadatas)
+
+    # The query vector is closest to chunk 0; only BM25 finds chunk 1
+    query = "value of reg_ctrl1"
+    model = FakeModel({query: embeddings[0] + 0.1 * embeddings[2]})
+
+    dense_only = Retriever(model, vector_store).retrieve(query)
+    hybrid = Retriever(model, vector_store, lexical_index=lexical_index, budget_ms=5000)
+
+    assert _ids(dense_only)[0] == "0"
+    hits = hybrid.retrieve(query)
+    assert _ids(hits)[0] == "1"
+    assert "rrf_score" in hits[0] and "bm25_score" in hits[0]
@@ -0,0 +1,129 @@
+import pytest
+
+from app.retrieval.table_store import TableStore, value_key, value_type
+
+
+def _row(register: str, default: str, page="3", row_index: int = 0, **cells):
+    return {
+        "text": f"Register: {register} | Default: {default}",
+        "page": page,
+        "table_id": f"table_p{page}_0_part_0",
+        "row_index": row_index,
+        "block_type": "table_row",
+        "cells": {"register": register, "default_value": default, **cells},
+    }
+
+
+ROWS = [
+    _row("REG_CTRL1", "0x001A", row_index=1),
+    _row("REG_STAT", "05", row_index=2),
+    _row("REG_GAIN", "1.10", page="4", row_index=1, unit="dB"),
+]
+
+
+@pytest.mark.parametrize("value, kind", [
+    ("0x1A", "hex"),
+    (" -12 ", "int"),
+    ("1.10", "float"),
+    (".5", "float"),
+    ("REG_CTRL1", "str"),
+    ("1.2.3", "str"),
+])
+def test_value_type(value, kind):
+    assert value_type(value) == kind
+
+
+@pytest.mark.parametrize("a, b", [
+    ("0x001A", "0x1a"),
+    ("05", "5"),
+    ("1.10", "1.1"),
+    ("Reset  Value", "reset value"),
+])
+def test_value_key_normalizes_equal_values(a, b):
+    assert value_key(a) == value_key(b)
+
+
+def test_value_key_keeps_distinct_values_apart():
+    assert value_key("0x10") != value_key("10")
+    assert value_key("1.5") != value_key("15")
+
+
+def test_lookup_matches_normalized_values_but_keeps_cells_verbatim():
+    store = TableStore()
+    store.replace_source("a.pdf", ROWS)
+
+    hits = store.lookup("default_value", "0x1a")
+    assert [h["cells"]["register"] for h in hits] == ["REG_CTRL1"]
+    assert hits[0]["cells"]["default_value"] == "0x001A"
+
+    assert [h["cells"]["register"] for h in store.lookup("default_value", "5")] == ["REG_STAT"]
+    assert store.lookup("default_value", "1.1")[0]["cells"]["default_value"] == "1.10"
+
+
+def test_rows_without_cells_are_skipped():
+    store = TableStore()
+    store.replace_source("a.pdf", ROWS + [{"text": "x", "page": "3", "cells": {}}])
+    assert len(store) == 3
+
+
+def test_match_finds_rows_by_identifier_in_the_query():
+    store = TableStore()
+    store.replace_source("a.pdf", ROWS)
+    store.replace_source("b.pdf", [_row("REG_CTRL1", "0x00")])
+
+    hits = store.match("what is the default of reg_ctrl1?")
+    assert {h["metadata"]["source"] for h in hits} == {"a.pdf", "b.pdf"}
+    assert all(h["exact_match"] for h in hits)
+
+    scoped = store.match("default of REG_CTRL1", sources=["b.pdf"])
+    assert [h["metadata"]["cells"]["default_value"] for h in scoped] == ["0x00"]
+
+    # Bare small numbers identify nothing
+    assert store.match("what is 5") == []
+
+
+def test_replace_pages_and_staging():
+    store = TableStore()
+    store.replace_source("a.pdf", ROWS)
+
+    store.replace_pages("a.pdf", [4], [_row("REG_OFFSET", "7", page="4")])
+    assert store.lookup("register", "REG_GAIN") == []
+    assert len(store.lookup("register", "REG_OFFSET")) == 1
+
+    store.stage("a.pdf", [_row("REG_NEW", "1")])
+    assert store.lookup("register", "REG_NEW") == []
+
+    assert store.commit_staged("a.pdf") == 3
+    assert len(store) == 1
+    assert len(store.lookup("register", "REG_NEW")) == 1
+
+    store.stage("a.pdf", [_row("REG_DROPPED", "1")])
+    assert store.discard_staged("a.pdf") == 1
+    store.commit_staged("a.pdf")
+    assert len(store) == 0
+
+
+def test_flush_and_load_round_trip_values_exactly(tmp_path):
+    store = TableStore()
+    store.replace_source("a.pdf", ROWS)
+    store.replace_source("b.pdf", [_row("REG_X", "0x2")])
+    store.flush(str(tmp_path))
+
+    loaded = TableStore()
+    loaded.load(str(tmp_path))
+    assert len(loaded) == 4
+
+    gain = loaded.lookup("register", "REG_GAIN")[0]
+    assert gain["cells"] == {"register": "REG_GAIN", "default_value": "1.10", "unit": "dB"}
+    assert gain["page"] == "4"
+
+    # Rows without a column read back without that cell
+    ctrl = loaded.lookup("default_value", "0x1a")[0]
+    assert "unit" not in ctrl["cells"]
+
+    store.delete_source("b.pdf")
+    store.flush(str(tmp_path))
+    reloaded = TableStore()
+    reloaded.load(str(tmp_path))
+    assert reloaded.lookup("register", "REG_X") == []
+    assert TableStore.exists(str(tmp_path))
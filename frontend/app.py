@@ -1,7 +1,7 @@
 from flask import Flask, render_template, request, jsonify
 import requests
 import markdown
-from config import CHAT_ENDPOINT, UPLOAD_ENDPOINT
+from config import CHAT_ENDPOINT, UPLOAD_ENDPOINT, JOBS_ENDPOINT
 
 app = Flask(__name__)
 
@@ -25,12 +25,19 @@ def upload():
             files={"file": (file.filename, file.stream)},
         )
 
-        if resp.status_code != 200:
+        # 202: indexing continues in a backend job (poll /jobs/<job_id>)
+        if resp.status_code not in (200, 202):
             return jsonify({"error": resp.text}), 500
 
         responses.append(resp.json())
 
-    return jsonify({"status": "success", "files": responses})
+    return jsonify({"status": "accepted", "files": responses}), 202
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    resp = requests.get(f"{JOBS_ENDPOINT}/{job_id}")
+    return jsonify(resp.json()), resp.status_code
 
 @app.route("/chat", methods=["POST"])
 def chat():
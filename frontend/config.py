@@ -1,3 +1,4 @@
 BACKEND_BASE_URL = "http://127.0.0.1:8000/api"
 CHAT_ENDPOINT = f"{BACKEND_BASE_URL}/chat"
 UPLOAD_ENDPOINT = f"{BACKEND_BASE_URL}/upload"
+JOBS_ENDPOINT = f"{BACKEND_BASE_URL}/jobs"
@@ -127,6 +127,22 @@ async function loadDriveFiles() {
 }
 
 // ---------------- UPLOAD ----------------
+// Indexing runs as a backend job; poll it until it is done or failed
+async function waitForJob(jobId, status) {
+    while (true) {
+        const res = await fetch(`${API_BASE}/jobs/${jobId}`);
+        const job = await res.json();
+
+        if (job.status === "done") return job;
+        if (job.status === "failed") throw new Error(job.error);
+
+        const pct = job.progress != null ? ` ${Math.round(job.progress * 100)}%` : "";
+        status.innerText = `Indexing document (${job.stage})${pct}…`;
+
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 function uploadDriveFile() {
     const select = document.getElementById("driveFileSelect");
     const fileId = select.value;
@@ -150,9 +166,15 @@ function uploadDriveFile() {
             file_name: fileName
         })
     })
-    .then(res => res.json())
-    .then(() => {
-        status.innerText = "Document uploaded successfully. You can now ask questions.";
+    .then(res => {
+        if (res.status !== 202) throw new Error("Upload rejected");
+        return res.json();
+    })
+    .then(job => waitForJob(job.job_id, status))
+    .then(job => {
+        status.innerText = job.result.status === "duplicate"
+            ? `Document already indexed as ${job.result.duplicate_of}. You can now ask questions.`
+            : "Document uploaded successfully. You can now ask questions.";
         documentsUploaded = true;
 
         document.getElementById("userInput").disabled = false;